@@ -0,0 +1,4 @@
+"""
+Tareas de mantenimiento de la DB que corren fuera del request (al arrancar,
+en background o a mano por CLI: `python -m app.jobs.<modulo> ...`).
+"""
@@ -0,0 +1,160 @@
+"""
+Mantenimiento de las particiones mensuales de event_audit_log (migrations/018).
+
+- ensure: crea las particiones de los próximos meses (public.ensure_audit_log_partitions).
+  La app lo corre cada 12 h desde el scheduler (app/jobs/scheduler.py). Si después de
+  crearlas la partición DEFAULT sigue con filas (un mes que no se pudo crear, o filas
+  fuera del rango), lo loguea como warning.
+- archive: retención. Para cada partición más vieja que --retention-months:
+  DETACH, dump a CSV gzip en --out-dir y DROP. Si el dump falla, la tabla queda
+  detachada (no se pierde nada) y el próximo archive la reintenta.
+
+Uso:
+    python -m app.jobs.audit_partitions ensure [--months-ahead 3]
+    python -m app.jobs.audit_partitions archive --out-dir /backups/audit [--retention-months 12] [--dry-run]
+"""
+import argparse
+import gzip
+import logging
+import re
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.settings import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+PARTITION_RE = re.compile(r"^event_audit_log_y(\d{4})m(\d{2})$")
+MONTHS_AHEAD = 3
+DEFAULT_RETENTION_MONTHS = 12
+
+
+def ensure_audit_partitions(months_ahead: int = MONTHS_AHEAD) -> int:
+    """Crea las particiones faltantes hasta `months_ahead` meses adelante. Devuelve cuántas creó."""
+    with engine.begin() as conn:
+        created = conn.execute(
+            text("SELECT public.ensure_audit_log_partitions(:months_ahead)"),
+            {"months_ahead": months_ahead},
+        ).scalar_one()
+        leftover = conn.execute(text("""
+            SELECT COUNT(*) AS rows, MIN(created_at) AS oldest, MAX(created_at) AS newest
+            FROM public.event_audit_log_default
+        """)).mappings().first()
+
+    if leftover["rows"]:
+        logger.warning(
+            "audit partitions: event_audit_log_default tiene %s filas (%s .. %s); revisar los WARNING de ensure_audit_log_partitions",
+            leftover["rows"], leftover["oldest"], leftover["newest"],
+        )
+    return created
+
+
+def _month_start(d: date, months_back: int) -> date:
+    idx = d.year * 12 + (d.month - 1) - months_back
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def _partitions(conn, attached: bool) -> list[tuple[str, date]]:
+    """(nombre, primer día del mes) de las particiones mensuales, attached o detachadas."""
+    if attached:
+        rows = conn.execute(text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'public.event_audit_log'::regclass
+        """)).scalars().all()
+    else:
+        rows = conn.execute(text("""
+            SELECT c.relname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+              AND c.relkind = 'r'
+              AND c.relname LIKE 'event_audit_log_y%'
+              AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+        """)).scalars().all()
+
+    out = []
+    for name in rows:
+        m = PARTITION_RE.match(name)
+        if m:
+            out.append((name, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(out, key=lambda p: p[1])
+
+
+def _dump_partition(name: str, out_dir: Path) -> tuple[Path, int]:
+    """COPY de la tabla a <out_dir>/<name>.csv.gz. Devuelve (path, filas)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{name}.csv.gz"
+    tmp = path.with_suffix(".gz.part")
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'SELECT COUNT(*) FROM public."{name}"')).scalar_one()
+        dbapi_conn = conn.connection.driver_connection
+        with dbapi_conn.cursor() as cur, gzip.open(tmp, "wb") as gz:
+            with cur.copy(f'COPY public."{name}" TO STDOUT WITH (FORMAT csv, HEADER true)') as copy:
+                for chunk in copy:
+                    gz.write(chunk)
+        conn.rollback()
+
+    tmp.replace(path)
+    return path, rows
+
+
+def archive_audit_partitions(out_dir: Path, retention_months: int = DEFAULT_RETENTION_MONTHS, dry_run: bool = False) -> list[dict]:
+    """Detach + dump + drop de las particiones anteriores al corte de retención."""
+    cutoff = _month_start(date.today(), retention_months)
+
+    with engine.connect() as conn:
+        to_detach = [p for p in _partitions(conn, attached=True) if p[1] < cutoff]
+        leftovers = [p for p in _partitions(conn, attached=False) if p[1] < cutoff]
+
+    report = []
+    if dry_run:
+        for name, month in to_detach + leftovers:
+            report.append({"partition": name, "month": str(month), "action": "would_archive"})
+        return report
+
+    for name, _ in to_detach:
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE public.event_audit_log DETACH PARTITION public."{name}"'))
+        logger.info("audit partition detached: %s", name)
+
+    for name, month in sorted(set(to_detach + leftovers), key=lambda p: p[1]):
+        path, rows = _dump_partition(name, out_dir)
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP TABLE public."{name}"'))
+        logger.info("audit partition archived: %s rows=%s file=%s", name, rows, path)
+        report.append({"partition": name, "month": str(month), "rows": rows, "file": str(path)})
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particiones mensuales de event_audit_log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ensure = sub.add_parser("ensure", help="Crear particiones de los próximos meses.")
+    p_ensure.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+
+    p_archive = sub.add_parser("archive", help="Detach + dump gzip + drop de particiones viejas.")
+    p_archive.add_argument("--out-dir", type=Path, required=True)
+    p_archive.add_argument("--retention-months", type=int, default=DEFAULT_RETENTION_MONTHS)
+    p_archive.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "ensure":
+        print(f"particiones creadas: {ensure_audit_partitions(args.months_ahead)}")
+    else:
+        if args.retention_months < 1:
+            parser.error("--retention-months debe ser >= 1")
+        for row in archive_audit_partitions(args.out_dir, args.retention_months, args.dry_run):
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Cambios de estado de eventos que dependen de la hora (los corre app/jobs/scheduler.py).
+
+- auto_close_events: OPEN -> CLOSED cuando pasa close_at, con auditoria AUTO_CLOSE_EVENT,
+  todo en un solo statement.
+- sweep_voting_windows: cuando vence la ventana de votacion de un evento finalizado,
+  invalida los conteos de votos pendientes cacheados (la campanita deja de mostrarlos).
+"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.routers.ratings import VOTING_WINDOW_DAYS
+from app.settings import engine
+from app.utils.notification_cache import notification_cache
+
+logger = logging.getLogger("uvicorn.error")
+
+_last_window_sweep: datetime | None = None
+
+
+def auto_close_events() -> int:
+    """Cierra los eventos OPEN con close_at vencido. Devuelve cuántos cerró."""
+    with engine.begin() as conn:
+        closed = conn.execute(text("""
+            WITH closed AS (
+                UPDATE public.events
+                SET status = 'CLOSED', updated_at = now()
+                WHERE status = 'OPEN'
+                  AND close_at IS NOT NULL
+                  AND close_at <= now()
+                RETURNING id, close_at
+            )
+            INSERT INTO public.event_audit_log (event_id, actor_user_id, action, metadata)
+            SELECT id, NULL, 'AUTO_CLOSE_EVENT',
+                   jsonb_build_object('close_at', close_at, 'source', 'scheduler')
+            FROM closed
+            RETURNING event_id
+        """)).scalars().all()
+
+    if closed:
+        logger.info("auto_close_events: %s evento(s) cerrados", len(closed))
+    return len(closed)
+
+
+def sweep_voting_windows() -> int:
+    """Eventos cuya ventana de votacion vencio desde la corrida anterior."""
+    global _last_window_sweep
+    now = datetime.now(timezone.utc)
+    since = _last_window_sweep or now
+    _last_window_sweep = now
+
+    with engine.connect() as conn:
+        expired = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM public.events
+            WHERE status = 'FINALIZED'
+              AND finalized_at + make_interval(days => :window_days) > :since
+              AND finalized_at + make_interval(days => :window_days) <= :now
+        """), {"window_days": VOTING_WINDOW_DAYS, "since": since, "now": now}).scalar_one()
+
+    if expired:
+        notification_cache.invalidate_pending()
+    return expired
@@ -0,0 +1,146 @@
+"""
+Refresco del leaderboard (migrations/030, GET /rankings).
+
+Recalcula en una sola transaccion, para todos los jugadores con ranking_opt_in y al
+menos MIN_DISTINCT_VOTERS votantes distintos:
+- score bayesiano con recencia (misma formula que bayesian_score en
+  app/utils/scoring.py, con las mismas constantes), puesto general y tier,
+- puesto por atributo, por fraccion de votos que marcaron el atributo.
+
+Las lecturas ven la foto anterior hasta el COMMIT. La app lo corre cada 10 minutos
+desde el scheduler (app/jobs/scheduler.py).
+
+Uso:
+    python -m app.jobs.leaderboard
+"""
+import logging
+
+from sqlalchemy import text
+
+from app.settings import engine
+from app.utils.scoring import (
+    ALL_ATTRIBUTES,
+    CONFIDENCE_PRIOR,
+    DEFAULT_GLOBAL_MEAN,
+    MIN_DISTINCT_VOTERS,
+    RANKING_TIER_REST,
+    RANKING_TIERS,
+    RECENCY_DECAY_PER_DAY,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
+_TIER_CASE = "CASE " + " ".join(
+    f"WHEN (rk - 1)::numeric / total < :tier_limit_{i} THEN :tier_name_{i}"
+    for i in range(len(RANKING_TIERS))
+) + " ELSE :tier_rest END"
+
+_TIER_PARAMS = {
+    **{f"tier_limit_{i}": limit for i, (limit, _) in enumerate(RANKING_TIERS)},
+    **{f"tier_name_{i}": name for i, (_, name) in enumerate(RANKING_TIERS)},
+    "tier_rest": RANKING_TIER_REST,
+}
+
+_INSERT_LEADERBOARD_SQL = f"""
+    WITH mean AS (
+        SELECT COALESCE(AVG(rating), :default_mean) AS m
+        FROM public.player_ratings
+        WHERE is_hidden = false
+    ),
+    stats AS (
+        SELECT
+          pr.target_user_id AS user_id,
+          COUNT(*) AS votes,
+          COUNT(DISTINCT pr.voter_user_id) AS voters,
+          SUM(pr.rating * exp(-:decay * EXTRACT(EPOCH FROM (now() - pr.created_at)) / 86400.0)) AS weighted_sum,
+          SUM(exp(-:decay * EXTRACT(EPOCH FROM (now() - pr.created_at)) / 86400.0)) AS weight_total
+        FROM public.player_ratings pr
+        JOIN public.users u
+          ON u.id = pr.target_user_id
+         AND u.ranking_opt_in = true
+        WHERE pr.is_hidden = false
+        GROUP BY pr.target_user_id
+        HAVING COUNT(DISTINCT pr.voter_user_id) >= :min_voters
+    ),
+    scored AS (
+        SELECT s.*, (:prior * mean.m + s.weighted_sum) / (:prior + s.weight_total) AS score
+        FROM stats s
+        CROSS JOIN mean
+    ),
+    ranked AS (
+        SELECT
+          scored.*,
+          row_number() OVER (ORDER BY score DESC, voters DESC, user_id ASC) AS rk,
+          COUNT(*) OVER () AS total
+        FROM scored
+    )
+    INSERT INTO public.player_leaderboard (
+        user_id, overall_rank, players_total, score, votes, voters,
+        percentile, tier, refreshed_at
+    )
+    SELECT
+      user_id, rk, total, ROUND(score::numeric, 2), votes, voters,
+      ROUND((rk - 1)::numeric / total, 4), {_TIER_CASE}, now()
+    FROM ranked
+"""
+
+_INSERT_ATTRIBUTES_SQL = """
+    INSERT INTO public.player_leaderboard_attributes (
+        attribute, user_id, attribute_rank, attribute_total, count, share
+    )
+    SELECT
+      attribute,
+      user_id,
+      row_number() OVER (PARTITION BY attribute ORDER BY share DESC, cnt DESC, user_id ASC),
+      COUNT(*) OVER (PARTITION BY attribute),
+      cnt,
+      share
+    FROM (
+        SELECT
+          attr.attribute,
+          lb.user_id,
+          COUNT(*) AS cnt,
+          ROUND(COUNT(*)::numeric / lb.votes, 3) AS share
+        FROM public.player_leaderboard lb
+        JOIN public.player_ratings pr
+          ON pr.target_user_id = lb.user_id
+         AND pr.is_hidden = false
+         AND jsonb_typeof(pr.attributes) = 'array'
+        JOIN LATERAL jsonb_array_elements_text(pr.attributes) attr(attribute)
+          ON true
+        WHERE attr.attribute = ANY(CAST(:attributes AS text[]))
+        GROUP BY attr.attribute, lb.user_id, lb.votes
+    ) per_attribute
+"""
+
+
+def refresh_leaderboard() -> dict[str, int]:
+    """Rearma el leaderboard. Devuelve jugadores rankeados y filas por atributo."""
+    with engine.begin() as conn:
+        # Dos refrescos a la vez se encolan; las lecturas (ACCESS SHARE) no se bloquean.
+        conn.execute(text("LOCK TABLE public.player_leaderboard IN EXCLUSIVE MODE"))
+        conn.execute(text("DELETE FROM public.player_leaderboard_attributes"))
+        conn.execute(text("DELETE FROM public.player_leaderboard"))
+        players = conn.execute(text(_INSERT_LEADERBOARD_SQL), {
+            "default_mean": DEFAULT_GLOBAL_MEAN,
+            "decay": RECENCY_DECAY_PER_DAY,
+            "min_voters": MIN_DISTINCT_VOTERS,
+            "prior": CONFIDENCE_PRIOR,
+            **_TIER_PARAMS,
+        }).rowcount
+        attribute_rows = conn.execute(
+            text(_INSERT_ATTRIBUTES_SQL), {"attributes": list(ALL_ATTRIBUTES)}
+        ).rowcount
+
+    logger.info("leaderboard: %s jugadores, %s filas por atributo", players, attribute_rows)
+    return {"players": players, "attribute_rows": attribute_rows}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    for name, rows in refresh_leaderboard().items():
+        print(f"{name}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Retención de notificaciones (migrations/023).
+
+Borra, en lotes chicos (cada lote es su propia transacción, sin locks largos):
+- descartes (user_notification_dismissals) de notificaciones globales vencidas o
+  desactivadas hace más de --grace-days,
+- esas notificaciones, una vez que ya no tienen descartes (el ON DELETE CASCADE
+  nunca tiene que borrar miles de filas de golpe),
+- notificaciones dirigidas (user_notifications) ya leídas hace más de --inbox-days.
+  Las no leídas no se tocan: el contador de no leídas sigue siendo exacto.
+
+La app lo corre una vez por día desde el scheduler (app/jobs/scheduler.py).
+Cada corrida loguea y devuelve las filas borradas por tabla.
+
+Uso:
+    python -m app.jobs.notification_retention [--grace-days 7] [--inbox-days 90] [--dry-run]
+"""
+import argparse
+import logging
+
+from sqlalchemy import text
+
+from app.settings import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+DEFAULT_GRACE_DAYS = 7
+DEFAULT_INBOX_DAYS = 90
+BATCH_SIZE = 5000
+
+_EXPIRED = """
+    (n.expires_at < now() - make_interval(days => :grace_days)
+     OR (n.is_active = false AND n.updated_at < now() - make_interval(days => :grace_days)))
+"""
+
+_COUNT_SQL = {
+    "dismissals": f"""
+        SELECT COUNT(*)
+        FROM public.user_notification_dismissals d
+        JOIN public.notifications n ON n.id = d.notification_id
+        WHERE {_EXPIRED}
+    """,
+    "notifications": f"""
+        SELECT COUNT(*)
+        FROM public.notifications n
+        WHERE {_EXPIRED}
+    """,
+    "inbox": """
+        SELECT COUNT(*)
+        FROM public.user_notifications
+        WHERE read_at < now() - make_interval(days => :inbox_days)
+    """,
+}
+
+_DELETE_SQL = {
+    "dismissals": f"""
+        DELETE FROM public.user_notification_dismissals
+        WHERE ctid IN (
+            SELECT d.ctid
+            FROM public.user_notification_dismissals d
+            JOIN public.notifications n ON n.id = d.notification_id
+            WHERE {_EXPIRED}
+            LIMIT :batch
+        )
+    """,
+    "notifications": f"""
+        DELETE FROM public.notifications
+        WHERE ctid IN (
+            SELECT n.ctid
+            FROM public.notifications n
+            WHERE {_EXPIRED}
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.user_notification_dismissals d
+                  WHERE d.notification_id = n.id
+              )
+            LIMIT :batch
+        )
+    """,
+    "inbox": """
+        DELETE FROM public.user_notifications
+        WHERE ctid IN (
+            SELECT ctid
+            FROM public.user_notifications
+            WHERE read_at < now() - make_interval(days => :inbox_days)
+            LIMIT :batch
+        )
+    """,
+}
+
+
+def _delete_in_batches(sql: str, params: dict) -> int:
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            n = conn.execute(text(sql), {**params, "batch": BATCH_SIZE}).rowcount
+        deleted += n
+        if n < BATCH_SIZE:
+            return deleted
+
+
+def purge_notifications(
+    grace_days: int = DEFAULT_GRACE_DAYS,
+    inbox_days: int = DEFAULT_INBOX_DAYS,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Filas borradas por tabla (o las que se borrarían, con dry_run)."""
+    params = {"grace_days": grace_days, "inbox_days": inbox_days}
+
+    if dry_run:
+        with engine.connect() as conn:
+            return {name: conn.execute(text(sql), params).scalar_one() for name, sql in _COUNT_SQL.items()}
+
+    # Primero los descartes: la notificación se borra recién cuando ya no tiene ninguno.
+    report = {name: _delete_in_batches(sql, params) for name, sql in _DELETE_SQL.items()}
+    logger.info(
+        "notification retention: dismissals=%s notifications=%s inbox=%s",
+        report["dismissals"], report["notifications"], report["inbox"],
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retención de notificaciones y descartes.")
+    parser.add_argument("--grace-days", type=int, default=DEFAULT_GRACE_DAYS)
+    parser.add_argument("--inbox-days", type=int, default=DEFAULT_INBOX_DAYS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.grace_days < 0 or args.inbox_days < 1:
+        parser.error("--grace-days debe ser >= 0 y --inbox-days >= 1")
+
+    for table, rows in purge_notifications(args.grace_days, args.inbox_days, args.dry_run).items():
+        print(f"{table}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Scheduler en proceso para tareas periódicas (lo arranca/frena el lifespan de la app).
+
+- Un solo líder entre workers/instancias: el que consigue pg_try_advisory_lock(LEADER_LOCK_KEY)
+  en una conexión dedicada corre los jobs; el resto reintenta cada TICK_SECONDS. Si esa
+  conexión se cae, el lock se libera solo y otro worker toma el lugar. La conexión va en
+  AUTOCOMMIT: el ping de cada tick no deja una transacción abierta ("idle in transaction").
+- Cada job corre en su propio thread. Si la corrida anterior sigue en curso, la nueva se
+  saltea (se cuenta en `skipped_overlaps`): nunca hay dos corridas del mismo job a la vez.
+- Métricas por job (GET /health/jobs, solo admin): corridas, fallas, duración
+  última/máxima, clase del último error y resultado.
+
+Las invalidaciones de caches en memoria que hace un job (sweep_voting_windows ->
+notification_cache.invalidate_pending) solo limpian el proceso líder. En los demás, el
+conteo de votos pendientes se relee recién al vencer PENDING_TTL_SECONDS.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import text
+
+from app.settings import engine
+
+logger = logging.getLogger("uvicorn.error")
+
+LEADER_LOCK_KEY = 72_410_042
+TICK_SECONDS = 5.0
+
+
+class Job:
+    def __init__(self, name: str, interval_seconds: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.fn = fn
+        self.next_run_at = 0.0  # corre en el primer tick como líder
+        self._running = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.skipped_overlaps = 0
+        self.last_started_at: datetime | None = None
+        self.last_duration_ms: float | None = None
+        self.max_duration_ms = 0.0
+        self.last_error_type: str | None = None
+        self.last_result = None
+
+    def metrics(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "running": self._running.locked(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlaps": self.skipped_overlaps,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_duration_ms": self.last_duration_ms,
+            "max_duration_ms": self.max_duration_ms,
+            "last_error_type": self.last_error_type,
+            "last_result": self.last_result,
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._leader_conn = None
+        self.is_leader = False
+
+    def register(self, name: str, interval_seconds: float, fn: Callable[[], object]) -> None:
+        self._jobs[name] = Job(name, interval_seconds, fn)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=TICK_SECONDS * 2)
+        self._release_leadership()
+
+    def metrics(self) -> dict:
+        return {
+            "is_leader": self.is_leader,
+            "jobs": {name: job.metrics() for name, job in self._jobs.items()},
+        }
+
+    # ---- liderazgo ----
+
+    def _ensure_leader(self) -> bool:
+        if self._leader_conn is not None:
+            try:
+                self._leader_conn.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                logger.warning("scheduler: se perdió la conexión del líder")
+                self._release_leadership()
+
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            got = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": LEADER_LOCK_KEY}
+            ).scalar_one()
+        except Exception:
+            conn.close()
+            raise
+
+        if not got:
+            conn.close()
+            return False
+
+        self._leader_conn = conn
+        self.is_leader = True
+        logger.info("scheduler: este worker es el líder")
+        return True
+
+    def _release_leadership(self) -> None:
+        conn, self._leader_conn = self._leader_conn, None
+        self.is_leader = False
+        if conn is None:
+            return
+        try:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LEADER_LOCK_KEY})
+        except Exception:
+            pass
+        finally:
+            # Si el unlock falló, cerrar la conexión libera el lock de sesión igual.
+            conn.invalidate()
+
+    # ---- loop ----
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._ensure_leader():
+                    now = time.monotonic()
+                    for job in self._jobs.values():
+                        if now >= job.next_run_at:
+                            job.next_run_at = now + job.interval_seconds
+                            self._dispatch(job)
+            except Exception:
+                logger.exception("scheduler: fallo el tick")
+            self._stop.wait(TICK_SECONDS)
+
+    def _dispatch(self, job: Job) -> None:
+        if not job._running.acquire(blocking=False):
+            job.skipped_overlaps += 1
+            logger.warning("scheduler: %s sigue corriendo, se saltea esta vuelta", job.name)
+            return
+        threading.Thread(target=self._run, args=(job,), name=f"job-{job.name}", daemon=True).start()
+
+    def _run(self, job: Job) -> None:
+        job.last_started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        try:
+            job.last_result = job.fn()
+            job.last_error_type = None
+        except Exception as exc:
+            job.failures += 1
+            # Solo la clase: el mensaje (SQL, parametros) queda en el log, no en /health/jobs.
+            job.last_error_type = type(exc).__name__
+            logger.exception("scheduler: fallo el job %s", job.name)
+        finally:
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            job.runs += 1
+            job.last_duration_ms = elapsed_ms
+            job.max_duration_ms = max(job.max_duration_ms, elapsed_ms)
+            job._running.release()
+
+
+scheduler = Scheduler()
+
+
+def register_default_jobs() -> None:
+    """Jobs de la app. Los imports van acá para no cargar los módulos si no hay scheduler."""
+    from app.jobs.audit_partitions import ensure_audit_partitions
+    from app.jobs.event_lifecycle import auto_close_events, sweep_voting_windows
+    from app.jobs.leaderboard import refresh_leaderboard
+    from app.jobs.notification_retention import purge_notifications
+    from app.utils.idempotency import purge_expired_idempotency_keys
+
+    scheduler.register("auto_close_events", 60, auto_close_events)
+    scheduler.register("voting_windows", 300, sweep_voting_windows)
+    scheduler.register("idempotency_purge", 600, purge_expired_idempotency_keys)
+    scheduler.register("leaderboard_refresh", 600, refresh_leaderboard)
+    scheduler.register("audit_partitions", 12 * 3600, ensure_audit_partitions)
+    scheduler.register("notification_retention", 24 * 3600, purge_notifications)
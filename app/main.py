@@ -1,8 +1,9 @@
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -11,7 +12,11 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app.settings import CORS_ORIGINS, engine
 from app.utils.auth_token import verify_token
+from app.utils.deps import get_actor_user_id
+from app.utils.permissions import require_admin
 from app.utils.ratelimit import client_ip
+from app.utils.audit import audit_queue
+from app.jobs.scheduler import scheduler, register_default_jobs
 from app.routers import (
     auth,
     events,
@@ -25,13 +30,27 @@ from app.routers import (
     calendar,
     admin_calendar,
     admin_roles,
+    admin_event_templates,
 )
 
 # =========================
 # FastAPI App
 # =========================
 
-app = FastAPI(title="Futbol MVP API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs periodicos (cierre por close_at, particiones, retencion, purgas): solo
+    # los corre el worker lider (advisory lock). Ver app/jobs/scheduler.py.
+    register_default_jobs()
+    scheduler.start()
+    # Cola de auditoria best-effort: se drena antes de cerrar para no perder filas.
+    audit_queue.start()
+    yield
+    audit_queue.drain()
+    scheduler.stop()
+
+
+app = FastAPI(title="Futbol MVP API", lifespan=lifespan)
 
 logger = logging.getLogger("uvicorn.error")
 access_logger = logging.getLogger("futbol.access")
@@ -47,7 +66,7 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_credentials=False,
     allow_methods=["GET", "POST", "PATCH", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "X-Actor-User-Id"],
+    allow_headers=["Content-Type", "X-Actor-User-Id", "Idempotency-Key"],
 )
 
 
@@ -86,6 +105,22 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/audit-queue")
+def audit_queue_health(actor_user_id: str = Depends(get_actor_user_id)):
+    """Profundidad y contadores de la cola de auditoria best-effort (por instancia). Solo admin."""
+    with engine.connect() as conn:
+        require_admin(conn, actor_user_id)
+    return audit_queue.metrics()
+
+
+@app.get("/health/jobs")
+def jobs_health(actor_user_id: str = Depends(get_actor_user_id)):
+    """Liderazgo y metricas de los jobs del scheduler (por instancia). Solo admin."""
+    with engine.connect() as conn:
+        require_admin(conn, actor_user_id)
+    return scheduler.metrics()
+
+
 @app.get("/db-check")
 def db_check():
     """Verifica conectividad con la base de datos (sin filtrar detalles internos)."""
@@ -115,6 +150,7 @@ app.include_router(tournaments_public.router, tags=["Public - Tournaments"])
 app.include_router(calendar.router, tags=["Calendar"])
 app.include_router(admin_calendar.router, prefix="/admin", tags=["Admin - Calendar"])
 app.include_router(admin_roles.router, prefix="/admin", tags=["Admin - Roles"])
+app.include_router(admin_event_templates.router, prefix="/admin", tags=["Admin - Event Templates"])
 
 # =========================
 # Serve Frontend (production)
@@ -4,11 +4,18 @@ Auditoria enriquecida para el panel admin.
 GET /admin/audit devuelve eventos del log con nombres resueltos (actor, target,
 event, cancha) y un objeto `context` con todos los UUIDs de la metadata ya
 convertidos a strings legibles. El frontend usa eso para armar frases naturales.
+Los nombres se resuelven al escribir cada fila (trigger de migrations/019), asi
+que la lectura no hace JOINs.
+
+GET /admin/audit/export devuelve el log completo (mismos filtros) en NDJSON o CSV,
+en streaming.
 
 GET /admin/audit/actors devuelve los admins que emitieron al menos un log,
 para el typeahead del filtro.
 """
 
+import json
+import re
 from typing import Iterable
 
 from fastapi import APIRouter, HTTPException, Query, Depends
@@ -16,7 +23,9 @@ from app.utils.deps import get_actor_user_id
 from sqlalchemy import text
 
 from app.settings import engine
+from app.utils.cursor import encode_cursor, decode_cursor
 from app.utils.datetime_parser import parse_client_datetime
+from app.utils.export import export_response
 from app.utils.permissions import require_permission
 
 router = APIRouter()
@@ -71,9 +80,10 @@ VALID_CATEGORIES = {
     "EVENTO", "CANCHA", "INSCRIPCION", "CAPITAN", "USUARIO", "NOTIFICACION", "ROLES", "SISTEMA",
 }
 
-# Llaves dentro de metadata que sabemos que son court UUIDs
+# Llaves dentro de metadata que sabemos que son court UUIDs / user UUIDs.
+# Se resuelven a nombres al escribir la fila: si se agregan llaves, actualizar
+# tambien public.audit_resolve_metadata_names (migrations/019).
 COURT_KEYS = ("court_id", "from_court_id", "to_court_id")
-# Llaves dentro de metadata que sabemos que son user UUIDs
 USER_KEYS = ("user_id", "captain_user_id", "removed_user_id", "target_user_id")
 
 
@@ -85,33 +95,143 @@ def _classify(action: str) -> tuple[str, bool]:
     return ACTION_CATEGORY.get(action, "OTRO"), False
 
 
-def _coerce_uuid_strs(values: Iterable) -> set[str]:
-    """Filtra valores no-string-uuid de un iterable y devuelve set de strings."""
-    out: set[str] = set()
-    for v in values:
-        if v is None:
-            continue
-        s = str(v).strip()
-        if len(s) == 36 and s.count("-") == 4:
-            out.add(s)
-    return out
+def _actions_for_categories(categories: Iterable[str], include_system: bool) -> list[str]:
+    """
+    Traduce categorias de UI a la lista de actions que matchean en SQL.
+    Mismo criterio que _classify: una action de SYSTEM_ACTIONS es siempre SISTEMA.
+    """
+    actions: set[str] = set()
+    for cat in categories:
+        if cat == "SISTEMA":
+            actions.update(SYSTEM_ACTIONS)
+        else:
+            actions.update(
+                a for a, c in ACTION_CATEGORY.items() if c == cat and a not in SYSTEM_ACTIONS
+            )
+    if not include_system:
+        actions -= SYSTEM_ACTIONS
+    return sorted(actions)
+
+
+# Columnas del read model (migrations/019): nombres ya resueltos al escribir la fila.
+AUDIT_COLUMNS = """
+    eal.id,
+    eal.action,
+    eal.created_at,
+    eal.metadata,
+    eal.event_id,
+    eal.actor_user_id,
+    eal.actor_name,
+    eal.event_title,
+    eal.target_registration_id,
+    eal.target_reg_type,
+    eal.target_player_name,
+    eal.target_court_name,
+    eal.resolved_names
+"""
 
 
-@router.get("/audit")
-def get_audit_logs(
-    actor_user_id: str = Depends(get_actor_user_id),
-    event_id: str | None = None,
-    action: str | None = None,
-    actor_user_id_filter: str | None = None,
-    category: list[str] | None = Query(default=None),
-    from_: str | None = Query(default=None, alias="from"),
-    to: str | None = Query(default=None),
-    include_system: bool = Query(default=False),
-    limit: int = Query(default=50, ge=1, le=200),
-    offset: int = Query(default=0, ge=0),
-):
+def _serialize_audit_row(r) -> dict:
+    """Arma el item de la API (actor, event, target, context) a partir de una fila del read model."""
+    cat, is_system = _classify(r["action"])
+
+    meta = r["metadata"] or {}
+    if not isinstance(meta, dict):
+        meta = {}
+
+    resolved = r["resolved_names"] or {}
+    courts_by_id: dict = resolved.get("courts") or {}
+    users_by_id: dict = resolved.get("users") or {}
+
+    # Resolver context con nombres
+    def name_of_court(key: str) -> str | None:
+        cid = meta.get(key)
+        return courts_by_id.get(str(cid)) if cid else None
+
+    def name_of_user(key: str) -> str | None:
+        uid = meta.get(key)
+        return users_by_id.get(str(uid)) if uid else None
+
+    # Para CREATE_COURT, UPDATE_COURT, DELETE_COURT: la metadata trae 'court_name' o 'name' directos
+    court_name_fallback = meta.get("court_name") or meta.get("name")
+
+    context = {
+        "court_name": name_of_court("court_id") or court_name_fallback,
+        "from_court_name": name_of_court("from_court_id"),
+        "to_court_name": name_of_court("to_court_id"),
+        "previous_status": meta.get("previous_status") or meta.get("previous"),
+        "next_status": meta.get("next") or meta.get("next_status"),
+        "captain_name": name_of_user("user_id") or name_of_user("captain_user_id"),
+        "target_user_name": name_of_user("target_user_id") or name_of_user("user_id"),
+        "reason": meta.get("reason"),
+        "capacity": meta.get("capacity"),
+        "expires_in_days": meta.get("expires_in_days"),
+    }
+
+    # Target (jugador afectado)
+    target = None
+    if r["target_registration_id"]:
+        target = {
+            "kind": "registration",
+            "registration_id": str(r["target_registration_id"]),
+            "registration_type": r["target_reg_type"],
+            "player_name": r["target_player_name"] or "Jugador",
+            "court_name": r["target_court_name"],
+        }
+
+    actor = None
+    if r["actor_user_id"]:
+        actor = {
+            "id": str(r["actor_user_id"]),
+            "name": r["actor_name"] or "Admin",
+        }
+
+    event_ref = None
+    if r["event_id"]:
+        event_ref = {
+            "id": str(r["event_id"]),
+            "title": r["event_title"] or "Evento",
+        }
+
+    return {
+        "id": str(r["id"]),
+        "action": r["action"],
+        "category": cat,
+        "is_system": is_system,
+        "created_at": str(r["created_at"]),
+        "actor": actor,
+        "event": event_ref,
+        "target": target,
+        "context": context,
+        "metadata": meta,
+    }
+
+
+def _prefix_tsquery(q: str) -> str | None:
     """
-    Devuelve logs de auditoria con campos enriquecidos (actor, event, target, context).
+    "juan mov" -> "juan:* & mov:*". Solo palabras alfanumericas: el resultado va
+    bindeado a to_tsquery y no puede traer operadores del usuario.
+    """
+    words = re.findall(r"\w+", q.lower())[:8]
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def _audit_filters(
+    event_id: str | None,
+    action: str | None,
+    actor_user_id_filter: str | None,
+    category: list[str] | None,
+    from_: str | None,
+    to: str | None,
+    include_system: bool,
+    q: str | None = None,
+    metadata_contains: str | None = None,
+) -> tuple[list[str], dict]:
+    """
+    Condiciones WHERE + params de los filtros del panel. Compartido por la lista
+    paginada (GET /admin/audit) y el export (GET /admin/audit/export).
     """
     if category:
         bad = [c for c in category if c not in VALID_CATEGORIES]
@@ -124,13 +244,13 @@ def get_audit_logs(
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    # Filtros que se aplican en SQL: event_id, action, actor, from, to.
-    # Los filtros category e include_system se aplican en Python (post-fetch)
-    # porque dependen de un map estatico. Para que el LIMIT/OFFSET tenga
-    # sentido cuando hay filtros de categoria, agarramos un page tope y
-    # filtramos en memoria.
+    # Todos los filtros (incluidos category e include_system) se aplican en SQL,
+    # asi el LIMIT devuelve paginas completas y has_more es exacto.
+    # event_audit_log esta particionada por mes (migrations/018): las condiciones
+    # simples sobre created_at (from, to, cursor) dejan que Postgres descarte
+    # particiones enteras.
     where_conditions: list[str] = []
-    params: dict = {"sql_limit": min(limit * 4, 500), "sql_offset": offset}
+    params: dict = {}
 
     if event_id:
         where_conditions.append("eal.event_id = :event_id")
@@ -152,180 +272,207 @@ def get_audit_logs(
         where_conditions.append("eal.created_at < :to_dt")
         params["to_dt"] = to_dt
 
+    if category:
+        where_conditions.append("eal.action = ANY(CAST(:category_actions AS text[]))")
+        params["category_actions"] = _actions_for_categories(category, include_system)
+    elif not include_system:
+        where_conditions.append("NOT (eal.action = ANY(CAST(:system_actions AS text[])))")
+        params["system_actions"] = sorted(SYSTEM_ACTIONS)
+
+    # Busqueda (migrations/021): texto libre sobre nombres/metadata y containment JSONB.
+    if q:
+        tsquery = _prefix_tsquery(q)
+        if tsquery:
+            where_conditions.append("eal.search_tsv @@ to_tsquery('simple', :q_tsquery)")
+            params["q_tsquery"] = tsquery
+
+    if metadata_contains:
+        try:
+            contains = json.loads(metadata_contains)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="metadata_contains debe ser JSON valido.") from exc
+        if not isinstance(contains, dict) or not contains:
+            raise HTTPException(status_code=400, detail="metadata_contains debe ser un objeto JSON no vacio.")
+        where_conditions.append("eal.metadata @> CAST(:metadata_contains AS jsonb)")
+        params["metadata_contains"] = json.dumps(contains)
+
+    return where_conditions, params
+
+
+@router.get("/audit")
+def get_audit_logs(
+    actor_user_id: str = Depends(get_actor_user_id),
+    event_id: str | None = None,
+    action: str | None = None,
+    actor_user_id_filter: str | None = None,
+    category: list[str] | None = Query(default=None),
+    from_: str | None = Query(default=None, alias="from"),
+    to: str | None = Query(default=None),
+    include_system: bool = Query(default=False),
+    q: str | None = Query(default=None, max_length=200, description="Texto libre: nombres, action, metadata."),
+    metadata_contains: str | None = Query(default=None, description='JSON, ej: {"court_id": "..."}'),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = Query(default=None, description="next_cursor de la pagina anterior."),
+):
+    """
+    Devuelve logs de auditoria con campos enriquecidos (actor, event, target, context).
+    Paginacion keyset sobre (created_at, id): cada pagina cuesta lo mismo sin importar
+    la profundidad. Para la siguiente pagina, pasar `cursor=next_cursor`.
+    `q` busca por prefijo en nombres, action y strings de metadata ("juan mov");
+    `metadata_contains` filtra por containment JSONB (`{"court_id": "..."}`).
+    """
+    where_conditions, params = _audit_filters(
+        event_id, action, actor_user_id_filter, category, from_, to, include_system,
+        q, metadata_contains,
+    )
+    params["sql_limit"] = limit + 1
+
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        # La comparacion de tuplas no poda particiones; el <= sobre created_at si.
+        where_conditions.append("eal.created_at <= :cursor_created_at")
+        where_conditions.append("(eal.created_at, eal.id) < (:cursor_created_at, CAST(:cursor_id AS uuid))")
+        params["cursor_created_at"] = cursor_created_at
+        params["cursor_id"] = cursor_id
+
     where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
 
     query = f"""
-        SELECT
-            eal.id,
-            eal.action,
-            eal.created_at,
-            eal.metadata,
-            eal.event_id,
-            eal.actor_user_id,
-            ua.full_name AS actor_name,
-            e.title AS event_title,
-            eal.target_registration_id,
-            r.registration_type AS target_reg_type,
-            r.guest_name AS target_guest_name,
-            ur.full_name AS target_user_name,
-            rc.name AS target_court_name
+        SELECT {AUDIT_COLUMNS}
         FROM public.event_audit_log eal
-        LEFT JOIN public.users ua ON ua.id = eal.actor_user_id
-        LEFT JOIN public.events e ON e.id = eal.event_id
-        LEFT JOIN public.event_registrations r ON r.id = eal.target_registration_id
-        LEFT JOIN public.users ur ON ur.id = r.user_id
-        LEFT JOIN public.event_courts rc ON rc.id = r.court_id
         {where_clause}
-        ORDER BY eal.created_at DESC
-        LIMIT :sql_limit OFFSET :sql_offset
+        ORDER BY eal.created_at DESC, eal.id DESC
+        LIMIT :sql_limit
     """
 
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'audit.view')
         rows = conn.execute(text(query), params).mappings().all()
 
-        # Recolectar court_ids y user_ids referenciados en metadata para resolver en batch.
-        court_ids: set[str] = set()
-        user_ids: set[str] = set()
-        for r in rows:
-            meta = r["metadata"] or {}
-            if not isinstance(meta, dict):
-                continue
-            court_ids.update(_coerce_uuid_strs(meta.get(k) for k in COURT_KEYS))
-            user_ids.update(_coerce_uuid_strs(meta.get(k) for k in USER_KEYS))
-
-        courts_by_id: dict[str, str] = {}
-        users_by_id: dict[str, str] = {}
-
-        if court_ids:
-            cr = conn.execute(text("""
-                SELECT id::text AS id, name
-                FROM public.event_courts
-                WHERE id = ANY(CAST(:ids AS uuid[]))
-            """), {"ids": list(court_ids)}).mappings().all()
-            courts_by_id = {row["id"]: row["name"] for row in cr}
-
-        if user_ids:
-            ur_rows = conn.execute(text("""
-                SELECT id::text AS id, full_name
-                FROM public.users
-                WHERE id = ANY(CAST(:ids AS uuid[]))
-            """), {"ids": list(user_ids)}).mappings().all()
-            users_by_id = {row["id"]: row["full_name"] for row in ur_rows}
-
-    # Armar respuesta y aplicar filtros post-SQL (category, include_system).
-    items: list[dict] = []
-    requested_cats = set(category) if category else None
-
-    for r in rows:
-        cat, is_system = _classify(r["action"])
-
-        if not include_system and is_system:
-            continue
-        if requested_cats and cat not in requested_cats:
-            continue
-
-        meta = r["metadata"] or {}
-        if not isinstance(meta, dict):
-            meta = {}
-
-        # Resolver context con nombres
-        def name_of_court(key: str) -> str | None:
-            cid = meta.get(key)
-            return courts_by_id.get(str(cid)) if cid else None
-
-        def name_of_user(key: str) -> str | None:
-            uid = meta.get(key)
-            return users_by_id.get(str(uid)) if uid else None
-
-        # Para CREATE_COURT, UPDATE_COURT, DELETE_COURT: la metadata trae 'court_name' o 'name' directos
-        court_name_fallback = meta.get("court_name") or meta.get("name")
-
-        context = {
-            "court_name": name_of_court("court_id") or court_name_fallback,
-            "from_court_name": name_of_court("from_court_id"),
-            "to_court_name": name_of_court("to_court_id"),
-            "previous_status": meta.get("previous_status") or meta.get("previous"),
-            "next_status": meta.get("next") or meta.get("next_status"),
-            "captain_name": name_of_user("user_id") or name_of_user("captain_user_id"),
-            "target_user_name": name_of_user("target_user_id") or name_of_user("user_id"),
-            "reason": meta.get("reason"),
-            "capacity": meta.get("capacity"),
-            "expires_in_days": meta.get("expires_in_days"),
-        }
-
-        # Target (jugador afectado)
-        target = None
-        if r["target_registration_id"]:
-            player_name = (
-                r["target_user_name"]
-                if r["target_reg_type"] == "USER"
-                else r["target_guest_name"]
-            )
-            target = {
-                "kind": "registration",
-                "registration_id": str(r["target_registration_id"]),
-                "registration_type": r["target_reg_type"],
-                "player_name": player_name or "Jugador",
-                "court_name": r["target_court_name"],
-            }
-
-        actor = None
-        if r["actor_user_id"]:
-            actor = {
-                "id": str(r["actor_user_id"]),
-                "name": r["actor_name"] or "Admin",
-            }
-
-        event_ref = None
-        if r["event_id"]:
-            event_ref = {
-                "id": str(r["event_id"]),
-                "title": r["event_title"] or "Evento",
-            }
-
-        items.append({
-            "id": str(r["id"]),
-            "action": r["action"],
-            "category": cat,
-            "is_system": is_system,
-            "created_at": str(r["created_at"]),
-            "actor": actor,
-            "event": event_ref,
-            "target": target,
-            "context": context,
-            "metadata": meta,
-        })
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [_serialize_audit_row(r) for r in rows]
 
-        if len(items) >= limit:
-            break
-
-    has_more = len(items) >= limit and len(rows) >= params["sql_limit"]
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
 
     return {
         "items": items,
         "has_more": has_more,
+        "next_cursor": next_cursor,
         "limit": limit,
-        "offset": offset,
     }
 
 
+AUDIT_EXPORT_COLUMNS = [
+    "id", "created_at", "action", "category", "is_system",
+    "actor_id", "actor_name", "event_id", "event_title",
+    "target_registration_id", "target_player_name", "target_court_name",
+    "metadata",
+]
+
+
+def _audit_export_row(r) -> dict:
+    """Item de export: mismo objeto que la API en NDJSON, con columnas planas para el CSV."""
+    item = _serialize_audit_row(r)
+    actor = item["actor"] or {}
+    event_ref = item["event"] or {}
+    target = item["target"] or {}
+    item.update({
+        "actor_id": actor.get("id"),
+        "actor_name": actor.get("name"),
+        "event_id": event_ref.get("id"),
+        "event_title": event_ref.get("title"),
+        "target_registration_id": target.get("registration_id"),
+        "target_player_name": target.get("player_name"),
+        "target_court_name": target.get("court_name"),
+    })
+    return item
+
+
+@router.get("/audit/export")
+def export_audit_logs(
+    actor_user_id: str = Depends(get_actor_user_id),
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    event_id: str | None = None,
+    action: str | None = None,
+    actor_user_id_filter: str | None = None,
+    category: list[str] | None = Query(default=None),
+    from_: str | None = Query(default=None, alias="from"),
+    to: str | None = Query(default=None),
+    include_system: bool = Query(default=False),
+    q: str | None = Query(default=None, max_length=200, description="Texto libre: nombres, action, metadata."),
+    metadata_contains: str | None = Query(default=None, description='JSON, ej: {"court_id": "..."}'),
+):
+    """
+    Export completo del log con los mismos filtros que GET /admin/audit, en NDJSON
+    (un item de la API por linea) o CSV. Se streamea con cursor server-side: la
+    memoria no crece con la cantidad de filas.
+    """
+    where_conditions, params = _audit_filters(
+        event_id, action, actor_user_id_filter, category, from_, to, include_system,
+        q, metadata_contains,
+    )
+    where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+    with engine.connect() as conn:
+        require_permission(conn, actor_user_id, 'audit.view')
+
+    return export_response(
+        text(f"""
+            SELECT {AUDIT_COLUMNS}
+            FROM public.event_audit_log eal
+            {where_clause}
+            ORDER BY eal.created_at DESC, eal.id DESC
+        """),
+        params,
+        serialize=_audit_export_row,
+        columns=AUDIT_EXPORT_COLUMNS,
+        fmt=fmt,
+        filename="audit",
+    )
+
+
 @router.get("/audit/actors")
 def get_audit_actors(
     actor_user_id: str = Depends(get_actor_user_id),
+    q: str | None = Query(default=None, max_length=100),
+    limit: int = Query(default=50, ge=1, le=200),
 ):
     """
     Lista los admins que emitieron al menos un log (para el typeahead del filtro).
+    Sale de public.audit_actors (migrations/020), no del log: el costo no depende
+    del tamanio de event_audit_log. `q` filtra por prefijo del nombre.
     """
+    params: dict = {"limit": limit}
+    where = ""
+    prefix = (q or "").strip().lower()
+    if prefix:
+        # Escapar comodines de LIKE: el input es un prefijo literal.
+        params["prefix"] = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where = "WHERE lower(aa.actor_name) LIKE :prefix"
+
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'audit.view')
 
-        rows = conn.execute(text("""
-            SELECT DISTINCT eal.actor_user_id::text AS id, u.full_name AS name
-            FROM public.event_audit_log eal
-            JOIN public.users u ON u.id = eal.actor_user_id
-            ORDER BY u.full_name ASC
-            LIMIT 200
-        """)).mappings().all()
+        rows = conn.execute(text(f"""
+            SELECT aa.actor_user_id::text AS id,
+                   aa.actor_name AS name,
+                   aa.last_seen,
+                   aa.action_count
+            FROM public.audit_actors aa
+            {where}
+            ORDER BY lower(aa.actor_name) ASC
+            LIMIT :limit
+        """), params).mappings().all()
 
-    return {"items": [{"id": r["id"], "name": r["name"]} for r in rows]}
+    return {
+        "items": [
+            {
+                "id": r["id"],
+                "name": r["name"],
+                "last_seen": str(r["last_seen"]),
+                "action_count": r["action_count"],
+            }
+            for r in rows
+        ]
+    }
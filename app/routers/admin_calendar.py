@@ -4,8 +4,12 @@ CRUD admin de anuncios del calendario + hook a notifications cuando se publica a
 Los anuncios son entradas informativas (sin inscripcion) que aparecen en el calendario
 de todos los jugadores. Cada vez que un admin crea un anuncio, se inserta una fila en
 public.notifications con action_url=/calendar para que aparezca tambien en la bell.
+
+Pueden repetirse (`recurrence`): se guarda una sola fila con la regla y las ocurrencias
+se expanden al leer (app/utils/recurrence.py).
 """
 
+import json
 import logging
 
 from fastapi import APIRouter, HTTPException, Depends
@@ -16,6 +20,8 @@ from app.settings import engine
 from app.schemas import CreateAnnouncementRequest, UpdateAnnouncementRequest
 from app.utils.datetime_parser import parse_client_datetime
 from app.utils.permissions import require_permission
+from app.utils.notification_cache import notification_cache
+from app.utils.recurrence import build_rule, rule_ends_at
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -35,14 +41,36 @@ def _serialize(row) -> dict:
         "location_name": row["location_name"],
         "action_url": row["action_url"],
         "action_label": row["action_label"],
+        "recurrence": row["recurrence"],
+        "recurrence_ends_at": _fmt_ts(row["recurrence_ends_at"]),
         "created_by_user_id": str(row["created_by_user_id"]) if row["created_by_user_id"] else None,
         "created_at": _fmt_ts(row["created_at"]),
         "updated_at": _fmt_ts(row["updated_at"]),
     }
 
 
-def _broadcast_to_bell(conn, title: str, message: str) -> None:
-    """Best-effort: inserta una notificacion global de 48h con link al calendario."""
+_ANNOUNCEMENT_COLUMNS = """
+    id, title, description, starts_at, ends_at,
+    location_name, action_url, action_label,
+    recurrence, recurrence_ends_at,
+    created_by_user_id, created_at, updated_at
+"""
+
+
+def _build_recurrence(rule) -> dict | None:
+    if rule is None:
+        return None
+    try:
+        return build_rule(rule.freq, rule.interval, rule.by_weekday, rule.until, rule.count)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _broadcast_to_bell(conn, title: str, message: str) -> bool:
+    """
+    Best-effort: inserta una notificacion global de 48h con link al calendario.
+    Devuelve si la inserto; el caller invalida el cache de la campanita tras el commit.
+    """
     try:
         conn.execute(text("""
             INSERT INTO public.notifications (
@@ -61,8 +89,10 @@ def _broadcast_to_bell(conn, title: str, message: str) -> None:
                 now()
             )
         """), {"title": title, "message": message})
+        return True
     except Exception:
         logger.exception("Failed to broadcast calendar announcement to notifications.")
+        return False
 
 
 @router.get("/calendar/announcements")
@@ -74,11 +104,13 @@ def list_announcements(
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'calendar.view')
 
-        where = "" if include_past else "WHERE starts_at >= now() - interval '7 days'"
+        where = "" if include_past else """
+            WHERE starts_at >= now() - interval '7 days'
+               OR (recurrence IS NOT NULL
+                   AND (recurrence_ends_at IS NULL OR recurrence_ends_at >= now() - interval '7 days'))
+        """
         rows = conn.execute(text(f"""
-            SELECT id, title, description, starts_at, ends_at,
-                   location_name, action_url, action_label,
-                   created_by_user_id, created_at, updated_at
+            SELECT {_ANNOUNCEMENT_COLUMNS}
             FROM public.calendar_announcements
             {where}
             ORDER BY starts_at DESC
@@ -102,24 +134,26 @@ def create_announcement(
     if ends_at and ends_at < starts_at:
         raise HTTPException(status_code=400, detail="ends_at debe ser posterior a starts_at.")
 
+    recurrence = _build_recurrence(body.recurrence)
+
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'calendar.manage')
 
     with engine.begin() as conn:
-        row = conn.execute(text("""
+        row = conn.execute(text(f"""
             INSERT INTO public.calendar_announcements (
                 title, description, starts_at, ends_at,
                 location_name, action_url, action_label,
+                recurrence, recurrence_ends_at,
                 created_by_user_id, created_at, updated_at
             )
             VALUES (
                 :title, :description, :starts_at, :ends_at,
                 :location_name, :action_url, :action_label,
+                CAST(:recurrence AS jsonb), :recurrence_ends_at,
                 :actor_user_id, now(), now()
             )
-            RETURNING id, title, description, starts_at, ends_at,
-                      location_name, action_url, action_label,
-                      created_by_user_id, created_at, updated_at
+            RETURNING {_ANNOUNCEMENT_COLUMNS}
         """), {
             "title": body.title.strip(),
             "description": body.description.strip() if body.description else None,
@@ -128,15 +162,19 @@ def create_announcement(
             "location_name": body.location_name.strip() if body.location_name else None,
             "action_url": body.action_url.strip() if body.action_url else None,
             "action_label": body.action_label.strip() if body.action_label else None,
+            "recurrence": json.dumps(recurrence) if recurrence else None,
+            "recurrence_ends_at": rule_ends_at(recurrence, starts_at) if recurrence else None,
             "actor_user_id": actor_user_id,
         }).mappings().first()
 
-        _broadcast_to_bell(
+        broadcasted = _broadcast_to_bell(
             conn,
             title="Nuevo en el calendario",
             message=row["title"],
         )
 
+    if broadcasted:
+        notification_cache.invalidate_global()
     return _serialize(row)
 
 
@@ -178,6 +216,13 @@ def update_announcement(
         updates.append("action_label = :action_label")
         params["action_label"] = body.action_label.strip() if body.action_label else None
 
+    # recurrence: null explicito la saca; ausente no la toca.
+    recurrence_changed = "recurrence" in body.model_fields_set
+    recurrence = _build_recurrence(body.recurrence)
+    if recurrence_changed:
+        updates.append("recurrence = CAST(:recurrence AS jsonb)")
+        params["recurrence"] = json.dumps(recurrence) if recurrence else None
+
     if not updates:
         raise HTTPException(status_code=400, detail="No se especificaron campos para actualizar.")
 
@@ -191,14 +236,26 @@ def update_announcement(
             UPDATE public.calendar_announcements
             SET {", ".join(updates)}
             WHERE id = :announcement_id
-            RETURNING id, title, description, starts_at, ends_at,
-                      location_name, action_url, action_label,
-                      created_by_user_id, created_at, updated_at
+            RETURNING {_ANNOUNCEMENT_COLUMNS}
         """), params).mappings().first()
 
         if not row:
             raise HTTPException(status_code=404, detail="Anuncio no encontrado.")
 
+        # El fin de la repeticion depende de la regla y de la primera fecha.
+        if recurrence_changed or (starts_at is not None and row["recurrence"]):
+            row = conn.execute(text(f"""
+                UPDATE public.calendar_announcements
+                SET recurrence_ends_at = :recurrence_ends_at
+                WHERE id = :announcement_id
+                RETURNING {_ANNOUNCEMENT_COLUMNS}
+            """), {
+                "announcement_id": announcement_id,
+                "recurrence_ends_at": (
+                    rule_ends_at(row["recurrence"], row["starts_at"]) if row["recurrence"] else None
+                ),
+            }).mappings().first()
+
     return _serialize(row)
 
 
@@ -0,0 +1,402 @@
+"""
+Plantillas de evento: canchas, cupos, capitanes, visibilidad y descripcion guardados una
+vez, para no cargar cada evento semanal a mano (POST /events + un POST por cancha + uno
+por capitan, cada uno con su chequeo de permisos y su transaccion de auditoria).
+
+POST /admin/event-templates/{id}/instantiate crea uno o muchos eventos en una sola
+transaccion: un unico statement con CTEs que inserta eventos, canchas, capitanes y
+auditoria (INSERT ... SELECT multi-fila). Las fechas salen de la lista que manda el
+cliente o de expandir la recurrence de la plantilla en una ventana (app/utils/recurrence.py).
+"""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, HTTPException, Depends
+from app.utils.deps import get_actor_user_id
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.settings import engine
+from app.schemas import EventTemplateRequest, InstantiateEventTemplateRequest
+from app.routers.admin_events import _broadcast_global_event_to_bell, _clean_description
+from app.utils.datetime_parser import parse_client_datetime
+from app.utils.permissions import require_permission, require_permissions
+from app.utils.notification_cache import notification_cache
+from app.utils.recurrence import build_rule, expand
+
+router = APIRouter()
+
+MAX_INSTANCES = 60
+MAX_WINDOW_DAYS = 180
+
+_TEMPLATE_COLUMNS = """
+    id, name, title, description, location_name, visibility, starts_at,
+    close_offset_minutes, recurrence, courts, created_by_user_id, created_at, updated_at
+"""
+
+
+def _fmt_ts(value):
+    return str(value) if value else None
+
+
+def _serialize(row) -> dict:
+    return {
+        "id": str(row["id"]),
+        "name": row["name"],
+        "title": row["title"],
+        "description": row["description"],
+        "location_name": row["location_name"],
+        "visibility": row["visibility"],
+        "starts_at": _fmt_ts(row["starts_at"]),
+        "close_offset_minutes": row["close_offset_minutes"],
+        "recurrence": row["recurrence"],
+        "courts": row["courts"],
+        "created_by_user_id": str(row["created_by_user_id"]) if row["created_by_user_id"] else None,
+        "created_at": _fmt_ts(row["created_at"]),
+        "updated_at": _fmt_ts(row["updated_at"]),
+    }
+
+
+def _template_params(body: EventTemplateRequest) -> dict:
+    try:
+        starts_at = parse_client_datetime(body.starts_at, "starts_at") if body.starts_at else None
+        recurrence = (
+            build_rule(
+                body.recurrence.freq,
+                body.recurrence.interval,
+                body.recurrence.by_weekday,
+                body.recurrence.until,
+                body.recurrence.count,
+            )
+            if body.recurrence else None
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    courts = [
+        {
+            "name": c.name.strip(),
+            "capacity": c.capacity,
+            "sort_order": c.sort_order or i,
+            "is_open": c.is_open,
+            "captain_user_ids": sorted({uid.strip().lower() for uid in c.captain_user_ids}),
+        }
+        for i, c in enumerate(body.courts, start=1)
+    ]
+    return {
+        "name": body.name.strip(),
+        "title": body.title.strip(),
+        "description": _clean_description(body.description),
+        "location_name": body.location_name.strip(),
+        "visibility": body.visibility,
+        "starts_at": starts_at,
+        "close_offset_minutes": body.close_offset_minutes,
+        "recurrence": json.dumps(recurrence) if recurrence else None,
+        "courts": json.dumps(courts),
+    }
+
+
+def _check_captains(conn, courts: list[dict]) -> None:
+    """Los capitanes de la plantilla tienen que existir y estar activos."""
+    ids = sorted({uid for c in courts for uid in c.get("captain_user_ids") or []})
+    if not ids:
+        return
+    try:
+        ids = [str(uuid.UUID(uid)) for uid in ids]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="captain_user_ids invalidos.") from exc
+    active = set(conn.execute(text("""
+        SELECT id::text
+        FROM public.users
+        WHERE id = ANY(CAST(:ids AS uuid[]))
+          AND is_active = true
+    """), {"ids": ids}).scalars().all())
+    missing = [uid for uid in ids if uid not in active]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Capitanes inexistentes o inactivos: {', '.join(missing)}.",
+        )
+
+
+@router.get("/event-templates")
+def list_event_templates(actor_user_id: str = Depends(get_actor_user_id)):
+    with engine.connect() as conn:
+        require_permission(conn, actor_user_id, 'events.create')
+        rows = conn.execute(text(f"""
+            SELECT {_TEMPLATE_COLUMNS}
+            FROM public.event_templates
+            ORDER BY name
+        """)).mappings().all()
+
+    return {"items": [_serialize(r) for r in rows], "count": len(rows)}
+
+
+@router.post("/event-templates")
+def create_event_template(
+    body: EventTemplateRequest,
+    actor_user_id: str = Depends(get_actor_user_id),
+):
+    params = _template_params(body)
+
+    with engine.connect() as conn:
+        require_permission(conn, actor_user_id, 'events.create')
+        _check_captains(conn, json.loads(params["courts"]))
+
+    try:
+        with engine.begin() as conn:
+            row = conn.execute(text(f"""
+                INSERT INTO public.event_templates (
+                    name, title, description, location_name, visibility, starts_at,
+                    close_offset_minutes, recurrence, courts, created_by_user_id,
+                    created_at, updated_at
+                )
+                VALUES (
+                    :name, :title, :description, :location_name, :visibility, :starts_at,
+                    :close_offset_minutes, CAST(:recurrence AS jsonb), CAST(:courts AS jsonb),
+                    :actor_user_id, now(), now()
+                )
+                RETURNING {_TEMPLATE_COLUMNS}
+            """), {**params, "actor_user_id": actor_user_id}).mappings().first()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Ya existe una plantilla con ese nombre.")
+
+    return _serialize(row)
+
+
+@router.put("/event-templates/{template_id}")
+def update_event_template(
+    template_id: str,
+    body: EventTemplateRequest,
+    actor_user_id: str = Depends(get_actor_user_id),
+):
+    """Reemplaza la plantilla entera. Los eventos ya creados no cambian."""
+    params = _template_params(body)
+
+    with engine.connect() as conn:
+        require_permission(conn, actor_user_id, 'events.create')
+        _check_captains(conn, json.loads(params["courts"]))
+
+    try:
+        with engine.begin() as conn:
+            row = conn.execute(text(f"""
+                UPDATE public.event_templates
+                SET name = :name,
+                    title = :title,
+                    description = :description,
+                    location_name = :location_name,
+                    visibility = :visibility,
+                    starts_at = :starts_at,
+                    close_offset_minutes = :close_offset_minutes,
+                    recurrence = CAST(:recurrence AS jsonb),
+                    courts = CAST(:courts AS jsonb),
+                    updated_at = now()
+                WHERE id = :template_id
+                RETURNING {_TEMPLATE_COLUMNS}
+            """), {**params, "template_id": template_id}).mappings().first()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Ya existe una plantilla con ese nombre.")
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Plantilla no encontrada.")
+
+    return _serialize(row)
+
+
+@router.delete("/event-templates/{template_id}")
+def delete_event_template(
+    template_id: str,
+    actor_user_id: str = Depends(get_actor_user_id),
+):
+    """Los eventos creados desde la plantilla quedan (template_id pasa a NULL)."""
+    with engine.connect() as conn:
+        require_permission(conn, actor_user_id, 'events.create')
+
+    with engine.begin() as conn:
+        row = conn.execute(text("""
+            DELETE FROM public.event_templates
+            WHERE id = :template_id
+            RETURNING id
+        """), {"template_id": template_id}).first()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Plantilla no encontrada.")
+
+    return {"template_id": template_id, "message": "Plantilla eliminada."}
+
+
+def _occurrences(template, body: InstantiateEventTemplateRequest) -> list[datetime]:
+    now = datetime.now(timezone.utc)
+    try:
+        if body.starts_at:
+            dates = sorted({parse_client_datetime(v, "starts_at", required=True) for v in body.starts_at})
+        else:
+            win_from = parse_client_datetime(body.window_from, "window_from", required=True)
+            win_to = parse_client_datetime(body.window_to, "window_to", required=True)
+            if win_from >= win_to:
+                raise ValueError("Rango invalido: 'window_from' debe ser anterior a 'window_to'.")
+            if win_to - win_from > timedelta(days=MAX_WINDOW_DAYS):
+                raise ValueError(f"La ventana no puede superar {MAX_WINDOW_DAYS} dias.")
+            if not template["recurrence"]:
+                raise ValueError("La plantilla no tiene recurrence: mandar starts_at explicitos.")
+            dates = expand(template["recurrence"], template["starts_at"], max(win_from, now), win_to)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    if any(d <= now for d in dates):
+        raise HTTPException(status_code=400, detail="Solo se pueden crear eventos futuros.")
+    if not dates:
+        raise HTTPException(status_code=400, detail="No hay fechas para crear en ese rango.")
+    if len(dates) > MAX_INSTANCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se pueden crear como maximo {MAX_INSTANCES} eventos por request.",
+        )
+    return dates
+
+
+# Todo en un statement: eventos (ON CONFLICT saltea fechas ya creadas desde la
+# plantilla), canchas por evento x cancha de la plantilla, capitanes por cancha y la
+# auditoria de las tres cosas. Cada CTE inserta todas sus filas de una vez.
+_INSTANTIATE_SQL = text("""
+    WITH tpl AS (
+        SELECT id, name, title, description, location_name, visibility, courts
+        FROM public.event_templates
+        WHERE id = :template_id
+    ),
+    occ AS (
+        SELECT x.starts_at, x.close_at
+        FROM jsonb_to_recordset(CAST(:occurrences AS jsonb)) AS x(starts_at timestamptz, close_at timestamptz)
+    ),
+    new_events AS (
+        INSERT INTO public.events (
+            title, description, starts_at, location_name, close_at, status, visibility,
+            template_id, created_by_user_id, created_at, updated_at
+        )
+        SELECT tpl.title, tpl.description, occ.starts_at, tpl.location_name, occ.close_at, 'OPEN',
+               tpl.visibility, tpl.id, :actor_user_id, now(), now()
+        FROM tpl
+        CROSS JOIN occ
+        ON CONFLICT (template_id, starts_at) DO NOTHING
+        RETURNING id, starts_at, visibility
+    ),
+    court_specs AS (
+        SELECT c.name, c.capacity, c.sort_order, c.is_open, c.captain_user_ids
+        FROM tpl,
+             jsonb_to_recordset(tpl.courts) AS c(
+                 name text, capacity int, sort_order int, is_open boolean, captain_user_ids jsonb
+             )
+    ),
+    new_courts AS (
+        INSERT INTO public.event_courts (
+            event_id, name, capacity, is_open, sort_order, created_at, updated_at
+        )
+        SELECT e.id, cs.name, cs.capacity, COALESCE(cs.is_open, true), cs.sort_order, now(), now()
+        FROM new_events e
+        CROSS JOIN court_specs cs
+        RETURNING id, event_id, name, capacity
+    ),
+    new_captains AS (
+        INSERT INTO public.event_court_captains (event_id, court_id, user_id, created_at)
+        SELECT nc.event_id, nc.id, cap.user_id::uuid, now()
+        FROM new_courts nc
+        JOIN court_specs cs ON cs.name = nc.name
+        CROSS JOIN LATERAL jsonb_array_elements_text(COALESCE(cs.captain_user_ids, '[]'::jsonb)) AS cap(user_id)
+        RETURNING event_id, court_id, user_id
+    ),
+    audit AS (
+        INSERT INTO public.event_audit_log (event_id, actor_user_id, action, metadata)
+        SELECT e.id, :actor_user_id, 'CREATE_EVENT',
+               jsonb_build_object(
+                   'visibility', e.visibility,
+                   'template_id', tpl.id,
+                   'template_name', tpl.name
+               )
+        FROM new_events e
+        CROSS JOIN tpl
+        UNION ALL
+        SELECT nc.event_id, :actor_user_id, 'CREATE_COURT',
+               jsonb_build_object('court_name', nc.name, 'capacity', nc.capacity)
+        FROM new_courts nc
+        UNION ALL
+        SELECT ncap.event_id, :actor_user_id, 'ASSIGN_CAPTAIN',
+               jsonb_build_object('court_id', ncap.court_id, 'captain_user_id', ncap.user_id)
+        FROM new_captains ncap
+    )
+    SELECT
+        e.id::text AS event_id,
+        e.starts_at,
+        (SELECT COUNT(*) FROM new_courts nc WHERE nc.event_id = e.id) AS courts,
+        (SELECT COUNT(*) FROM new_captains ncap WHERE ncap.event_id = e.id) AS captains
+    FROM new_events e
+    ORDER BY e.starts_at
+""")
+
+
+@router.post("/event-templates/{template_id}/instantiate")
+def instantiate_event_template(
+    template_id: str,
+    body: InstantiateEventTemplateRequest,
+    actor_user_id: str = Depends(get_actor_user_id),
+):
+    """
+    Crea eventos (OPEN) con sus canchas y capitanes desde la plantilla, en una sola
+    transaccion. Requiere los mismos permisos que hacerlo a mano, chequeados una vez.
+    """
+    with engine.connect() as conn:
+        require_permissions(
+            conn, actor_user_id, ('events.create', 'courts.manage', 'courts.captains.manage'),
+        )
+        template = conn.execute(text(f"""
+            SELECT {_TEMPLATE_COLUMNS}
+            FROM public.event_templates
+            WHERE id = :template_id
+        """), {"template_id": template_id}).mappings().first()
+        if not template:
+            raise HTTPException(status_code=404, detail="Plantilla no encontrada.")
+        # Un capitan pudo quedar inactivo desde que se guardo la plantilla.
+        _check_captains(conn, template["courts"])
+
+    dates = _occurrences(template, body)
+    offset = template["close_offset_minutes"]
+    occurrences = [
+        {
+            "starts_at": d.isoformat(),
+            "close_at": (d - timedelta(minutes=offset)).isoformat() if offset is not None else None,
+        }
+        for d in dates
+    ]
+
+    with engine.begin() as conn:
+        created = conn.execute(_INSTANTIATE_SQL, {
+            "template_id": template_id,
+            "occurrences": json.dumps(occurrences),
+            "actor_user_id": actor_user_id,
+        }).mappings().all()
+
+        broadcasted = (
+            bool(created)
+            and template["visibility"] == "GLOBAL"
+            and _broadcast_global_event_to_bell(conn, template["title"])
+        )
+
+    if broadcasted:
+        notification_cache.invalidate_global()
+
+    created_at = {r["starts_at"] for r in created}
+    return {
+        "template_id": template_id,
+        "created": [
+            {
+                "event_id": r["event_id"],
+                "starts_at": str(r["starts_at"]),
+                "courts": r["courts"],
+                "captains": r["captains"],
+            }
+            for r in created
+        ],
+        "skipped": [str(d) for d in dates if d not in created_at],
+        "message": f"{len(created)} evento(s) creados desde '{template['name']}'.",
+    }
@@ -1,6 +1,6 @@
 import json
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from app.utils.deps import get_actor_user_id
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
@@ -15,7 +15,12 @@ from app.schemas import (
     UpdateEventVisibilityRequest,
 )
 from app.utils.datetime_parser import parse_client_datetime
-from app.utils.permissions import require_permission
+from app.utils.permissions import require_permission, require_permissions
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.db import fetch_many
+from app.utils.export import export_response
+from app.utils.inbox import send_to_event
+from app.utils.notification_cache import notification_cache
 
 router = APIRouter()
 
@@ -26,8 +31,11 @@ def _clean_description(value: str | None) -> str | None:
     return cleaned or None
 
 
-def _broadcast_global_event_to_bell(conn, event_title: str) -> None:
-    """Notificacion best-effort cuando un evento se marca como GLOBAL."""
+def _broadcast_global_event_to_bell(conn, event_title: str) -> bool:
+    """
+    Notificacion best-effort cuando un evento se marca como GLOBAL.
+    Devuelve si la inserto; el caller invalida el cache de la campanita tras el commit.
+    """
     try:
         conn.execute(text("""
             INSERT INTO public.notifications (
@@ -46,8 +54,9 @@ def _broadcast_global_event_to_bell(conn, event_title: str) -> None:
                 now()
             )
         """), {"message": event_title})
+        return True
     except Exception:
-        pass
+        return False
 
 
 @router.post("/events")
@@ -117,20 +126,25 @@ def create_event(body: CreateEventRequest, actor_user_id: str = Depends(get_acto
             "metadata": json.dumps({"visibility": event["visibility"]}),
         })
 
-        if event["visibility"] == "GLOBAL":
-            _broadcast_global_event_to_bell(conn, event["title"])
+        broadcasted = (
+            event["visibility"] == "GLOBAL"
+            and _broadcast_global_event_to_bell(conn, event["title"])
+        )
 
-        return {
-            "event_id": str(event["id"]),
-            "title": event["title"],
-            "description": event["description"],
-            "starts_at": str(event["starts_at"]),
-            "location_name": event["location_name"],
-            "status": event["status"],
-            "visibility": event["visibility"],
-            "close_at": str(event["close_at"]) if event["close_at"] else None,
-            "message": f"Evento '{event['title']}' creado exitosamente con estado OPEN."
-        }
+    if broadcasted:
+        notification_cache.invalidate_global()
+
+    return {
+        "event_id": str(event["id"]),
+        "title": event["title"],
+        "description": event["description"],
+        "starts_at": str(event["starts_at"]),
+        "location_name": event["location_name"],
+        "status": event["status"],
+        "visibility": event["visibility"],
+        "close_at": str(event["close_at"]) if event["close_at"] else None,
+        "message": f"Evento '{event['title']}' creado exitosamente con estado OPEN."
+    }
 
 
 @router.patch("/events/{event_id}")
@@ -304,8 +318,13 @@ def update_event_visibility(
             "metadata": json.dumps({"previous": previous, "next": new_visibility}),
         })
 
-        if new_visibility == "GLOBAL" and previous != "GLOBAL":
-            _broadcast_global_event_to_bell(conn, event["title"])
+        broadcasted = (
+            new_visibility == "GLOBAL" and previous != "GLOBAL"
+            and _broadcast_global_event_to_bell(conn, event["title"])
+        )
+
+    if broadcasted:
+        notification_cache.invalidate_global()
 
     return {
         "event_id": event_id,
@@ -318,6 +337,7 @@ def update_event_visibility(
 def open_event(event_id: str, actor_user_id: str = Depends(get_actor_user_id)):
     """
     Abre un evento cerrado o finalizado. Solo admin/super_admin.
+    Si close_at ya paso se borra: si no, auto_close_events lo volveria a cerrar al minuto.
     """
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'events.manage')
@@ -334,9 +354,16 @@ def open_event(event_id: str, actor_user_id: str = Depends(get_actor_user_id)):
             raise HTTPException(status_code=400, detail="El evento ya está abierto.")
 
     with engine.begin() as conn:
+        cleared_close_at = conn.execute(text("""
+            SELECT close_at FROM public.events
+            WHERE id = :event_id AND close_at <= now()
+            FOR UPDATE
+        """), {"event_id": event_id}).scalar()
+
         conn.execute(text("""
             UPDATE public.events
-            SET status = 'OPEN', finalized_at = NULL, updated_at = now()
+            SET status = 'OPEN', finalized_at = NULL, updated_at = now(),
+                close_at = CASE WHEN close_at <= now() THEN NULL ELSE close_at END
             WHERE id = :event_id
         """), {"event_id": event_id})
 
@@ -351,7 +378,10 @@ def open_event(event_id: str, actor_user_id: str = Depends(get_actor_user_id)):
         """), {
             "event_id": event_id,
             "actor_user_id": actor_user_id,
-            "metadata": f'{{"previous_status": "{event["status"]}"}}'
+            "metadata": json.dumps({
+                "previous_status": event["status"],
+                "cleared_close_at": cleared_close_at.isoformat() if cleared_close_at else None,
+            }),
         })
 
     return {"event_id": event_id, "status": "OPEN", "message": "Evento reabierto exitosamente."}
@@ -440,6 +470,20 @@ def finalize_event(event_id: str, actor_user_id: str = Depends(get_actor_user_id
             "metadata": f'{{"previous_status": "{event["status"]}"}}'
         })
 
+        # "Ya podés votar" a los confirmados que participan del ranking (un solo INSERT ... SELECT).
+        notified = send_to_event(
+            conn, event_id,
+            kind="RATINGS_OPEN",
+            title="Ya podés votar",
+            message="Terminó {event}. Calificá a tus compañeros de {court}.",
+            action_url="/ratings/pending-ui",
+            ranking_only=True,
+        )
+
+    # Se abre la votacion para todos los jugadores del evento.
+    notification_cache.invalidate_pending()
+    notification_cache.invalidate_inbox(notified)
+
     return {"event_id": event_id, "status": "FINALIZED", "message": "Evento finalizado (archivado) exitosamente."}
 
 
@@ -927,23 +971,21 @@ def get_event_detail(
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'events.view')
 
-        event = conn.execute(text("""
+        # Las 4 lecturas son independientes: van juntas en un solo viaje a la DB.
+        events, courts, confirmed, waitlist = fetch_many(
+            conn,
+            (text("""
             SELECT id, title, description, starts_at, location_name, status, close_at, visibility
             FROM public.events
             WHERE id = :event_id
-        """), {"event_id": event_id}).mappings().first()
-
-        if not event:
-            raise HTTPException(status_code=404, detail="Evento no encontrado.")
-
-        courts = conn.execute(text("""
+        """), {"event_id": event_id}),
+            (text("""
             SELECT id, name, capacity, is_open, sort_order
             FROM public.event_courts
             WHERE event_id = :event_id
             ORDER BY sort_order ASC
-        """), {"event_id": event_id}).mappings().all()
-
-        confirmed = conn.execute(text("""
+        """), {"event_id": event_id}),
+            (text("""
             SELECT
               r.id AS registration_id,
               r.court_id,
@@ -962,9 +1004,8 @@ def get_event_detail(
               AND r.status = 'CONFIRMED'
               AND r.court_id IS NOT NULL
             ORDER BY r.created_at ASC
-        """), {"event_id": event_id}).mappings().all()
-
-        waitlist = conn.execute(text("""
+        """), {"event_id": event_id}),
+            (text("""
             SELECT
               r.id AS registration_id,
               r.registration_type,
@@ -982,7 +1023,12 @@ def get_event_detail(
               AND r.status = 'WAITLIST'
               AND r.court_id IS NULL
             ORDER BY r.created_at ASC
-        """), {"event_id": event_id}).mappings().all()
+        """), {"event_id": event_id}),
+        )
+
+        if not events:
+            raise HTTPException(status_code=404, detail="Evento no encontrado.")
+        event = events[0]
 
         confirmed_by_court = {}
         for r in confirmed:
@@ -1043,51 +1089,206 @@ def list_events(
     actor_user_id: str = Depends(get_actor_user_id),
     status: str | None = None,
     include_finalized: bool = False,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
 ):
     """
     Lista todos los eventos. Solo admin/super_admin.
     Opcionalmente filtra por status.
     Por defecto excluye eventos FINALIZED (salvo que se pida explícitamente).
+
+    Cada evento trae `counts` (canchas, cupo total, confirmados, lista de espera,
+    invitados) calculados en la misma query, asi el panel no pide el detalle de
+    cada evento para mostrar que tan lleno esta.
+    Paginacion keyset por (starts_at, id) descendente: para la siguiente pagina,
+    pasar `cursor=next_cursor`.
+    """
+    where_conditions = []
+    params = {"sql_limit": limit + 1}
+
+    if status:
+        where_conditions.append("e.status = :status")
+        params["status"] = status
+    elif not include_finalized:
+        where_conditions.append("e.status != 'FINALIZED'")
+
+    if cursor:
+        cursor_starts_at, cursor_id = decode_cursor(cursor)
+        # El <= sobre starts_at usa el indice; la tupla desempata eventos a la misma hora.
+        where_conditions.append("e.starts_at <= :cursor_starts_at")
+        where_conditions.append("(e.starts_at, e.id) < (:cursor_starts_at, CAST(:cursor_id AS uuid))")
+        params["cursor_starts_at"] = cursor_starts_at
+        params["cursor_id"] = cursor_id
+
+    where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+    # Los agregados se calculan solo para los eventos de la pagina (LATERAL despues del LIMIT).
+    query = f"""
+        WITH page AS (
+            SELECT e.id, e.title, e.description, e.starts_at, e.location_name, e.status,
+                   e.visibility, e.close_at, e.created_at
+            FROM public.events e
+            {where_clause}
+            ORDER BY e.starts_at DESC, e.id DESC
+            LIMIT :sql_limit
+        )
+        SELECT p.*,
+               COALESCE(c.courts, 0) AS courts,
+               COALESCE(c.capacity_total, 0) AS capacity_total,
+               COALESCE(r.confirmed, 0) AS confirmed,
+               COALESCE(r.waitlist, 0) AS waitlist,
+               COALESCE(r.guests, 0) AS guests
+        FROM page p
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS courts,
+                   SUM(ec.capacity) AS capacity_total
+            FROM public.event_courts ec
+            WHERE ec.event_id = p.id
+        ) c ON true
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) FILTER (WHERE er.status = 'CONFIRMED' AND er.court_id IS NOT NULL) AS confirmed,
+                   COUNT(*) FILTER (WHERE er.status = 'WAITLIST') AS waitlist,
+                   COUNT(*) FILTER (WHERE er.registration_type = 'GUEST') AS guests
+            FROM public.event_registrations er
+            WHERE er.event_id = p.id
+              AND er.status IN ('CONFIRMED', 'WAITLIST')
+        ) r ON true
+        ORDER BY p.starts_at DESC, p.id DESC
     """
+
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'events.view')
+        rows = conn.execute(text(query), params).mappings().all()
 
-        where_conditions = []
-        params = {"limit": limit}
+    has_more = len(rows) > limit
+    events = rows[:limit]
 
-        if status:
-            where_conditions.append("status = :status")
-            params["status"] = status
-        elif not include_finalized:
-            where_conditions.append("status != 'FINALIZED'")
+    return {
+        "events": [
+            {
+                "id": str(e["id"]),
+                "title": e["title"],
+                "description": e["description"],
+                "starts_at": str(e["starts_at"]),
+                "location_name": e["location_name"],
+                "status": e["status"],
+                "visibility": e["visibility"],
+                "close_at": str(e["close_at"]) if e["close_at"] else None,
+                "created_at": str(e["created_at"]),
+                "counts": {
+                    "courts": e["courts"],
+                    "capacity_total": e["capacity_total"],
+                    "confirmed": e["confirmed"],
+                    "waitlist": e["waitlist"],
+                    "guests": e["guests"],
+                },
+            }
+            for e in events
+        ],
+        "count": len(events),
+        "has_more": has_more,
+        "next_cursor": encode_cursor(events[-1]["starts_at"], events[-1]["id"]) if has_more else None,
+    }
 
-        where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
 
-        query = f"""
-            SELECT id, title, description, starts_at, location_name, status, visibility, close_at, created_at
-            FROM public.events
-            {where_clause}
-            ORDER BY starts_at DESC
-            LIMIT :limit
-        """
+REGISTRATION_EXPORT_COLUMNS = [
+    "registration_id", "event_id", "event_title", "court_id", "court_name",
+    "status", "type", "user_id", "name", "created_at", "updated_at",
+    "created_by_user_id", "created_by_name",
+]
 
-        events = conn.execute(text(query), params).mappings().all()
 
-        return {
-            "events": [
-                {
-                    "id": str(e["id"]),
-                    "title": e["title"],
-                    "description": e["description"],
-                    "starts_at": str(e["starts_at"]),
-                    "location_name": e["location_name"],
-                    "status": e["status"],
-                    "visibility": e["visibility"],
-                    "close_at": str(e["close_at"]) if e["close_at"] else None,
-                    "created_at": str(e["created_at"])
-                }
-                for e in events
-            ],
-            "count": len(events)
-        }
+def _registration_export_row(r) -> dict:
+    return {
+        "registration_id": str(r["registration_id"]),
+        "event_id": str(r["event_id"]),
+        "event_title": r["event_title"],
+        "court_id": str(r["court_id"]) if r["court_id"] else None,
+        "court_name": r["court_name"],
+        "status": r["status"],
+        "type": r["registration_type"],
+        "user_id": str(r["user_id"]) if r["user_id"] else None,
+        "name": r["user_full_name"] if r["registration_type"] == "USER" else r["guest_name"],
+        "created_at": str(r["created_at"]),
+        "updated_at": str(r["updated_at"]) if r["updated_at"] else None,
+        "created_by_user_id": str(r["created_by_user_id"]) if r["created_by_user_id"] else None,
+        "created_by_name": r["created_by_full_name"],
+    }
+
+
+@router.get("/registrations/export")
+def export_registrations(
+    actor_user_id: str = Depends(get_actor_user_id),
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    event_id: str | None = None,
+    status: str | None = Query(default=None, pattern="^(CONFIRMED|WAITLIST|CANCELLED)$"),
+    from_: str | None = Query(default=None, alias="from"),
+    to: str | None = Query(default=None),
+):
+    """
+    Export de inscripciones (planteles) en NDJSON o CSV, en streaming con cursor
+    server-side. Filtros: evento, status y rango de created_at (from/to, como en
+    /admin/audit). Es el padron completo con nombres: ademas de events.view pide
+    registrations.manage (admin lo tiene; super_admin siempre).
+    """
+    try:
+        from_dt = parse_client_datetime(from_, "from") if from_ else None
+        to_dt = parse_client_datetime(to, "to") if to else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    where_conditions = []
+    params = {}
+
+    if event_id:
+        where_conditions.append("r.event_id = :event_id")
+        params["event_id"] = event_id
+
+    if status:
+        where_conditions.append("r.status = :status")
+        params["status"] = status
+
+    if from_dt:
+        where_conditions.append("r.created_at >= :from_dt")
+        params["from_dt"] = from_dt
+
+    if to_dt:
+        where_conditions.append("r.created_at < :to_dt")
+        params["to_dt"] = to_dt
+
+    where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+    with engine.connect() as conn:
+        require_permissions(conn, actor_user_id, ('events.view', 'registrations.manage'))
+
+    return export_response(
+        text(f"""
+            SELECT
+              r.id AS registration_id,
+              r.event_id,
+              e.title AS event_title,
+              r.court_id,
+              c.name AS court_name,
+              r.status,
+              r.registration_type,
+              r.user_id,
+              r.guest_name,
+              r.created_at,
+              r.updated_at,
+              r.created_by_user_id,
+              u.full_name AS user_full_name,
+              cb.full_name AS created_by_full_name
+            FROM public.event_registrations r
+            JOIN public.events e ON e.id = r.event_id
+            LEFT JOIN public.event_courts c ON c.id = r.court_id
+            LEFT JOIN public.users u ON u.id = r.user_id
+            LEFT JOIN public.users cb ON cb.id = r.created_by_user_id
+            {where_clause}
+            ORDER BY r.event_id, r.created_at ASC, r.id ASC
+        """),
+        params,
+        serialize=_registration_export_row,
+        columns=REGISTRATION_EXPORT_COLUMNS,
+        fmt=fmt,
+        filename="registrations",
+    )
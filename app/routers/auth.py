@@ -28,6 +28,7 @@ from app.utils.permissions import get_effective_permissions
 from app.utils.auth_token import issue_token
 from app.utils.deps import get_actor_user_id
 from app.utils.ratelimit import rate_limit, client_ip
+from app.utils.notification_cache import notification_cache
 
 router = APIRouter()
 
@@ -499,6 +500,10 @@ def update_profile(
             where id = :id
         """), params)
 
+    # El opt-in cambia los votos pendientes de todos sus compañeros de cancha.
+    if body.ranking_opt_in is not None:
+        notification_cache.invalidate_pending()
+
     # Devolver usuario actualizado
     return me(actor_user_id)
 
@@ -7,21 +7,35 @@ Junta en un solo endpoint:
 - Partidos de torneo donde el jugador es miembro de un equipo
 - Anuncios informativos del admin
 
-Estrategia: una sola query con UNION ALL de sub-queries tipadas, ordenada por starts_at.
+Estrategia: read model materializado (migrations/025), mantenido por triggers:
+calendar_items (una fila por evento/partido/anuncio, con el cupo del evento) +
+calendar_user_items (overlay por usuario). El endpoint es un range scan por
+(user_id, starts_at) mas los items globales del rango, en un solo viaje.
+Los anuncios que se repiten se expanden al leer, solo dentro de la ventana.
 day_label se calcula en TZ Buenos Aires para que el agrupamiento por dia sea consistente
 independientemente del browser del usuario.
+
+GET /me/calendar.ics sirve los mismos items como feed ICS para las apps de calendario,
+autenticado con un token propio en la URL (POST/DELETE /me/calendar/feed-token).
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
 import logging
+import secrets
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from app.utils.deps import get_actor_user_id
 from sqlalchemy import text
 
 from app.settings import engine
+from app.utils.calendar_feed import calendar_feed_cache, render_feed
 from app.utils.datetime_parser import parse_client_datetime, APP_TZ, UTC_TZ
 from app.utils.permissions import require_admin
+from app.utils.db import fetch_many
+from app.utils.recurrence import expand_cached
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -59,16 +73,158 @@ def _day_label(starts_at_utc: datetime, today_ar: datetime) -> str:
     return f"{wd} {local.day} {mo}"
 
 
-def _is_admin(conn, user_id: str) -> bool:
-    row = conn.execute(text("""
-        SELECT 1
-        FROM public.user_roles ur
-        JOIN public.roles r ON r.id = ur.role_id
-        WHERE ur.user_id = :uid
-          AND LOWER(r.code) IN ('admin', 'super_admin')
-        LIMIT 1
-    """), {"uid": user_id}).first()
-    return bool(row)
+_IS_ADMIN_QUERY = text("""
+    SELECT 1
+    FROM public.user_roles ur
+    JOIN public.roles r ON r.id = ur.role_id
+    WHERE ur.user_id = :uid
+      AND LOWER(r.code) IN ('admin', 'super_admin')
+    LIMIT 1
+""")
+
+
+# Read model de migrations/025 (lo mantienen triggers sobre las tablas fuente):
+# - calendar_user_items: lo mio (inscripcion/cancha, equipo), range scan por
+#   (user_id, starts_at), unido a la fila compartida de calendar_items.
+# - calendar_items globales (eventos GLOBAL, anuncios) del rango que no esten ya en lo mio.
+# Los contadores de cupo vienen en la fila compartida del evento.
+_CALENDAR_ITEMS_QUERY = text("""
+    SELECT *
+    FROM (
+        SELECT
+            ci.item_type,
+            ci.source_id::text AS source_id,
+            ci.title,
+            COALESCE(cu.court_name, ci.subtitle) AS subtitle,
+            ci.starts_at,
+            ci.ends_at,
+            ci.location_name,
+            ci.raw_status,
+            cu.registration_id::text AS registration_id,
+            cu.registration_status,
+            cu.court_id::text AS court_id,
+            cu.court_name,
+            ci.visibility,
+            ci.tournament_id::text AS tournament_id,
+            ci.tournament_name,
+            cu.team_id::text AS team_id,
+            cu.team_name,
+            ci.description,
+            ci.action_url,
+            ci.action_label,
+            ci.capacity_total,
+            ci.occupied_total
+        FROM public.calendar_user_items cu
+        JOIN public.calendar_items ci
+          ON ci.item_type = cu.item_type AND ci.source_id = cu.source_id
+        WHERE cu.user_id = :uid
+          AND cu.starts_at >= :win_from
+          AND cu.starts_at < :win_to
+
+        UNION ALL
+
+        SELECT
+            ci.item_type,
+            ci.source_id::text,
+            ci.title,
+            ci.subtitle,
+            ci.starts_at,
+            ci.ends_at,
+            ci.location_name,
+            ci.raw_status,
+            NULL::text,
+            NULL::text,
+            NULL::text,
+            NULL::text,
+            ci.visibility,
+            ci.tournament_id::text,
+            ci.tournament_name,
+            NULL::text,
+            NULL::text,
+            ci.description,
+            ci.action_url,
+            ci.action_label,
+            ci.capacity_total,
+            ci.occupied_total
+        FROM public.calendar_items ci
+        WHERE ci.is_global
+          AND ci.starts_at >= :win_from
+          AND ci.starts_at < :win_to
+          AND NOT EXISTS (
+              SELECT 1
+              FROM public.calendar_user_items cu2
+              WHERE cu2.user_id = :uid
+                AND cu2.item_type = ci.item_type
+                AND cu2.source_id = ci.source_id
+          )
+    ) u
+    ORDER BY starts_at ASC, item_type ASC
+    LIMIT :limit
+""")
+
+
+# Anuncios que se repiten (migrations/027): no estan en calendar_items, se expanden en
+# Python dentro de la ventana. Son pocas filas: recurrence_ends_at descarta las vencidas.
+_RECURRING_ANNOUNCEMENTS_QUERY = text("""
+    SELECT
+        a.id::text AS source_id,
+        a.title,
+        a.description,
+        a.starts_at,
+        a.ends_at,
+        a.location_name,
+        a.action_url,
+        a.action_label,
+        a.recurrence
+    FROM public.calendar_announcements a
+    WHERE a.recurrence IS NOT NULL
+      AND a.starts_at < :win_to
+      AND (a.recurrence_ends_at IS NULL OR a.recurrence_ends_at >= :win_from)
+""")
+
+
+def _expand_recurring(rows, win_from: datetime, win_to: datetime) -> list[dict]:
+    """Una fila por ocurrencia, con las mismas columnas que _CALENDAR_ITEMS_QUERY."""
+    out = []
+    for a in rows:
+        duration = a["ends_at"] - a["starts_at"] if a["ends_at"] else None
+        for occ in expand_cached(a["recurrence"], a["starts_at"], win_from, win_to):
+            out.append({
+                "item_type": "announcement",
+                "source_id": a["source_id"],
+                "title": a["title"],
+                "subtitle": "",
+                "starts_at": occ,
+                "ends_at": occ + duration if duration is not None else None,
+                "location_name": a["location_name"],
+                "raw_status": None,
+                "registration_id": None,
+                "registration_status": None,
+                "court_id": None,
+                "court_name": None,
+                "visibility": None,
+                "tournament_id": None,
+                "tournament_name": None,
+                "team_id": None,
+                "team_name": None,
+                "description": a["description"],
+                "action_url": a["action_url"],
+                "action_label": a["action_label"],
+                "capacity_total": 0,
+                "occupied_total": 0,
+                "recurring": True,
+            })
+    return out
+
+
+def _merge_items(rows, recurring_rows, win_from: datetime, win_to: datetime, limit: int) -> list:
+    """Items del read model + ocurrencias de anuncios recurrentes, ordenados y recortados."""
+    occurrences = _expand_recurring(recurring_rows, win_from, win_to)
+    if not occurrences:
+        return rows
+    merged = list(rows) + occurrences
+    merged.sort(key=lambda r: (r["starts_at"], r["item_type"]))
+    return merged[:limit]
 
 
 @router.get("/me/calendar")
@@ -113,211 +269,28 @@ def get_my_calendar(
         "limit": limit,
     }
 
-    # Una sola query con UNION ALL.
-    # Cada sub-query produce el mismo set de columnas tipadas.
-    # Notas:
-    # - Para eventos, usamos starts_at del evento. Excluimos FINALIZED.
-    # - Para partidos de torneo, usamos COALESCE(started_at, tournaments.starts_at).
-    #   Excluimos torneos DRAFT/ARCHIVED y matches sin ninguna fecha.
-    # - Para anuncios, usamos starts_at directo.
-    sql = text("""
-        WITH my_teams AS (
-            SELECT team_id
-            FROM public.tournament_team_members
-            WHERE user_id = :uid
-              AND member_type = 'USER'
-        ),
-        my_event_regs AS (
-            -- Eventos donde el jugador esta anotado o en waitlist (no cancelados)
-            SELECT
-                'event'::text AS item_type,
-                e.id::text AS source_id,
-                e.title AS title,
-                COALESCE(c.name, '') AS subtitle,
-                e.starts_at AS starts_at,
-                NULL::timestamptz AS ends_at,
-                e.location_name AS location_name,
-                e.status AS raw_status,
-                r.id::text AS registration_id,
-                r.status AS registration_status,
-                c.id::text AS court_id,
-                c.name AS court_name,
-                e.visibility AS visibility,
-                NULL::text AS tournament_id,
-                NULL::text AS tournament_name,
-                NULL::text AS team_id,
-                NULL::text AS team_name,
-                e.description AS description,
-                NULL::text AS action_url,
-                NULL::text AS action_label
-            FROM public.event_registrations r
-            JOIN public.events e ON e.id = r.event_id
-            LEFT JOIN public.event_courts c ON c.id = r.court_id
-            WHERE r.user_id = :uid
-              AND r.registration_type = 'USER'
-              AND r.status IN ('CONFIRMED', 'WAITLIST')
-              AND e.starts_at >= :win_from
-              AND e.starts_at < :win_to
-        ),
-        global_events AS (
-            -- Eventos GLOBAL visibles para todos los que NO esten ya en my_event_regs
-            SELECT
-                'event'::text AS item_type,
-                e.id::text AS source_id,
-                e.title AS title,
-                ''::text AS subtitle,
-                e.starts_at AS starts_at,
-                NULL::timestamptz AS ends_at,
-                e.location_name AS location_name,
-                e.status AS raw_status,
-                NULL::text AS registration_id,
-                NULL::text AS registration_status,
-                NULL::text AS court_id,
-                NULL::text AS court_name,
-                e.visibility AS visibility,
-                NULL::text AS tournament_id,
-                NULL::text AS tournament_name,
-                NULL::text AS team_id,
-                NULL::text AS team_name,
-                e.description AS description,
-                NULL::text AS action_url,
-                NULL::text AS action_label
-            FROM public.events e
-            WHERE e.visibility = 'GLOBAL'
-              AND e.starts_at >= :win_from
-              AND e.starts_at < :win_to
-              AND NOT EXISTS (
-                  SELECT 1
-                  FROM public.event_registrations r2
-                  WHERE r2.event_id = e.id
-                    AND r2.user_id = :uid
-                    AND r2.registration_type = 'USER'
-                    AND r2.status IN ('CONFIRMED', 'WAITLIST')
-              )
-        ),
-        my_tournament_matches AS (
-            SELECT
-                'tournament_match'::text AS item_type,
-                m.id::text AS source_id,
-                CONCAT(COALESCE(ht.name, '?'), ' vs ', COALESCE(at.name, '?')) AS title,
-                t.title AS subtitle,
-                COALESCE(m.started_at, t.starts_at) AS starts_at,
-                m.ended_at AS ends_at,
-                t.location_name AS location_name,
-                m.status AS raw_status,
-                NULL::text AS registration_id,
-                NULL::text AS registration_status,
-                NULL::text AS court_id,
-                NULL::text AS court_name,
-                NULL::text AS visibility,
-                t.id::text AS tournament_id,
-                t.title AS tournament_name,
-                CASE
-                    WHEN ht.id IN (SELECT team_id FROM my_teams) THEN ht.id::text
-                    WHEN at.id IN (SELECT team_id FROM my_teams) THEN at.id::text
-                    ELSE NULL
-                END AS team_id,
-                CASE
-                    WHEN ht.id IN (SELECT team_id FROM my_teams) THEN ht.name
-                    WHEN at.id IN (SELECT team_id FROM my_teams) THEN at.name
-                    ELSE NULL
-                END AS team_name,
-                NULL::text AS description,
-                NULL::text AS action_url,
-                NULL::text AS action_label
-            FROM public.tournament_matches m
-            JOIN public.tournaments t ON t.id = m.tournament_id
-            LEFT JOIN public.tournament_teams ht ON ht.id = m.home_team_id
-            LEFT JOIN public.tournament_teams at ON at.id = m.away_team_id
-            WHERE t.status IN ('LIVE', 'FINISHED')
-              AND m.home_team_id IS NOT NULL
-              AND m.away_team_id IS NOT NULL
-              AND (
-                   m.home_team_id IN (SELECT team_id FROM my_teams)
-                OR m.away_team_id IN (SELECT team_id FROM my_teams)
-              )
-              AND COALESCE(m.started_at, t.starts_at) IS NOT NULL
-              AND COALESCE(m.started_at, t.starts_at) >= :win_from
-              AND COALESCE(m.started_at, t.starts_at) < :win_to
-        ),
-        announcements AS (
-            SELECT
-                'announcement'::text AS item_type,
-                a.id::text AS source_id,
-                a.title AS title,
-                ''::text AS subtitle,
-                a.starts_at AS starts_at,
-                a.ends_at AS ends_at,
-                a.location_name AS location_name,
-                NULL::text AS raw_status,
-                NULL::text AS registration_id,
-                NULL::text AS registration_status,
-                NULL::text AS court_id,
-                NULL::text AS court_name,
-                NULL::text AS visibility,
-                NULL::text AS tournament_id,
-                NULL::text AS tournament_name,
-                NULL::text AS team_id,
-                NULL::text AS team_name,
-                a.description AS description,
-                a.action_url AS action_url,
-                a.action_label AS action_label
-            FROM public.calendar_announcements a
-            WHERE a.starts_at >= :win_from
-              AND a.starts_at < :win_to
-        )
-        SELECT *
-        FROM (
-            SELECT * FROM my_event_regs
-            UNION ALL
-            SELECT * FROM global_events
-            UNION ALL
-            SELECT * FROM my_tournament_matches
-            UNION ALL
-            SELECT * FROM announcements
-        ) u
-        ORDER BY starts_at ASC, item_type ASC
-        LIMIT :limit
+    captains_sql = text("""
+        SELECT DISTINCT ecc.event_id::text AS event_id
+        FROM public.event_court_captains ecc
+        JOIN public.calendar_items ci
+          ON ci.item_type = 'event' AND ci.source_id = ecc.event_id
+        WHERE ecc.user_id = :uid
+          AND ci.starts_at >= :win_from
+          AND ci.starts_at < :win_to
     """)
 
     with engine.connect() as conn:
-        rows = conn.execute(sql, params).mappings().all()
-
-        # Capacidades de eventos en una sola query auxiliar (para badge "cupo lleno").
-        event_ids = {r["source_id"] for r in rows if r["item_type"] == "event"}
-        counts_by_event: dict[str, dict] = {}
-        if event_ids:
-            cap_rows = conn.execute(text("""
-                SELECT
-                    e.id::text AS event_id,
-                    COALESCE(SUM(c.capacity), 0)::int AS capacity_total,
-                    COALESCE((
-                        SELECT COUNT(*) FROM public.event_registrations r
-                        WHERE r.event_id = e.id AND r.status = 'CONFIRMED' AND r.court_id IS NOT NULL
-                    ), 0)::int AS occupied_total
-                FROM public.events e
-                LEFT JOIN public.event_courts c ON c.event_id = e.id AND c.is_open = true
-                WHERE e.id = ANY(CAST(:ids AS uuid[]))
-                GROUP BY e.id
-            """), {"ids": list(event_ids)}).mappings().all()
-            for cr in cap_rows:
-                counts_by_event[cr["event_id"]] = {
-                    "capacity_total": cr["capacity_total"],
-                    "occupied_total": cr["occupied_total"],
-                }
-
-        # Captaincias (badge "Capitan") para los eventos del usuario.
-        captain_event_ids: set[str] = set()
-        if event_ids:
-            cap_event_rows = conn.execute(text("""
-                SELECT DISTINCT event_id::text AS event_id
-                FROM public.event_court_captains
-                WHERE user_id = :uid
-                  AND event_id = ANY(CAST(:ids AS uuid[]))
-            """), {"uid": actor_user_id, "ids": list(event_ids)}).mappings().all()
-            captain_event_ids = {r["event_id"] for r in cap_event_rows}
-
-        is_admin = _is_admin(conn, actor_user_id)
+        # Agenda, anuncios recurrentes, rol admin y capitanías (badge "Capitan") en un solo viaje.
+        rows, recurring_rows, admin_rows, cap_event_rows = fetch_many(
+            conn,
+            (_CALENDAR_ITEMS_QUERY, params),
+            (_RECURRING_ANNOUNCEMENTS_QUERY, params),
+            (_IS_ADMIN_QUERY, {"uid": actor_user_id}),
+            (captains_sql, params),
+        )
+    rows = _merge_items(rows, recurring_rows, window_from, window_to, limit)
+    is_admin = bool(admin_rows)
+    captain_event_ids = {r["event_id"] for r in cap_event_rows}
 
     items = []
     for r in rows:
@@ -344,7 +317,7 @@ def get_my_calendar(
 
         if item_type == "event":
             event_id = r["source_id"]
-            counts = counts_by_event.get(event_id) or {"capacity_total": 0, "occupied_total": 0}
+            counts = {"capacity_total": r["capacity_total"], "occupied_total": r["occupied_total"]}
             item["counts"] = counts
             item["description"] = r["description"]
             item["is_global"] = (r["visibility"] == "GLOBAL")
@@ -408,6 +381,7 @@ def get_my_calendar(
 
         elif item_type == "announcement":
             item["description"] = r["description"]
+            item["recurring"] = bool(r.get("recurring"))
             if r["action_url"]:
                 item["cta"] = {
                     "kind": "external",
@@ -427,3 +401,197 @@ def get_my_calendar(
             "include_past": include_past,
         },
     }
+
+
+# =========================
+# Feed ICS
+# =========================
+
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 90
+FEED_LIMIT = 500
+
+# Valida el token y resume la ventana (cantidad + updated_at mas nuevo) sin traer los
+# items: alcanza para el ETag, y la mayoria de los polls terminan en 304.
+_FEED_STATE_QUERY = text("""
+    WITH feed AS (
+        SELECT user_id, feed_etag, feed_modified_at
+        FROM public.calendar_feed_tokens
+        WHERE token_hash = :token_hash
+    ),
+    stamps AS (
+        SELECT GREATEST(ci.updated_at, cu.updated_at) AS updated_at
+        FROM feed f
+        JOIN public.calendar_user_items cu ON cu.user_id = f.user_id
+        JOIN public.calendar_items ci
+          ON ci.item_type = cu.item_type AND ci.source_id = cu.source_id
+        WHERE cu.starts_at >= :win_from
+          AND cu.starts_at < :win_to
+
+        UNION ALL
+
+        SELECT ci.updated_at
+        FROM feed f
+        JOIN public.calendar_items ci ON ci.is_global
+        WHERE ci.starts_at >= :win_from
+          AND ci.starts_at < :win_to
+          AND NOT EXISTS (
+              SELECT 1
+              FROM public.calendar_user_items cu2
+              WHERE cu2.user_id = f.user_id
+                AND cu2.item_type = ci.item_type
+                AND cu2.source_id = ci.source_id
+          )
+
+        UNION ALL
+
+        SELECT a.updated_at
+        FROM feed f
+        JOIN public.calendar_announcements a ON a.recurrence IS NOT NULL
+        WHERE a.starts_at < :win_to
+          AND (a.recurrence_ends_at IS NULL OR a.recurrence_ends_at >= :win_from)
+    )
+    SELECT
+        (SELECT user_id::text FROM feed) AS user_id,
+        (SELECT feed_etag FROM feed) AS feed_etag,
+        (SELECT feed_modified_at FROM feed) AS feed_modified_at,
+        (SELECT COUNT(*) FROM stamps) AS item_count,
+        (SELECT MAX(updated_at) FROM stamps) AS last_modified
+""")
+
+
+def _hash_feed_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+_TOUCH_FEED_ETAG = text("""
+    UPDATE public.calendar_feed_tokens
+    SET feed_etag = :etag, feed_modified_at = now()
+    WHERE user_id = :uid
+    RETURNING feed_modified_at
+""")
+
+
+def _http_date(value: datetime) -> str:
+    # usegmt exige timezone.utc; ZoneInfo("UTC") no le sirve.
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """
+    last_modified tiene que ser el momento desde el que se sirve este mismo ETag (None si
+    cambio): If-Modified-Since solo se respeta si coincide con el ETag actual.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+@router.post("/me/calendar/feed-token")
+def rotate_calendar_feed_token(actor_user_id: str = Depends(get_actor_user_id)):
+    """
+    Genera (o rota) el token de la URL de suscripcion. El token solo se muestra ahora;
+    la URL anterior deja de funcionar.
+    """
+    token = secrets.token_urlsafe(24)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO public.calendar_feed_tokens (user_id, token_hash, created_at)
+            VALUES (:uid, :token_hash, now())
+            ON CONFLICT (user_id) DO UPDATE
+            SET token_hash = EXCLUDED.token_hash,
+                created_at = EXCLUDED.created_at
+        """), {"uid": actor_user_id, "token_hash": _hash_feed_token(token)})
+    calendar_feed_cache.invalidate(actor_user_id)
+    return {"ok": True, "token": token, "url": f"/me/calendar.ics?token={token}"}
+
+
+@router.delete("/me/calendar/feed-token")
+def revoke_calendar_feed_token(actor_user_id: str = Depends(get_actor_user_id)):
+    """Da de baja la URL de suscripcion."""
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM public.calendar_feed_tokens WHERE user_id = :uid"),
+            {"uid": actor_user_id},
+        )
+    calendar_feed_cache.invalidate(actor_user_id)
+    return {"ok": True}
+
+
+@router.get("/me/calendar.ics")
+def get_my_calendar_feed(
+    request: Request,
+    token: str = Query(..., min_length=16, max_length=128),
+):
+    """
+    Feed ICS con los items de Mi Calendario: ultimos FEED_PAST_DAYS dias y proximos
+    FEED_FUTURE_DAYS. El ETag sale de la cantidad de items y del updated_at mas nuevo del
+    read model (migrations/025): si no cambio nada responde 304 con una sola query chica.
+    Last-Modified es desde cuando se sirve ese ETag (calendar_feed_tokens.feed_modified_at),
+    asi un item borrado tambien lo cambia. Si cambio, el feed se genera en streaming y
+    queda cacheado por usuario.
+    """
+    today_start_utc = (
+        datetime.now(APP_TZ).replace(hour=0, minute=0, second=0, microsecond=0).astimezone(UTC_TZ)
+    )
+    params = {
+        "token_hash": _hash_feed_token(token),
+        "win_from": today_start_utc - timedelta(days=FEED_PAST_DAYS),
+        "win_to": today_start_utc + timedelta(days=FEED_FUTURE_DAYS),
+    }
+
+    with engine.connect() as conn:
+        state = conn.execute(_FEED_STATE_QUERY, params).mappings().one()
+    user_id = state["user_id"]
+    if not user_id:
+        raise HTTPException(status_code=404, detail="Calendario no encontrado.")
+
+    last_modified = state["last_modified"]
+    # La ventana corre con el dia: entra en el ETag aunque no cambie ningun item.
+    etag = '"' + hashlib.sha1(
+        f"{user_id}|{state['item_count']}|{last_modified}|{params['win_from'].date()}".encode()
+    ).hexdigest() + '"'
+    served_since = state["feed_modified_at"] if state["feed_etag"] == etag else None
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if served_since is not None:
+        headers["Last-Modified"] = _http_date(served_since)
+
+    if _not_modified(request, etag, served_since):
+        return Response(status_code=304, headers=headers)
+
+    if served_since is None:
+        # Primer request con este ETag: desde ahora es el Last-Modified del feed.
+        with engine.begin() as conn:
+            served_since = conn.execute(_TOUCH_FEED_ETAG, {"etag": etag, "uid": user_id}).scalar()
+        if served_since is not None:  # None: el token se roto/borro en el medio
+            headers["Last-Modified"] = _http_date(served_since)
+
+    media_type = "text/calendar; charset=utf-8"
+    headers["Content-Disposition"] = 'inline; filename="mi-calendario.ics"'
+    cached = calendar_feed_cache.get(user_id, etag)
+    if cached is not None:
+        return Response(content=cached, media_type=media_type, headers=headers)
+
+    items_params = {**params, "uid": user_id, "limit": FEED_LIMIT}
+    with engine.connect() as conn:
+        rows, recurring_rows = fetch_many(
+            conn,
+            (_CALENDAR_ITEMS_QUERY, items_params),
+            (_RECURRING_ANNOUNCEMENTS_QUERY, items_params),
+        )
+    rows = _merge_items(rows, recurring_rows, params["win_from"], params["win_to"], FEED_LIMIT)
+
+    return StreamingResponse(
+        calendar_feed_cache.caching(user_id, etag, render_feed(rows, last_modified)),
+        media_type=media_type,
+        headers=headers,
+    )
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+import json
+
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 from app.utils.deps import get_actor_user_id
 from sqlalchemy import text
-from sqlalchemy.exc import IntegrityError
 
 from app.settings import engine
-from app.schemas import RegisterRequest, GuestRequest, MoveRequest, PlayerCardsResponse
-from app.utils.scoring import score_payload, attribute_profile, MIN_DISTINCT_VOTERS, RECENCY_DECAY_PER_DAY
+from app.schemas import (
+    RegisterRequest,
+    GuestRequest,
+    MoveRequest,
+    BulkRegistrationsRequest,
+    PlayerCardsResponse,
+    EventPlayerCardsResponse,
+)
+from app.utils.scoring import attribute_profile
+from app.utils.player_card_cache import load_player_stats, rating_payload
 from app.utils.ratelimit import rate_limit, client_ip
+from app.utils.audit import insert_audit_rows
+from app.utils.inbox import send_to_registrations
+from app.utils.notification_cache import notification_cache
+from app.utils.db import fetch_many, lock_conflicts_as_409
+from app.utils.idempotency import claim_idempotency_key, store_idempotent_response
 
 router = APIRouter()
 
+# Tope de invitados por actor/evento (se pasa a public.fn_register_guest).
+MAX_GUESTS_PER_EVENT = 10
+
 
 # =========================
 # Helper Functions
@@ -49,80 +66,37 @@ def assert_can_move(conn, event_id: str, actor_user_id: str):
     )
 
 
-def check_and_auto_close_court(event_id: str, court_id: str, actor_user_id: str):
+def raise_for_db_result(row) -> None:
     """
-    Verifica si una cancha específica está llena.
-    Si está llena, cierra la cancha (is_open=false).
-    Luego verifica si TODAS las canchas del evento están cerradas/llenas.
-    Si es así, cierra automáticamente el evento (status=CLOSED).
+    Las funciones de inscripción (migrations/015) devuelven una fila con
+    http_status/detail: NULL = ok; si no, se traduce tal cual a HTTPException.
     """
-    with engine.begin() as conn:
-        # 1. Chequear si la cancha específica está llena
-        court_status = conn.execute(text("""
-            SELECT
-                ec.capacity,
-                ec.is_open,
-                COUNT(er.id) FILTER (WHERE er.status = 'CONFIRMED') as occupied
-            FROM public.event_courts ec
-            LEFT JOIN public.event_registrations er ON er.court_id = ec.id
-            WHERE ec.id = :court_id AND ec.event_id = :event_id
-            GROUP BY ec.id, ec.capacity, ec.is_open
-        """), {"court_id": court_id, "event_id": event_id}).mappings().first()
-
-        if not court_status:
-            return
-
-        # Si la cancha está llena y aún abierta, cerrarla
-        if court_status["is_open"] and court_status["occupied"] >= court_status["capacity"]:
-            conn.execute(text("""
-                UPDATE public.event_courts
-                SET is_open = false, updated_at = now()
-                WHERE id = :court_id
-            """), {"court_id": court_id})
-
-            conn.execute(text("""
-                INSERT INTO public.event_audit_log (event_id, actor_user_id, action, metadata)
-                VALUES (:event_id, :actor_user_id, 'AUTO_CLOSE_COURT',
-                        jsonb_build_object('court_id', CAST(:court_id AS text), 'reason', 'capacity_reached'))
-            """), {
-                "event_id": event_id,
-                "actor_user_id": actor_user_id,
-                "court_id": str(court_id),
-            })
-
-        # 2. Verificar si TODAS las canchas están cerradas o llenas
-        all_courts = conn.execute(text("""
-            SELECT
-                ec.id,
-                ec.capacity,
-                ec.is_open,
-                COUNT(er.id) FILTER (WHERE er.status = 'CONFIRMED') as occupied
-            FROM public.event_courts ec
-            LEFT JOIN public.event_registrations er ON er.court_id = ec.id
-            WHERE ec.event_id = :event_id
-            GROUP BY ec.id, ec.capacity, ec.is_open
-        """), {"event_id": event_id}).mappings().all()
-
-        if not all_courts:
-            return
-
-        # Una cancha está "cerrada efectivamente" si is_open=false O si está llena
-        all_closed = all(
-            not court["is_open"] or court["occupied"] >= court["capacity"]
-            for court in all_courts
-        )
+    if row is None:
+        raise HTTPException(status_code=500, detail="Respuesta vacía de la base de datos")
+    if row["http_status"] is not None:
+        raise HTTPException(status_code=row["http_status"], detail=row["detail"])
+
+
+def notify_waitlist_promoted(conn, registration_ids) -> list[str]:
+    """Aviso dirigido a quienes pasaron de la waitlist a una cancha. Devuelve los notificados."""
+    return send_to_registrations(
+        conn, registration_ids,
+        kind="WAITLIST_PROMOTED",
+        title="Entraste al partido",
+        message="Se liberó un lugar en {event}: quedaste confirmado en {court}.",
+        action_url="/",
+    )
 
-        if all_closed:
-            # Auto-cerrar evento
-            conn.execute(text("""
-                UPDATE public.events SET status = 'CLOSED', updated_at = now()
-                WHERE id = :event_id AND status = 'OPEN'
-            """), {"event_id": event_id})
 
-            conn.execute(text("""
-                INSERT INTO public.event_audit_log (event_id, actor_user_id, action, metadata)
-                VALUES (:event_id, :actor_user_id, 'AUTO_CLOSE_EVENT', '{"reason": "all_courts_closed_or_full"}'::jsonb)
-            """), {"event_id": event_id, "actor_user_id": actor_user_id})
+def notify_court_moved(conn, registration_ids) -> list[str]:
+    """Aviso dirigido a quienes cambiaron de cancha. Devuelve los notificados."""
+    return send_to_registrations(
+        conn, registration_ids,
+        kind="COURT_MOVED",
+        title="Cambio de cancha",
+        message="En {event} ahora jugás en {court}.",
+        action_url="/",
+    )
 
 
 # =========================
@@ -169,36 +143,37 @@ def get_active_event(
     Si no, devuelve el más reciente (por starts_at DESC).
     No incluye eventos FINALIZED.
     """
-    with engine.connect() as conn:
-        if event_id:
-            event = conn.execute(text("""
-                select id, title, description, starts_at, location_name, status, close_at
-                from public.events
-                where id = :event_id
-                  and status IN ('OPEN', 'CLOSED')
-            """), {"event_id": event_id}).mappings().first()
-        else:
-            event = conn.execute(text("""
-                select id, title, description, starts_at, location_name, status, close_at
+    # Sin event_id, todas las queries resuelven "el más reciente" con la misma subquery:
+    # así las 4 lecturas son independientes y van juntas en un solo viaje a la DB.
+    if event_id:
+        event_ref = ":event_id"
+        params = {"event_id": event_id}
+    else:
+        event_ref = """(
+                select id
                 from public.events
                 where status IN ('OPEN', 'CLOSED')
-                order by starts_at desc
+                order by starts_at desc, id desc
                 limit 1
-            """)).mappings().first()
-
-        if not event:
-            return {"event": None, "courts": [], "waitlist": []}
-
-        event_id = event["id"]
+            )"""
+        params = {}
 
-        courts = conn.execute(text("""
+    with engine.connect() as conn:
+        events, courts, confirmed, waitlist = fetch_many(
+            conn,
+            (text(f"""
+            select id, title, description, starts_at, location_name, status, close_at
+            from public.events
+            where id = {event_ref}
+              and status IN ('OPEN', 'CLOSED')
+        """), params),
+            (text(f"""
             select id, name, capacity, is_open, sort_order
             from public.event_courts
-            where event_id = :event_id
+            where event_id = {event_ref}
             order by sort_order asc
-        """), {"event_id": event_id}).mappings().all()
-
-        confirmed = conn.execute(text("""
+        """), params),
+            (text(f"""
             select
               r.id as registration_id,
               r.court_id,
@@ -215,13 +190,12 @@ def get_active_event(
             from public.event_registrations r
             left join public.users u on u.id = r.user_id
             left join public.users cb on cb.id = r.created_by_user_id
-            where r.event_id = :event_id
+            where r.event_id = {event_ref}
               and r.status = 'CONFIRMED'
               and r.court_id is not null
             order by r.created_at asc
-        """), {"event_id": event_id}).mappings().all()
-
-        waitlist = conn.execute(text("""
+        """), params),
+            (text(f"""
             select
               r.id as registration_id,
               r.registration_type,
@@ -237,11 +211,17 @@ def get_active_event(
             from public.event_registrations r
             left join public.users u on u.id = r.user_id
             left join public.users cb on cb.id = r.created_by_user_id
-            where r.event_id = :event_id
+            where r.event_id = {event_ref}
               and r.status = 'WAITLIST'
               and r.court_id is null
             order by r.created_at asc
-        """), {"event_id": event_id}).mappings().all()
+        """), params),
+        )
+
+        if not events:
+            return {"event": None, "courts": [], "waitlist": []}
+
+        event = events[0]
 
         confirmed_by_court = {}
         for r in confirmed:
@@ -301,6 +281,108 @@ def get_active_event(
         }
 
 
+_PLAYER_CARDS_ROSTER_SQL = """
+    SELECT
+      r.id                 AS registration_id,
+      r.court_id,
+      r.registration_type,
+      r.user_id,
+      r.guest_name,
+      r.created_at,
+      u.full_name          AS user_full_name,
+      u.player_level       AS user_player_level,
+      u.ranking_opt_in     AS target_opt_in,
+      cb.full_name         AS created_by_full_name
+    FROM public.event_registrations r
+    LEFT JOIN public.users u
+      ON u.id = r.user_id
+    LEFT JOIN public.users cb
+      ON cb.id = r.created_by_user_id
+    WHERE r.event_id = :event_id
+      AND {court_filter}
+      AND r.status = 'CONFIRMED'
+      AND r.registration_type IN ('USER', 'GUEST')
+    ORDER BY r.created_at ASC
+"""
+
+_PLAYER_CARDS_VIEWER_SQL = """
+    SELECT id, ranking_opt_in
+    FROM public.users
+    WHERE id = :actor_user_id
+    LIMIT 1
+"""
+
+
+def _build_player_cards(roster, viewer_opt_in: bool) -> tuple[list[dict], list[str]]:
+    """
+    Arma las cards del roster aplicando la privacy por ranking_opt_in.
+    Devuelve (cards, user_ids que participan y necesitan metricas).
+    """
+    cards = []
+    metrics_user_ids = []
+
+    for row in roster:
+        registration_id = str(row["registration_id"])
+        subject_type = row["registration_type"]
+
+        if subject_type == "GUEST":
+            cards.append({
+                "registration_id": registration_id,
+                "subject_type": "GUEST",
+                "guest_name": row["guest_name"],
+                "invited_by_name": row["created_by_full_name"],
+                "participates": False,
+                "reason": "GUEST",
+            })
+            continue
+
+        user_id = str(row["user_id"])
+        card = {
+            "registration_id": registration_id,
+            "subject_type": "USER",
+            "user_id": user_id,
+            "full_name": row["user_full_name"],
+            "player_level": row["user_player_level"],
+        }
+
+        target_opt_in = bool(row["target_opt_in"])
+        if not viewer_opt_in:
+            card["participates"] = False
+            card["reason"] = "VIEWER_OPT_OUT"
+        elif not target_opt_in:
+            card["participates"] = False
+            card["reason"] = "TARGET_OPT_OUT"
+        else:
+            card["participates"] = True
+            metrics_user_ids.append(user_id)
+
+        cards.append(card)
+
+    return cards, list(dict.fromkeys(metrics_user_ids))
+
+
+def _attach_player_metrics(conn, cards: list[dict], metrics_user_ids: list[str]) -> None:
+    """
+    Completa rating, top_attributes y attribute_profile de las cards que participan.
+    Los agregados salen de player_card_cache (por version de votos del jugador): solo
+    se re-agregan los jugadores con votos nuevos, todos juntos en un viaje.
+    """
+    stats_by_user, global_mean = load_player_stats(conn, metrics_user_ids) if metrics_user_ids else ({}, None)
+
+    for card in cards:
+        if card.get("subject_type") != "USER" or not card.get("participates"):
+            continue
+        stats = stats_by_user[card["user_id"]]
+        card["rating"] = {
+            "avg": stats["avg_rating"] or 0.0,
+            **rating_payload(stats, global_mean),
+        }
+        card["top_attributes"] = stats["attributes"][:4]
+        # Perfil de 6 ejes para el radar (M5).
+        counts = {a["code"]: a["count"] for a in stats["attributes"]}
+        card["attribute_profile"] = attribute_profile(counts, stats["votes"])
+
+
 @router.get("/events/{event_id}/courts/{court_id}/player-cards", response_model=PlayerCardsResponse)
 def get_player_cards(
     event_id: str,
@@ -311,12 +393,9 @@ def get_player_cards(
     Devuelve cards de jugadores de una cancha, respetando privacy por ranking_opt_in.
     """
     with engine.connect() as conn:
-        viewer = conn.execute(text("""
-            SELECT id, ranking_opt_in
-            FROM public.users
-            WHERE id = :actor_user_id
-            LIMIT 1
-        """), {"actor_user_id": actor_user_id}).mappings().first()
+        viewer = conn.execute(
+            text(_PLAYER_CARDS_VIEWER_SQL), {"actor_user_id": actor_user_id}
+        ).mappings().first()
 
         if not viewer:
             raise HTTPException(status_code=404, detail="Usuario actor no encontrado.")
@@ -332,147 +411,79 @@ def get_player_cards(
         if not court:
             raise HTTPException(status_code=404, detail="Cancha no encontrada para el evento.")
 
-        roster = conn.execute(text("""
-            SELECT
-              r.id                 AS registration_id,
-              r.registration_type,
-              r.user_id,
-              r.guest_name,
-              r.created_at,
-              u.full_name          AS user_full_name,
-              u.player_level       AS user_player_level,
-              u.ranking_opt_in     AS target_opt_in,
-              cb.full_name         AS created_by_full_name
-            FROM public.event_registrations r
-            LEFT JOIN public.users u
-              ON u.id = r.user_id
-            LEFT JOIN public.users cb
-              ON cb.id = r.created_by_user_id
-            WHERE r.event_id = :event_id
-              AND r.court_id = :court_id
-              AND r.status = 'CONFIRMED'
-              AND r.registration_type IN ('USER', 'GUEST')
-            ORDER BY r.created_at ASC
-        """), {"event_id": event_id, "court_id": court_id}).mappings().all()
+        roster = conn.execute(
+            text(_PLAYER_CARDS_ROSTER_SQL.format(court_filter="r.court_id = :court_id")),
+            {"event_id": event_id, "court_id": court_id},
+        ).mappings().all()
 
         viewer_opt_in = bool(viewer["ranking_opt_in"])
-        cards = []
-        metrics_user_ids = []
-
-        for row in roster:
-            registration_id = str(row["registration_id"])
-            subject_type = row["registration_type"]
-
-            if subject_type == "GUEST":
-                cards.append({
-                    "registration_id": registration_id,
-                    "subject_type": "GUEST",
-                    "guest_name": row["guest_name"],
-                    "invited_by_name": row["created_by_full_name"],
-                    "participates": False,
-                    "reason": "GUEST",
-                })
-                continue
+        cards, metrics_user_ids = _build_player_cards(roster, viewer_opt_in)
+        _attach_player_metrics(conn, cards, metrics_user_ids)
 
-            user_id = str(row["user_id"])
-            card = {
-                "registration_id": registration_id,
-                "subject_type": "USER",
-                "user_id": user_id,
-                "full_name": row["user_full_name"],
-                "player_level": row["user_player_level"],
-            }
+        return {
+            "viewer": {
+                "user_id": str(viewer["id"]),
+                "ranking_opt_in": viewer_opt_in,
+            },
+            "cards": cards,
+        }
 
-            target_opt_in = bool(row["target_opt_in"])
-            if not viewer_opt_in:
-                card["participates"] = False
-                card["reason"] = "VIEWER_OPT_OUT"
-            elif not target_opt_in:
-                card["participates"] = False
-                card["reason"] = "TARGET_OPT_OUT"
-            else:
-                card["participates"] = True
-                metrics_user_ids.append(user_id)
-
-            cards.append(card)
-
-        metrics_user_ids = list(dict.fromkeys(metrics_user_ids))
-        ratings_map = {}
-        attrs_map = {}
-
-        if metrics_user_ids:
-            global_mean = conn.execute(text("""
-                SELECT AVG(rating) FROM public.player_ratings WHERE is_hidden = false
-            """)).scalar()
-
-            rating_rows = conn.execute(text("""
-                SELECT
-                  target_user_id,
-                  ROUND(AVG(rating)::numeric, 1)   AS avg_rating,
-                  COUNT(*)                         AS votes,
-                  COUNT(DISTINCT voter_user_id)    AS voters,
-                  COALESCE(SUM(rating * exp(-:decay * EXTRACT(EPOCH FROM (now() - created_at)) / 86400.0)), 0) AS weighted_sum,
-                  COALESCE(SUM(exp(-:decay * EXTRACT(EPOCH FROM (now() - created_at)) / 86400.0)), 0)          AS weight_total
-                FROM public.player_ratings
-                WHERE target_user_id = ANY(CAST(:target_ids AS uuid[]))
-                  AND is_hidden = false
-                GROUP BY target_user_id
-            """), {"target_ids": metrics_user_ids, "decay": RECENCY_DECAY_PER_DAY}).mappings().all()
-
-            ratings_map = {}
-            for r in rating_rows:
-                payload = score_payload(
-                    r["votes"], r["voters"], r["weighted_sum"],
-                    r["weight_total"], r["avg_rating"], global_mean,
-                )
-                ratings_map[str(r["target_user_id"])] = {
-                    "avg": float(r["avg_rating"]) if r["avg_rating"] is not None else 0.0,
-                    "votes": int(r["votes"] or 0),
-                    **payload,
-                }
 
-            attr_rows = conn.execute(text("""
-                SELECT
-                  pr.target_user_id,
-                  attr.attribute AS code,
-                  COUNT(*)       AS count
-                FROM public.player_ratings pr
-                JOIN LATERAL jsonb_array_elements_text(pr.attributes) attr(attribute)
-                  ON true
-                WHERE pr.target_user_id = ANY(CAST(:target_ids AS uuid[]))
-                  AND pr.is_hidden = false
-                  AND jsonb_typeof(pr.attributes) = 'array'
-                GROUP BY pr.target_user_id, attr.attribute
-                ORDER BY pr.target_user_id, count DESC, attr.attribute ASC
-            """), {"target_ids": metrics_user_ids}).mappings().all()
-
-            for row in attr_rows:
-                uid = str(row["target_user_id"])
-                attrs_map.setdefault(uid, []).append({
-                    "code": str(row["code"]),
-                    "count": int(row["count"] or 0),
-                })
+@router.get("/events/{event_id}/player-cards", response_model=EventPlayerCardsResponse)
+def get_event_player_cards(
+    event_id: str,
+    actor_user_id: str = Depends(get_actor_user_id),
+):
+    """
+    Cards de jugadores de todas las canchas del evento en una sola llamada.
+    Viewer, canchas y roster salen en un viaje; ratings y atributos se agregan una
+    vez para todos los jugadores del evento. Misma privacy por ranking_opt_in que
+    el endpoint por cancha.
+    """
+    with engine.connect() as conn:
+        viewers, events, courts, roster = fetch_many(
+            conn,
+            (text(_PLAYER_CARDS_VIEWER_SQL), {"actor_user_id": actor_user_id}),
+            (text("""
+                SELECT id FROM public.events WHERE id = :event_id
+            """), {"event_id": event_id}),
+            (text("""
+                SELECT id, name
+                FROM public.event_courts
+                WHERE event_id = :event_id
+                ORDER BY sort_order ASC
+            """), {"event_id": event_id}),
+            (text(_PLAYER_CARDS_ROSTER_SQL.format(court_filter="r.court_id IS NOT NULL")),
+             {"event_id": event_id}),
+        )
 
-        for card in cards:
-            if card.get("subject_type") != "USER" or not card.get("participates"):
-                continue
-            uid = card["user_id"]
-            card["rating"] = ratings_map.get(uid, {
-                "avg": 0.0, "votes": 0, "voters": 0,
-                "score": None, "calibrating": True,
-                "min_voters": MIN_DISTINCT_VOTERS, "suggested_level": None, "form": None,
-            })
-            card["top_attributes"] = (attrs_map.get(uid) or [])[:4]
-            # Perfil de 6 ejes para el radar (M5).
-            counts = {a["code"]: a["count"] for a in (attrs_map.get(uid) or [])}
-            card["attribute_profile"] = attribute_profile(counts, card["rating"].get("votes", 0))
+        if not viewers:
+            raise HTTPException(status_code=404, detail="Usuario actor no encontrado.")
+        if not events:
+            raise HTTPException(status_code=404, detail="Evento no encontrado.")
+
+        viewer = viewers[0]
+        viewer_opt_in = bool(viewer["ranking_opt_in"])
+        cards, metrics_user_ids = _build_player_cards(roster, viewer_opt_in)
+        _attach_player_metrics(conn, cards, metrics_user_ids)
+
+        cards_by_court = {}
+        for row, card in zip(roster, cards):
+            cards_by_court.setdefault(str(row["court_id"]), []).append(card)
 
         return {
             "viewer": {
                 "user_id": str(viewer["id"]),
                 "ranking_opt_in": viewer_opt_in,
             },
-            "cards": cards,
+            "courts": [
+                {
+                    "court_id": str(c["id"]),
+                    "name": c["name"],
+                    "cards": cards_by_court.get(str(c["id"]), []),
+                }
+                for c in courts
+            ],
         }
 
 
@@ -480,204 +491,95 @@ def get_player_cards(
 def register_user(
     event_id: str,
     body: RegisterRequest,
-    actor_user_id: str = Depends(get_actor_user_id)
+    actor_user_id: str = Depends(get_actor_user_id),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
     El actor (header) se auto-anota en el evento.
     Si hay cupo, se confirma; si no, va a waitlist.
+    Lock, cupo, auditoría y auto-cierre corren en public.fn_register_user (una ida y vuelta).
+    Con Idempotency-Key, un reintento devuelve la respuesta del primer intento.
     """
     with engine.begin() as conn:
-        event = conn.execute(text("""
-            select id, status
-            from public.events
-            where id = :event_id
-        """), {"event_id": event_id}).mappings().first()
-
-        if not event:
-            raise HTTPException(status_code=404, detail="Evento no encontrado")
-        if event["status"] != "OPEN":
-            raise HTTPException(status_code=400, detail="El evento no está abierto")
-
-        court = conn.execute(text("""
-            select id, capacity, is_open
-            from public.event_courts
-            where id = :court_id and event_id = :event_id
-            for update
-        """), {"court_id": body.court_id, "event_id": event_id}).mappings().first()
-
-        if not court:
-            raise HTTPException(status_code=404, detail="Cancha no encontrada para este evento")
-        if not court["is_open"]:
-            raise HTTPException(status_code=400, detail="La cancha está cerrada")
+        replay = claim_idempotency_key(conn, actor_user_id, idempotency_key, f"register:{event_id}", body)
+        if replay is not None:
+            return replay
 
-        occupied = conn.execute(text("""
-            select count(*)::int as cnt
-            from public.event_registrations
-            where event_id = :event_id
-              and court_id = :court_id
-              and status = 'CONFIRMED'
-        """), {"event_id": event_id, "court_id": body.court_id}).mappings().first()["cnt"]
-
-        has_capacity = occupied < court["capacity"]
-        status = "CONFIRMED" if has_capacity else "WAITLIST"
-        court_id_to_set = body.court_id if has_capacity else None
-
-        try:
-            reg = conn.execute(text("""
-                insert into public.event_registrations (
-                  event_id, registration_type, status, court_id, created_by_user_id, user_id
-                )
-                values (
-                  :event_id, 'USER', :status, :court_id, :created_by_user_id, :user_id
-                )
-                returning id, status, court_id, created_at
-            """), {
-                "event_id": event_id,
-                "status": status,
-                "court_id": court_id_to_set,
-                "created_by_user_id": actor_user_id,
-                "user_id": actor_user_id,
-            }).mappings().first()
-        except IntegrityError:
-            raise HTTPException(status_code=409, detail="El usuario ya está inscripto en este evento")
-
-        conn.execute(text("""
-            insert into public.event_audit_log (
-              event_id, actor_user_id, action, target_registration_id, metadata
-            )
-            values (
-              :event_id, :actor_user_id, 'REGISTER_USER', :target_registration_id, CAST(:metadata AS jsonb)
+        reg = conn.execute(text("""
+            select *
+            from public.fn_register_user(
+              CAST(:event_id AS uuid), CAST(:court_id AS uuid), CAST(:actor_user_id AS uuid)
             )
         """), {
             "event_id": event_id,
+            "court_id": body.court_id,
             "actor_user_id": actor_user_id,
-            "target_registration_id": reg["id"],
-            "metadata": '{"source":"api"}'
+        }).mappings().first()
+        raise_for_db_result(reg)
+
+        return store_idempotent_response(conn, actor_user_id, idempotency_key, {
+            "registration_id": str(reg["registration_id"]),
+            "status": reg["reg_status"],
+            "court_id": str(reg["reg_court_id"]) if reg["reg_court_id"] else None,
+            "created_at": str(reg["reg_created_at"]),
+            "message": "Inscripción confirmada" if reg["reg_status"] == "CONFIRMED" else "Agregado a lista de espera",
         })
 
-    # Chequear si la cancha está llena para auto-cerrarla (y el evento si corresponde)
-    if reg["status"] == "CONFIRMED":
-        check_and_auto_close_court(event_id, body.court_id, actor_user_id)
-
-    return {
-        "registration_id": str(reg["id"]),
-        "status": reg["status"],
-        "court_id": str(reg["court_id"]) if reg["court_id"] else None,
-        "created_at": str(reg["created_at"]),
-        "message": "Inscripción confirmada" if reg["status"] == "CONFIRMED" else "Agregado a lista de espera",
-    }
-
 
 @router.post("/events/{event_id}/guests")
 def register_guest(
     event_id: str,
     body: GuestRequest,
     request: Request,
-    actor_user_id: str = Depends(get_actor_user_id)
+    actor_user_id: str = Depends(get_actor_user_id),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
     Registra un invitado en una cancha (sin sobrecupo).
     Límite: 10 invitados por actor/evento.
+    La escritura corre en public.fn_register_guest (una ida y vuelta).
+    Con Idempotency-Key, un reintento no duplica el invitado: devuelve la respuesta original
+    (sin pasar por el rate limit: no es un alta nueva).
     """
-    # Anti-ráfaga: máx 15 invitados / minuto por actor e IP (además del cap de 10).
-    rate_limit(f"guest:{actor_user_id}", max_hits=15, window_seconds=60)
-    rate_limit(f"guest-ip:{client_ip(request)}", max_hits=20, window_seconds=60)
-
     # Validación de nombre de invitado.
     guest_name = (body.guest_name or "").strip()
     if len(guest_name) < 2 or len(guest_name) > 60:
         raise HTTPException(status_code=400, detail="Nombre de invitado inválido (2 a 60 caracteres).")
 
     with engine.begin() as conn:
-        event = conn.execute(text("""
-            select id, status
-            from public.events
-            where id = :event_id
-        """), {"event_id": event_id}).mappings().first()
+        replay = claim_idempotency_key(conn, actor_user_id, idempotency_key, f"guest:{event_id}", body)
+        if replay is not None:
+            return replay
 
-        if not event:
-            raise HTTPException(status_code=404, detail="Evento no encontrado")
-        if event["status"] != "OPEN":
-            raise HTTPException(status_code=400, detail="El evento no está abierto")
-
-        court = conn.execute(text("""
-            select id, capacity, is_open
-            from public.event_courts
-            where id = :court_id and event_id = :event_id
-            for update
-        """), {"court_id": body.court_id, "event_id": event_id}).mappings().first()
-
-        if not court:
-            raise HTTPException(status_code=404, detail="Cancha no encontrada para este evento")
-        if not court["is_open"]:
-            raise HTTPException(status_code=400, detail="La cancha está cerrada")
-
-        # Límite 10 invitados por actor/evento (no cuenta CANCELLED)
-        guest_count = conn.execute(text("""
-            select count(*)::int as cnt
-            from public.event_registrations
-            where event_id = :event_id
-              and registration_type = 'GUEST'
-              and created_by_user_id = :actor_user_id
-              and status != 'CANCELLED'
-        """), {"event_id": event_id, "actor_user_id": actor_user_id}).mappings().first()["cnt"]
-
-        if guest_count >= 10:
-            raise HTTPException(status_code=400, detail="Límite de 10 invitados alcanzado para este evento")
-
-        # Cupo (sin sobrecupo)
-        occupied = conn.execute(text("""
-            select count(*)::int as cnt
-            from public.event_registrations
-            where event_id = :event_id
-              and court_id = :court_id
-              and status = 'CONFIRMED'
-        """), {"event_id": event_id, "court_id": body.court_id}).mappings().first()["cnt"]
-
-        if occupied >= court["capacity"]:
-            raise HTTPException(status_code=409, detail="La cancha está completa. No se permite sobrecupo.")
+        # Anti-ráfaga: máx 15 invitados / minuto por actor e IP (además del cap de 10).
+        # Si corta acá, el rollback libera la key y el reintento vuelve a intentar.
+        rate_limit(f"guest:{actor_user_id}", max_hits=15, window_seconds=60)
+        rate_limit(f"guest-ip:{client_ip(request)}", max_hits=20, window_seconds=60)
 
         reg = conn.execute(text("""
-            insert into public.event_registrations (
-              event_id, registration_type, status, court_id, created_by_user_id, guest_name
-            )
-            values (
-              :event_id, 'GUEST', 'CONFIRMED', :court_id, :created_by_user_id, :guest_name
+            select *
+            from public.fn_register_guest(
+              CAST(:event_id AS uuid), CAST(:court_id AS uuid), CAST(:actor_user_id AS uuid),
+              :guest_name, :max_guests
             )
-            returning id, status, court_id, created_at
         """), {
             "event_id": event_id,
             "court_id": body.court_id,
-            "created_by_user_id": actor_user_id,
+            "actor_user_id": actor_user_id,
             "guest_name": guest_name,
+            "max_guests": MAX_GUESTS_PER_EVENT,
         }).mappings().first()
+        raise_for_db_result(reg)
 
-        conn.execute(text("""
-            insert into public.event_audit_log (
-              event_id, actor_user_id, action, target_registration_id, metadata
-            )
-            values (
-              :event_id, :actor_user_id, 'REGISTER_GUEST', :target_registration_id, CAST(:metadata AS jsonb)
-            )
-        """), {
-            "event_id": event_id,
-            "actor_user_id": actor_user_id,
-            "target_registration_id": reg["id"],
-            "metadata": '{"source":"api"}'
+        return store_idempotent_response(conn, actor_user_id, idempotency_key, {
+            "registration_id": str(reg["registration_id"]),
+            "status": reg["reg_status"],
+            "court_id": str(reg["reg_court_id"]),
+            "created_at": str(reg["reg_created_at"]),
+            "guest_name": guest_name,
+            "message": "Invitado confirmado"
         })
 
-    # Chequear si la cancha está llena para auto-cerrarla (y el evento si corresponde)
-    check_and_auto_close_court(event_id, body.court_id, actor_user_id)
-
-    return {
-        "registration_id": str(reg["id"]),
-        "status": reg["status"],
-        "court_id": str(reg["court_id"]),
-        "created_at": str(reg["created_at"]),
-        "guest_name": body.guest_name.strip(),
-        "message": "Invitado confirmado"
-    }
-
 
 @router.post("/registrations/{registration_id}/move")
 def move_registration(
@@ -689,154 +591,35 @@ def move_registration(
     Mueve una inscripción CONFIRMED de una cancha a otra.
     Solo admin/super_admin o capitán del evento.
     Promueve desde waitlist a la cancha liberada si hay cupo.
+    Todo corre en public.fn_move_registration (una ida y vuelta).
     """
     with engine.begin() as conn:
-        reg = conn.execute(text("""
-            select id, event_id, court_id, status
-            from public.event_registrations
-            where id = :registration_id
-            for update
-        """), {"registration_id": registration_id}).mappings().first()
-
-        if not reg:
-            raise HTTPException(status_code=404, detail="Inscripción no encontrada")
-        if reg["status"] != "CONFIRMED":
-            raise HTTPException(status_code=400, detail="Solo se pueden mover inscripciones CONFIRMED")
-
-        event_id = reg["event_id"]
-        from_court_id = reg["court_id"]
-
-        if not from_court_id:
-            raise HTTPException(status_code=400, detail="La inscripción no tiene cancha asignada")
-        if body.to_court_id == str(from_court_id):
-            raise HTTPException(status_code=400, detail="La inscripción ya está en esa cancha")
-
-        # Permisos: admin/super_admin o capitán del evento
-        assert_can_move(conn, str(event_id), actor_user_id)
-
-        # Validar que el evento no está finalizado (permitir OPEN y CLOSED)
-        event = conn.execute(text("""
-            select status
-            from public.events
-            where id = :event_id
-        """), {"event_id": event_id}).mappings().first()
-
-        if not event or event["status"] == "FINALIZED":
-            raise HTTPException(status_code=400, detail="El evento está finalizado. No se pueden realizar cambios.")
-
-        # Lock cancha destino
-        to_court = conn.execute(text("""
-            select id, capacity, is_open
-            from public.event_courts
-            where id = :court_id and event_id = :event_id
-            for update
-        """), {"court_id": body.to_court_id, "event_id": event_id}).mappings().first()
-
-        if not to_court:
-            raise HTTPException(status_code=404, detail="Cancha destino no encontrada para este evento")
-        if not to_court["is_open"]:
-            raise HTTPException(status_code=400, detail="La cancha destino está cerrada")
-
-        # Cupo destino
-        occupied_to = conn.execute(text("""
-            select count(*)::int as cnt
-            from public.event_registrations
-            where event_id = :event_id
-              and court_id = :court_id
-              and status = 'CONFIRMED'
-        """), {"event_id": event_id, "court_id": body.to_court_id}).mappings().first()["cnt"]
-
-        if occupied_to >= to_court["capacity"]:
-            raise HTTPException(status_code=409, detail="La cancha destino está completa")
-
-        # Mover
-        conn.execute(text("""
-            update public.event_registrations
-            set court_id = :to_court_id,
-                updated_at = now()
-            where id = :registration_id
-        """), {"to_court_id": body.to_court_id, "registration_id": registration_id})
-
-        # Audit move
-        conn.execute(text("""
-            insert into public.event_audit_log (
-              event_id, actor_user_id, action, target_registration_id, metadata
-            )
-            values (
-              :event_id, :actor_user_id, 'MOVE_REGISTRATION', :target_registration_id,
-              jsonb_build_object('from_court_id', CAST(:from_court_id AS text), 'to_court_id', CAST(:to_court_id AS text))
+        res = conn.execute(text("""
+            select *
+            from public.fn_move_registration(
+              CAST(:registration_id AS uuid), CAST(:to_court_id AS uuid), CAST(:actor_user_id AS uuid)
             )
         """), {
-            "event_id": event_id,
+            "registration_id": registration_id,
+            "to_court_id": body.to_court_id,
             "actor_user_id": actor_user_id,
-            "target_registration_id": registration_id,
-            "from_court_id": str(from_court_id),
-            "to_court_id": str(body.to_court_id),
-        })
+        }).mappings().first()
+        raise_for_db_result(res)
 
-        # Promover WAITLIST a la cancha liberada
-        promoted_id = None
+        notified = notify_court_moved(conn, [registration_id])
+        if res["promoted_registration_id"]:
+            notified += notify_waitlist_promoted(conn, [res["promoted_registration_id"]])
 
-        wait = conn.execute(text("""
-            select id
-            from public.event_registrations
-            where event_id = :event_id
-              and status = 'WAITLIST'
-              and court_id is null
-            order by created_at asc
-            limit 1
-            for update
-        """), {"event_id": event_id}).mappings().first()
+    notification_cache.invalidate_inbox(notified)
 
-        if wait:
-            from_court = conn.execute(text("""
-                select capacity, is_open
-                from public.event_courts
-                where id = :court_id and event_id = :event_id
-                for update
-            """), {"court_id": from_court_id, "event_id": event_id}).mappings().first()
-
-            if from_court and from_court["is_open"]:
-                occupied_from = conn.execute(text("""
-                    select count(*)::int as cnt
-                    from public.event_registrations
-                    where event_id = :event_id
-                      and court_id = :court_id
-                      and status = 'CONFIRMED'
-                """), {"event_id": event_id, "court_id": from_court_id}).mappings().first()["cnt"]
-
-                if occupied_from < from_court["capacity"]:
-                    conn.execute(text("""
-                        update public.event_registrations
-                        set status = 'CONFIRMED',
-                            court_id = :court_id,
-                            updated_at = now()
-                        where id = :wait_id
-                    """), {"court_id": from_court_id, "wait_id": wait["id"]})
-
-                    promoted_id = wait["id"]
-
-                    conn.execute(text("""
-                        insert into public.event_audit_log (
-                          event_id, actor_user_id, action, target_registration_id, metadata
-                        )
-                        values (
-                          :event_id, :actor_user_id, 'PROMOTE_WAITLIST', :target_registration_id, CAST(:metadata AS jsonb)
-                        )
-                    """), {
-                        "event_id": event_id,
-                        "actor_user_id": actor_user_id,
-                        "target_registration_id": promoted_id,
-                        "metadata": '{"source":"auto_from_move"}'
-                    })
-
-        return {
-            "moved_registration_id": registration_id,
-            "from_court_id": str(from_court_id),
-            "to_court_id": body.to_court_id,
-            "promoted_registration_id": str(promoted_id) if promoted_id else None,
-            "message": "Movimiento realizado"
-        }
+    promoted_id = res["promoted_registration_id"]
+    return {
+        "moved_registration_id": registration_id,
+        "from_court_id": str(res["from_court_id"]),
+        "to_court_id": body.to_court_id,
+        "promoted_registration_id": str(promoted_id) if promoted_id else None,
+        "message": "Movimiento realizado"
+    }
 
 
 @router.post("/registrations/{registration_id}/cancel")
@@ -848,128 +631,271 @@ def cancel_registration(
     Cancela una inscripción.
     Solo admin/super_admin o capitán del evento.
     Promueve desde waitlist si se libera un cupo.
+    Todo corre en public.fn_cancel_registration (una ida y vuelta).
     """
     with engine.begin() as conn:
-        reg = conn.execute(text("""
-            select id, event_id, court_id, status
-            from public.event_registrations
-            where id = :registration_id
-            for update
-        """), {"registration_id": registration_id}).mappings().first()
+        res = conn.execute(text("""
+            select *
+            from public.fn_cancel_registration(
+              CAST(:registration_id AS uuid), CAST(:actor_user_id AS uuid)
+            )
+        """), {
+            "registration_id": registration_id,
+            "actor_user_id": actor_user_id,
+        }).mappings().first()
+        raise_for_db_result(res)
+
+        notified = []
+        if res["promoted_registration_id"]:
+            notified = notify_waitlist_promoted(conn, [res["promoted_registration_id"]])
+
+    notification_cache.invalidate_inbox(notified)
 
-        if not reg:
-            raise HTTPException(status_code=404, detail="Inscripción no encontrada")
-        if reg["status"] == "CANCELLED":
-            raise HTTPException(status_code=400, detail="La inscripción ya está cancelada")
+    promoted_id = res["promoted_registration_id"]
+    return {
+        "cancelled_registration_id": registration_id,
+        "promoted_registration_id": str(promoted_id) if promoted_id else None,
+        "message": "Inscripción cancelada correctamente"
+    }
 
-        event_id = reg["event_id"]
-        freed_court_id = reg["court_id"]
 
+@router.post("/events/{event_id}/registrations/bulk")
+def bulk_registration_operations(
+    event_id: str,
+    body: BulkRegistrationsRequest,
+    actor_user_id: str = Depends(get_actor_user_id)
+):
+    """
+    Aplica varias operaciones (move / cancel / swap) sobre inscripciones de un evento
+    en una sola transaccion. Solo admin/super_admin o capitán del evento.
+
+    - Se bloquean una sola vez el roster y las canchas del evento. Si igual choca con
+      otra escritura (deadlock), responde 409 y no se aplica nada.
+    - Las operaciones se validan en orden contra una foto en memoria del roster
+      (cada operacion ve el resultado de las anteriores). Si alguna falla, no se aplica nada.
+    - Los cupos liberados se completan desde la waitlist (FIFO) al final.
+    - Los cambios se escriben con un UPDATE set-based y la auditoria en un INSERT multi-fila.
+    """
+    ops = body.operations
+
+    with lock_conflicts_as_409(), engine.begin() as conn:
         # Permisos: admin/super_admin o capitán del evento
-        assert_can_move(conn, str(event_id), actor_user_id)
+        assert_can_move(conn, event_id, actor_user_id)
 
-        # Validar que el evento no está finalizado (permitir OPEN y CLOSED)
         event = conn.execute(text("""
             select status
             from public.events
             where id = :event_id
         """), {"event_id": event_id}).mappings().first()
 
-        if not event or event["status"] == "FINALIZED":
-            raise HTTPException(status_code=400, detail="El evento está finalizado. No se pueden cancelar inscripciones.")
-
-        # 1) Cancelar inscripción
-        conn.execute(text("""
-            update public.event_registrations
-            set status = 'CANCELLED',
-                cancelled_at = now(),
-                updated_at = now()
-            where id = :registration_id
-        """), {"registration_id": registration_id})
-
-        # 2) Audit log - cancelación
-        conn.execute(text("""
-            insert into public.event_audit_log (
-                event_id, actor_user_id, action, target_registration_id, metadata
-            )
-            values (
-                :event_id,
-                :actor_user_id,
-                'CANCEL_REGISTRATION',
-                :target_registration_id,
-                CAST(:metadata AS jsonb)
-            )
-        """), {
-            "event_id": event_id,
-            "actor_user_id": actor_user_id,
-            "target_registration_id": registration_id,
-            "metadata": '{"reason":"manual_cancel"}'
-        })
+        if not event:
+            raise HTTPException(status_code=404, detail="Evento no encontrado")
+        if event["status"] == "FINALIZED":
+            raise HTTPException(status_code=400, detail="El evento está finalizado. No se pueden realizar cambios.")
+
+        # Locks en el mismo orden que fn_move_registration / fn_cancel_registration
+        # (migrations/015): primero inscripciones, despues canchas, cada grupo por id.
+        # Foto del roster (incluye canceladas para dar errores precisos)
+        reg_rows = conn.execute(text("""
+            select id, court_id, status, created_at
+            from public.event_registrations
+            where event_id = :event_id
+            order by id
+            for update
+        """), {"event_id": event_id}).mappings().all()
+        # La waitlist se promueve FIFO: mismo orden que (created_at, id) en SQL.
+        reg_rows = sorted(reg_rows, key=lambda r: (r["created_at"], str(r["id"])))
 
-        promoted_id = None
+        court_rows = conn.execute(text("""
+            select id, capacity, is_open
+            from public.event_courts
+            where event_id = :event_id
+            order by id
+            for update
+        """), {"event_id": event_id}).mappings().all()
 
-        # 3) Promover primer WAITLIST si se liberó una cancha
-        if freed_court_id:
-            wait = conn.execute(text("""
-                select id
-                from public.event_registrations
-                where event_id = :event_id
-                  and status = 'WAITLIST'
-                  and court_id is null
-                order by created_at asc
-                limit 1
-                for update
-            """), {"event_id": event_id}).mappings().first()
-
-            if wait:
-                # Validar cupo real en la cancha liberada
-                court = conn.execute(text("""
-                    select capacity, is_open
-                    from public.event_courts
-                    where id = :court_id and event_id = :event_id
-                    for update
-                """), {"court_id": freed_court_id, "event_id": event_id}).mappings().first()
-
-                if court and court["is_open"]:
-                    occupied = conn.execute(text("""
-                        select count(*)::int as cnt
-                        from public.event_registrations
-                        where event_id = :event_id
-                          and court_id = :court_id
-                          and status = 'CONFIRMED'
-                    """), {"event_id": event_id, "court_id": freed_court_id}).mappings().first()["cnt"]
-
-                    if occupied < court["capacity"]:
-                        conn.execute(text("""
-                            update public.event_registrations
-                            set status = 'CONFIRMED',
-                                court_id = :court_id,
-                                updated_at = now()
-                            where id = :wait_id
-                        """), {"court_id": freed_court_id, "wait_id": wait["id"]})
-
-                        promoted_id = wait["id"]
-
-                        conn.execute(text("""
-                            insert into public.event_audit_log (
-                                event_id, actor_user_id, action, target_registration_id, metadata
-                            )
-                            values (
-                                :event_id,
-                                :actor_user_id,
-                                'PROMOTE_WAITLIST',
-                                :target_registration_id,
-                                CAST(:metadata AS jsonb)
-                            )
-                        """), {
-                            "event_id": event_id,
-                            "actor_user_id": actor_user_id,
-                            "target_registration_id": promoted_id,
-                            "metadata": '{"source":"auto_from_cancel"}'
-                        })
+        courts = {str(c["id"]): c for c in court_rows}
 
-        return {
-            "cancelled_registration_id": registration_id,
-            "promoted_registration_id": str(promoted_id) if promoted_id else None,
-            "message": "Inscripción cancelada correctamente"
+        regs = {
+            str(r["id"]): {
+                "court_id": str(r["court_id"]) if r["court_id"] else None,
+                "status": r["status"],
+            }
+            for r in reg_rows
         }
+        original = {rid: dict(state) for rid, state in regs.items()}
+
+        occupancy = {cid: 0 for cid in courts}
+        for state in regs.values():
+            if state["status"] == "CONFIRMED" and state["court_id"] in occupancy:
+                occupancy[state["court_id"]] += 1
+
+        def fail(index: int, status_code: int, detail: str):
+            raise HTTPException(status_code=status_code, detail=f"Operación {index + 1}: {detail}")
+
+        def confirmed_reg(index: int, registration_id: str) -> dict:
+            state = regs.get(registration_id)
+            if not state:
+                fail(index, 404, f"Inscripción {registration_id} no encontrada en este evento")
+            if state["status"] != "CONFIRMED":
+                fail(index, 400, "Solo se pueden mover inscripciones CONFIRMED")
+            if not state["court_id"]:
+                fail(index, 400, "La inscripción no tiene cancha asignada")
+            return state
+
+        audit_rows: list[dict] = []
+        results: list[dict] = []
+        freed_slots: dict[str, int] = {}
+
+        for i, op in enumerate(ops):
+            if op.op == "cancel":
+                state = regs.get(op.registration_id)
+                if not state:
+                    fail(i, 404, f"Inscripción {op.registration_id} no encontrada en este evento")
+                if state["status"] == "CANCELLED":
+                    fail(i, 400, "La inscripción ya está cancelada")
+
+                freed_court_id = state["court_id"]
+                if state["status"] == "CONFIRMED" and freed_court_id:
+                    occupancy[freed_court_id] -= 1
+                    freed_slots[freed_court_id] = freed_slots.get(freed_court_id, 0) + 1
+
+                state["status"] = "CANCELLED"
+                audit_rows.append({
+                    "event_id": event_id,
+                    "actor_user_id": actor_user_id,
+                    "action": "CANCEL_REGISTRATION",
+                    "target_registration_id": op.registration_id,
+                    "metadata": {"reason": "manual_cancel", "source": "bulk"},
+                })
+                results.append({"op": "cancel", "registration_id": op.registration_id})
+
+            elif op.op == "move":
+                state = confirmed_reg(i, op.registration_id)
+                from_court_id = state["court_id"]
+                to_court_id = op.to_court_id
+
+                if to_court_id == from_court_id:
+                    fail(i, 400, "La inscripción ya está en esa cancha")
+
+                to_court = courts.get(to_court_id)
+                if not to_court:
+                    fail(i, 404, "Cancha destino no encontrada para este evento")
+                if not to_court["is_open"]:
+                    fail(i, 400, "La cancha destino está cerrada")
+                if occupancy[to_court_id] >= to_court["capacity"]:
+                    fail(i, 409, "La cancha destino está completa")
+
+                occupancy[from_court_id] -= 1
+                occupancy[to_court_id] += 1
+                freed_slots[from_court_id] = freed_slots.get(from_court_id, 0) + 1
+                state["court_id"] = to_court_id
+
+                audit_rows.append({
+                    "event_id": event_id,
+                    "actor_user_id": actor_user_id,
+                    "action": "MOVE_REGISTRATION",
+                    "target_registration_id": op.registration_id,
+                    "metadata": {"from_court_id": from_court_id, "to_court_id": to_court_id, "source": "bulk"},
+                })
+                results.append({
+                    "op": "move",
+                    "registration_id": op.registration_id,
+                    "from_court_id": from_court_id,
+                    "to_court_id": to_court_id,
+                })
+
+            else:  # swap
+                first = confirmed_reg(i, op.registration_id)
+                second = confirmed_reg(i, op.other_registration_id)
+                court_a, court_b = first["court_id"], second["court_id"]
+
+                if court_a == court_b:
+                    fail(i, 400, "Las dos inscripciones ya están en la misma cancha")
+
+                first["court_id"], second["court_id"] = court_b, court_a
+
+                for registration_id, from_court_id, to_court_id, other_id in (
+                    (op.registration_id, court_a, court_b, op.other_registration_id),
+                    (op.other_registration_id, court_b, court_a, op.registration_id),
+                ):
+                    audit_rows.append({
+                        "event_id": event_id,
+                        "actor_user_id": actor_user_id,
+                        "action": "MOVE_REGISTRATION",
+                        "target_registration_id": registration_id,
+                        "metadata": {
+                            "from_court_id": from_court_id,
+                            "to_court_id": to_court_id,
+                            "swap_with_registration_id": other_id,
+                            "source": "bulk",
+                        },
+                    })
+                results.append({
+                    "op": "swap",
+                    "registration_id": op.registration_id,
+                    "other_registration_id": op.other_registration_id,
+                })
+
+        # Promover WAITLIST (FIFO) a los cupos liberados, cancha por cancha.
+        waitlist = [
+            str(r["id"]) for r in reg_rows
+            if regs[str(r["id"])]["status"] == "WAITLIST" and not regs[str(r["id"])]["court_id"]
+        ]
+        promoted_ids: list[str] = []
+
+        for court_id, slots in freed_slots.items():
+            court = courts[court_id]
+            while slots > 0 and waitlist and court["is_open"] and occupancy[court_id] < court["capacity"]:
+                wait_id = waitlist.pop(0)
+                regs[wait_id]["status"] = "CONFIRMED"
+                regs[wait_id]["court_id"] = court_id
+                occupancy[court_id] += 1
+                slots -= 1
+                promoted_ids.append(wait_id)
+                audit_rows.append({
+                    "event_id": event_id,
+                    "actor_user_id": actor_user_id,
+                    "action": "PROMOTE_WAITLIST",
+                    "target_registration_id": wait_id,
+                    "metadata": {"source": "auto_from_bulk"},
+                })
+
+        # Escribir solo las inscripciones cuyo estado final cambió.
+        changes = [
+            {"id": rid, "status": state["status"], "court_id": state["court_id"]}
+            for rid, state in regs.items()
+            if state != original[rid]
+        ]
+
+        if changes:
+            conn.execute(text("""
+                update public.event_registrations r
+                set status = x.status,
+                    court_id = x.court_id,
+                    cancelled_at = case when x.status = 'CANCELLED' then now() else r.cancelled_at end,
+                    updated_at = now()
+                from jsonb_to_recordset(CAST(:changes AS jsonb)) as x(id uuid, status text, court_id uuid)
+                where r.id = x.id
+            """), {"changes": json.dumps(changes)})
+
+        insert_audit_rows(conn, audit_rows)
+
+        # Avisos dirigidos: un fan-out por tipo, no uno por jugador.
+        moved_ids = [
+            rid for rid, state in regs.items()
+            if state["status"] == "CONFIRMED"
+            and original[rid]["status"] == "CONFIRMED"
+            and state["court_id"] != original[rid]["court_id"]
+        ]
+        notified = notify_court_moved(conn, moved_ids) + notify_waitlist_promoted(conn, promoted_ids)
+
+    notification_cache.invalidate_inbox(notified)
+
+    return {
+        "event_id": event_id,
+        "applied": len(ops),
+        "results": results,
+        "promoted_registration_ids": promoted_ids,
+        "message": "Operaciones aplicadas",
+    }
@@ -1,6 +1,9 @@
+import hashlib
+import json
 import logging
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import JSONResponse
 from app.utils.deps import get_actor_user_id
 from sqlalchemy import text
 
@@ -8,7 +11,11 @@ from app.settings import engine
 from app.schemas import CreateNotificationRequest
 from app.utils.permissions import require_permission
 from app.utils.ratelimit import rate_limit
-from app.routers.ratings import get_pending_ratings
+from app.utils.audit import audit_queue
+from app.routers.ratings import pending_ratings_count_query
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.db import fetch_many
+from app.utils.notification_cache import notification_cache
 
 router = APIRouter()
 admin_router = APIRouter()
@@ -21,6 +28,7 @@ def _fmt_ts(value):
 
 @router.get("/notifications")
 def get_notifications(
+    request: Request,
     actor_user_id: str = Depends(get_actor_user_id),
     limit: int = Query(50, ge=1, le=200),
 ):
@@ -28,38 +36,14 @@ def get_notifications(
     Devuelve notificaciones activas para el usuario:
     - Informativas (persistidas) no descartadas y no vencidas.
     - Dinamica de votos pendientes.
+    - No leidas de la bandeja dirigida (inbox_unread_count; ver GET /notifications/inbox).
+    Sale del cache en memoria (app/utils/notification_cache.py): si no cambio nada no
+    hace SQL. Responde con ETag; con If-None-Match igual devuelve 304 sin cuerpo.
     """
-    with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT
-                n.id,
-                n.kind,
-                n.title,
-                n.message,
-                n.action_url,
-                n.created_at,
-                n.expires_at
-            FROM public.notifications n
-            LEFT JOIN public.user_notification_dismissals d
-                ON d.notification_id = n.id
-               AND d.user_id = :actor_user_id
-            WHERE n.is_active = true
-              AND n.starts_at <= now()
-              AND n.expires_at > now()
-              AND d.notification_id IS NULL
-            ORDER BY n.created_at DESC
-            LIMIT :limit
-        """), {
-            "actor_user_id": actor_user_id,
-            "limit": limit,
-        }).mappings().all()
-
-        actor_participates_ranking = conn.execute(text("""
-            SELECT ranking_opt_in
-            FROM public.users
-            WHERE id = :actor_user_id
-            LIMIT 1
-        """), {"actor_user_id": actor_user_id}).mappings().first()
+    globals_, dismissed, pending_ratings_count, inbox_unread_count = notification_cache.snapshot(
+        actor_user_id, pending_ratings_count_query(actor_user_id),
+    )
+    rows = [n for n in globals_ if str(n["id"]) not in dismissed][:limit]
 
     items = [{
         "id": str(r["id"]),
@@ -72,16 +56,6 @@ def get_notifications(
         "expires_at": _fmt_ts(r["expires_at"]),
     } for r in rows]
 
-    pending_ratings_count = 0
-    can_show_pending = bool(actor_participates_ranking and actor_participates_ranking["ranking_opt_in"])
-
-    if can_show_pending:
-        try:
-            pending = get_pending_ratings(actor_user_id=actor_user_id)
-            pending_ratings_count = int(pending.get("total_pending", 0))
-        except Exception:
-            pending_ratings_count = 0
-
     if pending_ratings_count > 0:
         items.insert(0, {
             "id": "pending-ratings",
@@ -99,11 +73,17 @@ def get_notifications(
             "meta": {"pending_count": pending_ratings_count},
         })
 
-    return {
+    payload = {
         "unread_count": len(items),
         "pending_ratings_count": pending_ratings_count,
+        "inbox_unread_count": inbox_unread_count,
         "items": items,
     }
+    etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
 
 
 @router.post("/notifications/{notification_id}/dismiss")
@@ -148,9 +128,139 @@ def dismiss_notification(
             "notification_id": notification_id,
         })
 
+    notification_cache.add_dismissal(actor_user_id, notification_id)
+
     return {"notification_id": notification_id, "message": "Notificacion descartada."}
 
 
+# =========================
+# Bandeja dirigida (migrations/022)
+# =========================
+
+def _serialize_inbox_item(r) -> dict:
+    return {
+        "id": str(r["id"]),
+        "kind": r["kind"],
+        "title": r["title"],
+        "message": r["message"],
+        "action_url": r["action_url"],
+        "event_id": str(r["event_id"]) if r["event_id"] else None,
+        "court_id": str(r["court_id"]) if r["court_id"] else None,
+        "metadata": r["metadata"] or {},
+        "created_at": _fmt_ts(r["created_at"]),
+        "read_at": _fmt_ts(r["read_at"]),
+    }
+
+
+@router.get("/notifications/inbox")
+def get_inbox(
+    actor_user_id: str = Depends(get_actor_user_id),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(default=None, description="next_cursor de la pagina anterior."),
+):
+    """
+    Notificaciones dirigidas al usuario, mas nuevas primero.
+    Paginacion keyset sobre (user_id, created_at, id); unread_count sale del contador.
+    """
+    conditions = ["un.user_id = :user_id"]
+    params = {"user_id": actor_user_id, "sql_limit": limit + 1}
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        conditions.append("(un.created_at, un.id) < (:cursor_created_at, CAST(:cursor_id AS uuid))")
+        params["cursor_created_at"] = cursor_created_at
+        params["cursor_id"] = cursor_id
+
+    with engine.connect() as conn:
+        rows, counter = fetch_many(
+            conn,
+            (text(f"""
+                SELECT id, kind, title, message, action_url, event_id, court_id,
+                       metadata, created_at, read_at
+                FROM public.user_notifications un
+                WHERE {" AND ".join(conditions)}
+                ORDER BY un.created_at DESC, un.id DESC
+                LIMIT :sql_limit
+            """), params),
+            (text("""
+                SELECT unread_count
+                FROM public.user_notification_counters
+                WHERE user_id = :user_id
+            """), {"user_id": actor_user_id}),
+        )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [_serialize_inbox_item(r) for r in rows],
+        "unread_count": int(counter[0]["unread_count"]) if counter else 0,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None,
+    }
+
+
+# Marca como leidas y descuenta del contador en el mismo statement.
+_MARK_READ_SQL = """
+    WITH marked AS (
+        UPDATE public.user_notifications
+        SET read_at = now()
+        WHERE user_id = :user_id
+          AND read_at IS NULL
+          {extra_filter}
+        RETURNING id
+    ),
+    counter AS (
+        UPDATE public.user_notification_counters
+        SET unread_count = GREATEST(unread_count - (SELECT COUNT(*) FROM marked), 0),
+            updated_at = now()
+        WHERE user_id = :user_id
+          AND EXISTS (SELECT 1 FROM marked)
+        RETURNING unread_count
+    )
+    SELECT
+        (SELECT COUNT(*) FROM marked) AS marked,
+        (SELECT unread_count FROM counter) AS unread_count
+"""
+
+
+@router.post("/notifications/inbox/{notification_id}/read")
+def mark_inbox_read(
+    notification_id: str,
+    actor_user_id: str = Depends(get_actor_user_id),
+):
+    """Marca una notificacion dirigida como leida (idempotente)."""
+    with engine.begin() as conn:
+        exists = conn.execute(text("""
+            SELECT 1
+            FROM public.user_notifications
+            WHERE id = :notification_id
+              AND user_id = :user_id
+        """), {"notification_id": notification_id, "user_id": actor_user_id}).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Notificacion no encontrada.")
+
+        res = conn.execute(
+            text(_MARK_READ_SQL.format(extra_filter="AND id = :notification_id")),
+            {"user_id": actor_user_id, "notification_id": notification_id},
+        ).mappings().first()
+
+    notification_cache.invalidate_inbox([actor_user_id])
+    return {"notification_id": notification_id, "marked": int(res["marked"])}
+
+
+@router.post("/notifications/inbox/read-all")
+def mark_inbox_read_all(actor_user_id: str = Depends(get_actor_user_id)):
+    """Marca todas las notificaciones dirigidas del usuario como leidas."""
+    with engine.begin() as conn:
+        res = conn.execute(
+            text(_MARK_READ_SQL.format(extra_filter="")),
+            {"user_id": actor_user_id},
+        ).mappings().first()
+
+    notification_cache.invalidate_inbox([actor_user_id])
+    return {"marked": int(res["marked"]), "unread_count": 0}
+
+
 @admin_router.get("/notifications")
 def list_admin_notifications(
     actor_user_id: str = Depends(get_actor_user_id),
@@ -260,29 +370,18 @@ def create_notification(
             "actor_user_id": actor_user_id,
         }).mappings().first()
 
-    # Auditoria best-effort: no debe romper la creacion de notificaciones.
-    try:
-        with engine.begin() as conn:
-            conn.execute(text("""
-                INSERT INTO public.event_audit_log (
-                    event_id, actor_user_id, action, metadata
-                )
-                VALUES (
-                    NULL,
-                    :actor_user_id,
-                    'CREATE_NOTIFICATION',
-                    jsonb_build_object(
-                        'notification_id', CAST(:notification_id AS text),
-                        'expires_in_days', :expires_in_days
-                    )
-                )
-            """), {
-                "actor_user_id": actor_user_id,
-                "notification_id": str(row["id"]),
-                "expires_in_days": body.expires_in_days,
-            })
-    except Exception:
-        logger.exception("Failed to write CREATE_NOTIFICATION audit log.")
+    notification_cache.invalidate_global()
+
+    # Auditoria best-effort: se encola y se inserta en lote fuera del request.
+    audit_queue.enqueue({
+        "event_id": None,
+        "actor_user_id": actor_user_id,
+        "action": "CREATE_NOTIFICATION",
+        "metadata": {
+            "notification_id": str(row["id"]),
+            "expires_in_days": body.expires_in_days,
+        },
+    })
 
     return {
         "id": str(row["id"]),
@@ -318,24 +417,14 @@ def deactivate_notification(
         if not row:
             raise HTTPException(status_code=404, detail="Notificacion no encontrada o ya desactivada.")
 
-    # Auditoria best-effort: no debe romper la desactivacion.
-    try:
-        with engine.begin() as conn:
-            conn.execute(text("""
-                INSERT INTO public.event_audit_log (
-                    event_id, actor_user_id, action, metadata
-                )
-                VALUES (
-                    NULL,
-                    :actor_user_id,
-                    'DEACTIVATE_NOTIFICATION',
-                    jsonb_build_object('notification_id', CAST(:notification_id AS text))
-                )
-            """), {
-                "actor_user_id": actor_user_id,
-                "notification_id": notification_id,
-            })
-    except Exception:
-        logger.exception("Failed to write DEACTIVATE_NOTIFICATION audit log.")
+    notification_cache.invalidate_global()
+
+    # Auditoria best-effort: se encola y se inserta en lote fuera del request.
+    audit_queue.enqueue({
+        "event_id": None,
+        "actor_user_id": actor_user_id,
+        "action": "DEACTIVATE_NOTIFICATION",
+        "metadata": {"notification_id": notification_id},
+    })
 
     return {"notification_id": notification_id, "message": "Notificacion desactivada."}
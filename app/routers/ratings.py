@@ -1,13 +1,23 @@
 import json
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
 from app.utils.deps import get_actor_user_id
 from sqlalchemy import text
 
 from app.schemas import SaveRatingsRequest
 from app.settings import engine
-from app.utils.scoring import score_payload, RECENCY_DECAY_PER_DAY, ALL_ATTRIBUTES
+from app.utils.scoring import (
+    attribute_profile,
+    ALL_ATTRIBUTES,
+    MIN_DISTINCT_VOTERS,
+    RANKING_TIERS,
+    RANKING_TIER_REST,
+)
+from app.utils.db import fetch_many
+from app.utils.player_card_cache import load_player_stats, rating_payload
+from app.utils.idempotency import claim_idempotency_key, store_idempotent_response
+from app.utils.notification_cache import notification_cache
 
 router = APIRouter()
 
@@ -87,6 +97,50 @@ def _parse_attributes(value):
     return []
 
 
+# Solo el numero de votos pendientes (para la campanita, que pollean todos los clientes):
+# mismas reglas que get_pending_ratings pero en un unico agregado, sin armar peers ni
+# votos existentes. Si el actor no participa del ranking devuelve 0.
+_PENDING_COUNT_QUERY = text(
+    """
+    SELECT COUNT(*) AS total_pending
+    FROM public.users me
+    JOIN public.event_registrations er
+        ON er.user_id = me.id
+        AND er.status = 'CONFIRMED'
+        AND er.registration_type = 'USER'
+    JOIN public.events e
+        ON e.id = er.event_id
+        AND e.status = 'FINALIZED'
+        AND e.finalized_at IS NOT NULL
+        AND e.finalized_at >= (now() - make_interval(days => :window_days))
+    JOIN public.event_registrations peer
+        ON peer.event_id = er.event_id
+        AND peer.court_id = er.court_id
+        AND peer.status = 'CONFIRMED'
+        AND peer.registration_type = 'USER'
+        AND peer.user_id != me.id
+    JOIN public.users pu
+        ON pu.id = peer.user_id
+        AND pu.ranking_opt_in = true
+    WHERE me.id = :actor
+      AND me.ranking_opt_in = true
+      AND NOT EXISTS (
+          SELECT 1
+          FROM public.player_ratings pr
+          WHERE pr.event_id = er.event_id
+            AND pr.court_id = er.court_id
+            AND pr.voter_user_id = me.id
+            AND pr.target_user_id = peer.user_id
+      )
+    """
+)
+
+
+def pending_ratings_count_query(actor_user_id: str):
+    """(query, params) del conteo de votos pendientes, listo para conn.execute o fetch_many."""
+    return _PENDING_COUNT_QUERY, {"actor": actor_user_id, "window_days": VOTING_WINDOW_DAYS}
+
+
 @router.get("/ratings/pending")
 def get_pending_ratings(actor_user_id: str = Depends(get_actor_user_id)):
     """
@@ -240,13 +294,19 @@ def get_pending_ratings(actor_user_id: str = Depends(get_actor_user_id)):
 def save_ratings(
     body: SaveRatingsRequest,
     actor_user_id: str = Depends(get_actor_user_id),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
-    Guarda calificaciones (parcial). Upsert por unique constraint.
+    Guarda calificaciones (parcial). Upsert multi-fila por unique constraint (un statement).
+    Con Idempotency-Key, un reintento devuelve la respuesta original sin reescribir.
     """
     ratings = body.ratings or []
 
     with engine.begin() as conn:
+        replay = claim_idempotency_key(conn, actor_user_id, idempotency_key, "ratings", body)
+        if replay is not None:
+            return replay
+
         actor_opt_in = _get_user_ranking_state(conn, actor_user_id)
         if not actor_opt_in:
             raise HTTPException(
@@ -361,63 +421,74 @@ def save_ratings(
                 }
             )
 
-        saved = 0
-        for vote in prepared_votes:
-            conn.execute(
-                text(
-                    """
+        # Si el mismo target viene repetido, gana el ultimo (como con el upsert uno a uno):
+        # un INSERT multi-fila no puede tocar dos veces la misma fila en el ON CONFLICT.
+        votes_by_target = {vote["target"]: vote for vote in prepared_votes}
+        votes = list(votes_by_target.values())
+
+        # Un solo statement: upsert de todos los votos (unnest de arrays paralelos) y
+        # los targets que este votante ya tenia calificados en la cancha. El SELECT de
+        # afuera ve la foto previa al upsert; unido al RETURNING da el set completo.
+        rated_targets = conn.execute(
+            text(
+                """
+                WITH upserted AS (
                     INSERT INTO public.player_ratings (
                         event_id, court_id, voter_user_id, target_user_id,
                         rating, comment, attributes, created_at, updated_at
                     )
-                    VALUES (
-                        :event_id, :court_id, :voter, :target,
-                        :rating, :comment, CAST(:attributes AS jsonb), now(), now()
-                    )
+                    SELECT
+                        :event_id, :court_id, :voter, v.target,
+                        v.rating, v.comment, v.attributes, now(), now()
+                    FROM unnest(
+                        CAST(:targets AS uuid[]),
+                        CAST(:ratings AS numeric[]),
+                        CAST(:comments AS text[]),
+                        CAST(:attributes AS jsonb[])
+                    ) AS v(target, rating, comment, attributes)
                     ON CONFLICT (court_id, voter_user_id, target_user_id)
                     DO UPDATE SET
-                        rating = :rating,
-                        comment = :comment,
-                        attributes = CAST(:attributes AS jsonb),
+                        rating = EXCLUDED.rating,
+                        comment = EXCLUDED.comment,
+                        attributes = EXCLUDED.attributes,
                         updated_at = now()
-                    """
-                ),
-                {
-                    "event_id": body.event_id,
-                    "court_id": body.court_id,
-                    "voter": actor_user_id,
-                    "target": vote["target"],
-                    "rating": vote["rating"],
-                    "comment": vote["comment"],
-                    "attributes": vote["attributes"],
-                },
-            )
-            saved += 1
-
-        total_targets = sum(1 for is_opted in target_opt_in.values() if is_opted)
-
-        rated_count = conn.execute(
-            text(
-                """
-                SELECT COUNT(*) AS cnt
+                    RETURNING target_user_id
+                )
+                SELECT target_user_id::text AS target_user_id FROM upserted
+                UNION
+                SELECT pr.target_user_id::text
                 FROM public.player_ratings pr
-                JOIN public.users u ON u.id = pr.target_user_id
                 WHERE pr.event_id = :event_id
                   AND pr.court_id = :court_id
-                  AND pr.voter_user_id = :actor
-                  AND u.ranking_opt_in = true
+                  AND pr.voter_user_id = :voter
                 """
             ),
             {
                 "event_id": body.event_id,
                 "court_id": body.court_id,
-                "actor": actor_user_id,
+                "voter": actor_user_id,
+                "targets": [vote["target"] for vote in votes],
+                "ratings": [vote["rating"] for vote in votes],
+                "comments": [vote["comment"] for vote in votes],
+                "attributes": [vote["attributes"] for vote in votes],
             },
-        ).mappings().first()["cnt"]
+        ).scalars().all()
+        saved = len(prepared_votes)
+
+        # Pendientes: targets de la cancha que participan del ranking y todavia no tienen voto.
+        rated = set(rated_targets)
+        pending_after = sum(
+            1 for target_id, is_opted in target_opt_in.items()
+            if is_opted and target_id not in rated
+        )
 
-        pending_after = total_targets - int(rated_count)
+        response = store_idempotent_response(
+            conn, actor_user_id, idempotency_key,
+            {"saved": saved, "pending_after": max(pending_after, 0)},
+        )
 
-    return {"saved": saved, "pending_after": max(pending_after, 0)}
+    notification_cache.invalidate_pending(actor_user_id)
+    return response
 
 
 @router.get("/users/{user_id}/rating")
@@ -433,40 +504,16 @@ def get_user_rating(
                 return {"participates": False, "message": "No participas del ranking"}
             return {"participates": False}
 
-        result = conn.execute(
-            text(
-                """
-                SELECT
-                    COALESCE(AVG(rating), 0) AS avg_rating,
-                    COUNT(*) AS total_votes,
-                    COUNT(DISTINCT voter_user_id) AS voters,
-                    COALESCE(SUM(
-                        rating * exp(-:decay * EXTRACT(EPOCH FROM (now() - created_at)) / 86400.0)
-                    ), 0) AS weighted_sum,
-                    COALESCE(SUM(
-                        exp(-:decay * EXTRACT(EPOCH FROM (now() - created_at)) / 86400.0)
-                    ), 0) AS weight_total,
-                    (SELECT AVG(rating) FROM public.player_ratings WHERE is_hidden = false) AS global_mean
-                FROM public.player_ratings
-                WHERE target_user_id = :user_id
-                  AND is_hidden = false
-                """
-            ),
-            {"user_id": user_id, "decay": RECENCY_DECAY_PER_DAY},
-        ).mappings().first()
-
-        payload = score_payload(
-            result["total_votes"], result["voters"], result["weighted_sum"],
-            result["weight_total"], result["avg_rating"], result["global_mean"],
-        )
+        stats_by_user, global_mean = load_player_stats(conn, [user_id])
+        stats = stats_by_user[user_id]
 
         return {
             "participates": True,
             "user_id": user_id,
             # avg_rating: promedio crudo (compat). score: bayesiano (nuevo, el que se muestra).
-            "avg_rating": round(float(result["avg_rating"]), 1),
-            "total_votes": int(result["total_votes"]),
-            **payload,
+            "avg_rating": round(stats["avg_raw"] or 0.0, 1),
+            "total_votes": stats["votes"],
+            **rating_payload(stats, global_mean, simple_avg_key="avg_raw"),
         }
 
 
@@ -484,44 +531,18 @@ def get_user_attributes(
                 return {"participates": False, "message": "No participas del ranking"}
             return {"participates": False}
 
-        rows = conn.execute(
-            text(
-                """
-                SELECT
-                    attr.attribute,
-                    COUNT(*) AS cnt
-                FROM (
-                    SELECT jsonb_array_elements_text(pr.attributes) AS attribute
-                    FROM public.player_ratings pr
-                    WHERE pr.target_user_id = :user_id
-                      AND pr.is_hidden = false
-                      AND jsonb_typeof(pr.attributes) = 'array'
-                ) attr
-                GROUP BY attr.attribute
-                ORDER BY cnt DESC, attr.attribute ASC
-                LIMIT :limit
-                """
-            ),
-            {"user_id": user_id, "limit": limit},
-        ).mappings().all()
-
-        counts = {str(r["attribute"]): int(r["cnt"]) for r in rows}
-        total_votes = conn.execute(
-            text("""
-                SELECT COUNT(*) FROM public.player_ratings
-                WHERE target_user_id = :user_id AND is_hidden = false
-            """),
-            {"user_id": user_id},
-        ).scalar() or 0
+        stats_by_user, _ = load_player_stats(conn, [user_id])
+        stats = stats_by_user[user_id]
 
+        counts = {a["code"]: a["count"] for a in stats["attributes"]}
         return {
             "participates": True,
             "top": [
-                {"attribute": str(r["attribute"]), "count": int(r["cnt"])}
-                for r in rows
+                {"attribute": a["code"], "count": a["count"]}
+                for a in stats["attributes"][:limit]
             ],
             # Perfil de 6 ejes para el radar (M5).
-            "profile": attribute_profile(counts, total_votes),
+            "profile": attribute_profile(counts, stats["votes"]),
         }
 
 
@@ -617,3 +638,164 @@ def get_user_comments(
             "page_size": page_size,
             "total": int(total),
         }
+
+
+_RANKING_TIER_PATTERN = "^(" + "|".join([name for _, name in RANKING_TIERS] + [RANKING_TIER_REST]) + ")$"
+
+_RANKING_USER_COLUMNS = """
+    lb.user_id,
+    lb.score,
+    lb.votes,
+    lb.voters,
+    lb.tier,
+    lb.refreshed_at,
+    u.full_name,
+    u.nickname,
+    u.avatar_url
+"""
+
+
+def _serialize_ranking_row(r) -> dict:
+    return {
+        "rank": int(r["rank"]),
+        "user": {
+            "user_id": str(r["user_id"]),
+            "full_name": r["full_name"],
+            "nickname": r["nickname"],
+            "avatar_url": r["avatar_url"],
+        },
+        "score": float(r["score"]),
+        "votes": int(r["votes"]),
+        "voters": int(r["voters"]),
+        "tier": r["tier"],
+        **({"count": int(r["count"]), "share": float(r["share"])} if "share" in r else {}),
+    }
+
+
+@router.get("/rankings")
+def get_rankings(
+    actor_user_id: str = Depends(get_actor_user_id),
+    attribute: str | None = None,
+    tier: str | None = Query(None, pattern=_RANKING_TIER_PATTERN),
+    limit: int = Query(20, ge=1, le=100),
+    after_rank: int | None = Query(None, ge=1),
+):
+    """
+    Leaderboard (M6): general o por atributo ("mejores en DEFENSA"), opcionalmente
+    por tier. Sale de player_leaderboard (app/jobs/leaderboard.py), no se calcula al
+    leer. Paginacion keyset por puesto: para la siguiente pagina, pasar
+    `after_rank=next_after_rank`.
+    Solo lo ven quienes participan del ranking. Un jugador que se da de baja deja de
+    aparecer en el acto; los puestos se reacomodan en el proximo refresco.
+    """
+    if attribute is not None and attribute not in ALLOWED_ATTRIBUTES:
+        raise HTTPException(status_code=400, detail=f"Atributo {attribute} invalido.")
+
+    with engine.connect() as conn:
+        if not _get_user_ranking_state(conn, actor_user_id):
+            return {"participates": False, "message": "No participas del ranking", "items": []}
+
+        conditions = ["u.ranking_opt_in = true"]
+        params = {"sql_limit": limit + 1, "after_rank": after_rank or 0}
+        if tier:
+            conditions.append("lb.tier = :tier")
+            params["tier"] = tier
+
+        if attribute:
+            params["attribute"] = attribute
+            query = f"""
+                SELECT la.attribute_rank AS rank, la.count, la.share, {_RANKING_USER_COLUMNS}
+                FROM public.player_leaderboard_attributes la
+                JOIN public.player_leaderboard lb ON lb.user_id = la.user_id
+                JOIN public.users u ON u.id = la.user_id
+                WHERE la.attribute = :attribute
+                  AND la.attribute_rank > :after_rank
+                  AND {" AND ".join(conditions)}
+                ORDER BY la.attribute_rank ASC
+                LIMIT :sql_limit
+            """
+        else:
+            query = f"""
+                SELECT lb.overall_rank AS rank, {_RANKING_USER_COLUMNS}
+                FROM public.player_leaderboard lb
+                JOIN public.users u ON u.id = lb.user_id
+                WHERE lb.overall_rank > :after_rank
+                  AND {" AND ".join(conditions)}
+                ORDER BY lb.overall_rank ASC
+                LIMIT :sql_limit
+            """
+
+        rows = conn.execute(text(query), params).mappings().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "participates": True,
+        "attribute": attribute,
+        "tier": tier,
+        "items": [_serialize_ranking_row(r) for r in rows],
+        "has_more": has_more,
+        "next_after_rank": int(rows[-1]["rank"]) if has_more else None,
+        "refreshed_at": str(rows[0]["refreshed_at"]) if rows else None,
+    }
+
+
+@router.get("/rankings/me")
+def get_my_ranking(actor_user_id: str = Depends(get_actor_user_id)):
+    """
+    Mi posicion en el leaderboard general y en cada atributo. Lecturas por PK/indice
+    (no cuenta filas por delante). Si todavia no estoy rankeado, cuantos votantes
+    distintos tengo contra los MIN_DISTINCT_VOTERS necesarios.
+    """
+    with engine.connect() as conn:
+        if not _get_user_ranking_state(conn, actor_user_id):
+            return {"participates": False, "message": "No participas del ranking"}
+
+        board, attributes = fetch_many(
+            conn,
+            (text("""
+                SELECT overall_rank, players_total, score, votes, voters, percentile, tier, refreshed_at
+                FROM public.player_leaderboard
+                WHERE user_id = :user_id
+            """), {"user_id": actor_user_id}),
+            (text("""
+                SELECT attribute, attribute_rank, attribute_total, count, share
+                FROM public.player_leaderboard_attributes
+                WHERE user_id = :user_id
+                ORDER BY attribute_rank ASC, attribute ASC
+            """), {"user_id": actor_user_id}),
+        )
+
+        if not board:
+            stats_by_user, _ = load_player_stats(conn, [actor_user_id])
+            return {
+                "participates": True,
+                "ranked": False,
+                "voters": stats_by_user[actor_user_id]["voters"],
+                "min_voters": MIN_DISTINCT_VOTERS,
+            }
+
+    me = board[0]
+    return {
+        "participates": True,
+        "ranked": True,
+        "rank": int(me["overall_rank"]),
+        "players_total": int(me["players_total"]),
+        "score": float(me["score"]),
+        "votes": int(me["votes"]),
+        "voters": int(me["voters"]),
+        "percentile": float(me["percentile"]),
+        "tier": me["tier"],
+        "attributes": [
+            {
+                "attribute": a["attribute"],
+                "rank": int(a["attribute_rank"]),
+                "total": int(a["attribute_total"]),
+                "count": int(a["count"]),
+                "share": float(a["share"]),
+            }
+            for a in attributes
+        ],
+        "refreshed_at": str(me["refreshed_at"]),
+    }
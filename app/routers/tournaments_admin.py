@@ -18,6 +18,7 @@ from app.schemas import (
 from app.settings import engine
 from app.utils.datetime_parser import parse_client_datetime
 from app.utils.permissions import require_permission
+from app.utils.db import fetch_many
 
 router = APIRouter()
 
@@ -270,20 +271,11 @@ def _seed_playoffs(conn, tournament_id: str):
             )
 
 
-def compute_group_standings(conn, tournament_id: str, group_label: str):
-    """Compute standings for a single group within a GROUPS_PLAYOFFS tournament."""
-    teams = conn.execute(
-        text(
-            """
-            SELECT id, name, logo_emoji
-            FROM public.tournament_teams
-            WHERE tournament_id = :tid AND group_label = :group_label
-            ORDER BY created_at ASC, id ASC
-            """
-        ),
-        {"tid": tournament_id, "group_label": group_label},
-    ).mappings().all()
-
+def _tally_standings(teams, matches):
+    """
+    Tabla de posiciones a partir de equipos (id, name, logo_emoji) y partidos
+    FINISHED con ambos equipos. Desempate: puntos, diferencia de gol, goles a favor.
+    """
     stats = {
         str(t["id"]): {
             "team_id": str(t["id"]),
@@ -295,42 +287,30 @@ def compute_group_standings(conn, tournament_id: str, group_label: str):
         for t in teams
     }
 
-    matches = conn.execute(
-        text(
-            """
-            SELECT home_team_id, away_team_id, home_goals, away_goals
-            FROM public.tournament_matches
-            WHERE tournament_id = :tid
-              AND stage = 'GROUP'
-              AND group_label = :group_label
-              AND status = 'FINISHED'
-              AND home_team_id IS NOT NULL
-              AND away_team_id IS NOT NULL
-            """
-        ),
-        {"tid": tournament_id, "group_label": group_label},
-    ).mappings().all()
-
     for m in matches:
         home_id = str(m["home_team_id"])
         away_id = str(m["away_team_id"])
         if home_id not in stats or away_id not in stats:
             continue
-        hg = int(m["home_goals"] or 0)
-        ag = int(m["away_goals"] or 0)
+
+        home_goals = int(m["home_goals"] or 0)
+        away_goals = int(m["away_goals"] or 0)
+
         home = stats[home_id]
         away = stats[away_id]
+
         home["pj"] += 1
         away["pj"] += 1
-        home["gf"] += hg
-        home["gc"] += ag
-        away["gf"] += ag
-        away["gc"] += hg
-        if hg > ag:
+        home["gf"] += home_goals
+        home["gc"] += away_goals
+        away["gf"] += away_goals
+        away["gc"] += home_goals
+
+        if home_goals > away_goals:
             home["pg"] += 1
             away["pp"] += 1
             home["pts"] += 3
-        elif ag > hg:
+        elif away_goals > home_goals:
             away["pg"] += 1
             home["pp"] += 1
             away["pts"] += 3
@@ -349,54 +329,88 @@ def compute_group_standings(conn, tournament_id: str, group_label: str):
     )
 
 
-def _get_tournament(conn, tournament_id: str):
-    row = conn.execute(
-        text(
-            """
-            SELECT id, title, location_name, starts_at, status, format,
-                   teams_count, minutes_per_match, public_token, created_at, updated_at
-            FROM public.tournaments
-            WHERE id = :tournament_id
-            """
-        ),
-        {"tournament_id": tournament_id},
-    ).mappings().first()
-    if not row:
-        raise HTTPException(status_code=404, detail="Torneo no encontrado.")
-    return row
-
-
-def _team_map(conn, tournament_id: str):
+def compute_group_standings(conn, tournament_id: str, group_label: str):
+    """Compute standings for a single group within a GROUPS_PLAYOFFS tournament."""
     teams = conn.execute(
         text(
             """
-            SELECT id, tournament_id, name, logo_emoji, is_guest, group_label, created_at
+            SELECT id, name, logo_emoji
             FROM public.tournament_teams
-            WHERE tournament_id = :tournament_id
+            WHERE tournament_id = :tid AND group_label = :group_label
             ORDER BY created_at ASC, id ASC
             """
         ),
-        {"tournament_id": tournament_id},
+        {"tid": tournament_id, "group_label": group_label},
     ).mappings().all()
-    return teams, {str(t["id"]): t for t in teams}
 
-
-def _match_payload(conn, tournament_id: str):
-    teams, team_by_id = _team_map(conn, tournament_id)
     matches = conn.execute(
         text(
             """
-            SELECT id, tournament_id, round, sort_order, home_team_id, away_team_id,
-                   status, home_goals, away_goals, started_at, ended_at, next_match_id, next_slot,
-                   group_label, stage
+            SELECT home_team_id, away_team_id, home_goals, away_goals
             FROM public.tournament_matches
-            WHERE tournament_id = :tournament_id
-            ORDER BY round ASC, sort_order ASC
+            WHERE tournament_id = :tid
+              AND stage = 'GROUP'
+              AND group_label = :group_label
+              AND status = 'FINISHED'
+              AND home_team_id IS NOT NULL
+              AND away_team_id IS NOT NULL
             """
         ),
-        {"tournament_id": tournament_id},
+        {"tid": tournament_id, "group_label": group_label},
     ).mappings().all()
 
+    return _tally_standings(teams, matches)
+
+
+_TOURNAMENT_QUERY = text(
+    """
+    SELECT id, title, location_name, starts_at, status, format,
+           teams_count, minutes_per_match, public_token, created_at, updated_at
+    FROM public.tournaments
+    WHERE id = :tournament_id
+    """
+)
+
+_TEAMS_QUERY = text(
+    """
+    SELECT id, tournament_id, name, logo_emoji, is_guest, group_label, created_at
+    FROM public.tournament_teams
+    WHERE tournament_id = :tournament_id
+    ORDER BY created_at ASC, id ASC
+    """
+)
+
+_MATCHES_QUERY = text(
+    """
+    SELECT id, tournament_id, round, sort_order, home_team_id, away_team_id,
+           status, home_goals, away_goals, started_at, ended_at, next_match_id, next_slot,
+           group_label, stage
+    FROM public.tournament_matches
+    WHERE tournament_id = :tournament_id
+    ORDER BY round ASC, sort_order ASC
+    """
+)
+
+
+def _get_tournament(conn, tournament_id: str):
+    row = conn.execute(_TOURNAMENT_QUERY, {"tournament_id": tournament_id}).mappings().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Torneo no encontrado.")
+    return row
+
+
+def _team_map(conn, tournament_id: str):
+    teams = conn.execute(_TEAMS_QUERY, {"tournament_id": tournament_id}).mappings().all()
+    return teams, {str(t["id"]): t for t in teams}
+
+
+def _match_payload(conn, tournament_id: str):
+    teams, team_by_id = _team_map(conn, tournament_id)
+    matches = conn.execute(_MATCHES_QUERY, {"tournament_id": tournament_id}).mappings().all()
+    return teams, _build_match_payload(matches, team_by_id)
+
+
+def _build_match_payload(matches, team_by_id: dict):
     payload = []
     for m in matches:
         home = team_by_id.get(str(m["home_team_id"])) if m["home_team_id"] else None
@@ -429,7 +443,7 @@ def _match_payload(conn, tournament_id: str):
             }
         )
 
-    return teams, payload
+    return payload
 
 
 def compute_round_robin_standings(conn, tournament_id: str):
@@ -445,23 +459,6 @@ def compute_round_robin_standings(conn, tournament_id: str):
         {"tournament_id": tournament_id},
     ).mappings().all()
 
-    stats = {
-        str(t["id"]): {
-            "team_id": str(t["id"]),
-            "team_name": t["name"],
-            "emoji": t["logo_emoji"],
-            "pts": 0,
-            "pj": 0,
-            "pg": 0,
-            "pe": 0,
-            "pp": 0,
-            "gf": 0,
-            "gc": 0,
-            "dg": 0,
-        }
-        for t in teams
-    }
-
     matches = conn.execute(
         text(
             """
@@ -476,46 +473,7 @@ def compute_round_robin_standings(conn, tournament_id: str):
         {"tournament_id": tournament_id},
     ).mappings().all()
 
-    for m in matches:
-        home_id = str(m["home_team_id"])
-        away_id = str(m["away_team_id"])
-        if home_id not in stats or away_id not in stats:
-            continue
-
-        home_goals = int(m["home_goals"] or 0)
-        away_goals = int(m["away_goals"] or 0)
-
-        home = stats[home_id]
-        away = stats[away_id]
-
-        home["pj"] += 1
-        away["pj"] += 1
-        home["gf"] += home_goals
-        home["gc"] += away_goals
-        away["gf"] += away_goals
-        away["gc"] += home_goals
-
-        if home_goals > away_goals:
-            home["pg"] += 1
-            away["pp"] += 1
-            home["pts"] += 3
-        elif away_goals > home_goals:
-            away["pg"] += 1
-            home["pp"] += 1
-            away["pts"] += 3
-        else:
-            home["pe"] += 1
-            away["pe"] += 1
-            home["pts"] += 1
-            away["pts"] += 1
-
-    for row in stats.values():
-        row["dg"] = row["gf"] - row["gc"]
-
-    return sorted(
-        stats.values(),
-        key=lambda x: (-x["pts"], -x["dg"], -x["gf"], x["team_name"].lower()),
-    )
+    return _tally_standings(teams, matches)
 
 
 @router.post("/tournaments")
@@ -656,19 +614,27 @@ def get_tournament_detail(
 ):
     with engine.connect() as conn:
         require_permission(conn, actor_user_id, 'tournaments.view')
-        tournament = _get_tournament(conn, tournament_id)
-        teams, matches = _match_payload(conn, tournament_id)
-        members = conn.execute(
-            text(
+        # Torneo, equipos, partidos y miembros van juntos en un solo viaje a la DB;
+        # las posiciones se calculan en memoria con esos mismos partidos.
+        params = {"tournament_id": tournament_id}
+        tournaments, teams, match_rows, members = fetch_many(
+            conn,
+            (_TOURNAMENT_QUERY, params),
+            (_TEAMS_QUERY, params),
+            (_MATCHES_QUERY, params),
+            (text(
                 """
                 SELECT id, tournament_id, team_id, member_type, user_id, guest_name, level_override, created_at
                 FROM public.tournament_team_members
                 WHERE tournament_id = :tournament_id
                 ORDER BY created_at ASC
                 """
-            ),
-            {"tournament_id": tournament_id},
-        ).mappings().all()
+            ), params),
+        )
+        if not tournaments:
+            raise HTTPException(status_code=404, detail="Torneo no encontrado.")
+        tournament = tournaments[0]
+        matches = _build_match_payload(match_rows, {str(t["id"]): t for t in teams})
 
         members_by_team: dict[str, list[dict]] = {}
         for m in members:
@@ -704,14 +670,21 @@ def get_tournament_detail(
         standings = []
         group_standings = None
         fmt = tournament["format"]
+        finished = [
+            m for m in match_rows
+            if m["status"] == "FINISHED" and m["home_team_id"] and m["away_team_id"]
+        ]
         if fmt == "ROUND_ROBIN":
-            standings = compute_round_robin_standings(conn, tournament_id)
+            standings = _tally_standings(teams, finished)
         elif fmt == "GROUPS_PLAYOFFS":
             group_labels = sorted(set(t.get("group_label") for t in teams if t.get("group_label")))
             if group_labels:
                 group_standings = {}
                 for g in group_labels:
-                    group_standings[g] = compute_group_standings(conn, tournament_id, g)
+                    group_standings[g] = _tally_standings(
+                        [t for t in teams if t["group_label"] == g],
+                        [m for m in finished if m["stage"] == "GROUP" and m["group_label"] == g],
+                    )
 
         return {
             "tournament": {
@@ -16,6 +16,34 @@ class MoveRequest(BaseModel):
     to_court_id: str = Field(..., description="UUID de la cancha destino")
 
 
+class BulkRegistrationOperation(BaseModel):
+    """
+    Una operacion dentro de POST /events/{event_id}/registrations/bulk.
+    - move: mueve `registration_id` a `to_court_id`.
+    - cancel: cancela `registration_id`.
+    - swap: intercambia las canchas de `registration_id` y `other_registration_id`.
+    """
+    op: Literal["move", "cancel", "swap"]
+    registration_id: str = Field(..., description="UUID de la inscripcion")
+    to_court_id: str | None = Field(None, description="UUID de la cancha destino (solo move)")
+    other_registration_id: str | None = Field(None, description="UUID de la otra inscripcion (solo swap)")
+
+    @model_validator(mode="after")
+    def validate_operation(self):
+        if self.op == "move" and not self.to_court_id:
+            raise ValueError("Para op=move, to_court_id es obligatorio.")
+        if self.op == "swap":
+            if not self.other_registration_id:
+                raise ValueError("Para op=swap, other_registration_id es obligatorio.")
+            if self.other_registration_id == self.registration_id:
+                raise ValueError("Un swap necesita dos inscripciones distintas.")
+        return self
+
+
+class BulkRegistrationsRequest(BaseModel):
+    operations: list[BulkRegistrationOperation] = Field(..., min_length=1, max_length=100)
+
+
 class PinRegisterRequest(BaseModel):
     full_name: str = Field(..., min_length=3, max_length=120)
     phone: str = Field(..., min_length=6, max_length=30)
@@ -198,6 +226,17 @@ class PlayerCardsResponse(BaseModel):
     cards: list[PlayerCardItem]
 
 
+class EventPlayerCardsCourt(BaseModel):
+    court_id: str
+    name: str
+    cards: list[PlayerCardItem]
+
+
+class EventPlayerCardsResponse(BaseModel):
+    viewer: PlayerCardViewer
+    courts: list[EventPlayerCardsCourt]
+
+
 # ========== TOURNAMENTS ==========
 TournamentStatus = Literal["DRAFT", "LIVE", "FINISHED", "ARCHIVED"]
 TournamentFormat = Literal["ROUND_ROBIN", "KNOCKOUT", "GROUPS_PLAYOFFS"]
@@ -372,6 +411,15 @@ class CreateNotificationRequest(BaseModel):
 
 
 # ========== CALENDAR ANNOUNCEMENTS ==========
+class RecurrenceRule(BaseModel):
+    """Repeticion (ver app/utils/recurrence.py). Se expande al leer, no se guardan ocurrencias."""
+    freq: Literal["DAILY", "WEEKLY", "MONTHLY"]
+    interval: int = Field(1, ge=1, le=52)
+    by_weekday: list[int] | None = Field(None, max_length=7, description="Solo WEEKLY: 0=lunes ... 6=domingo")
+    until: str | None = Field(None, description="ISO 8601; ultima fecha posible (inclusive)")
+    count: int | None = Field(None, ge=1, le=500)
+
+
 class CreateAnnouncementRequest(BaseModel):
     title: str = Field(..., min_length=3, max_length=160)
     description: str | None = Field(None, max_length=1200)
@@ -380,6 +428,7 @@ class CreateAnnouncementRequest(BaseModel):
     location_name: str | None = Field(None, max_length=160)
     action_url: str | None = Field(None, max_length=500)
     action_label: str | None = Field(None, max_length=40)
+    recurrence: RecurrenceRule | None = None
 
 
 class UpdateAnnouncementRequest(BaseModel):
@@ -390,3 +439,62 @@ class UpdateAnnouncementRequest(BaseModel):
     location_name: str | None = Field(None, max_length=160)
     action_url: str | None = Field(None, max_length=500)
     action_label: str | None = Field(None, max_length=40)
+    recurrence: RecurrenceRule | None = Field(None, description="null explicito = deja de repetirse")
+
+
+# ========== EVENT TEMPLATES ==========
+class EventTemplateCourt(BaseModel):
+    name: str = Field(..., min_length=2, max_length=60)
+    capacity: int = Field(..., gt=0, le=50)
+    sort_order: int | None = Field(None, ge=1, description="Default: el orden en la lista")
+    is_open: bool = Field(default=True)
+    captain_user_ids: list[str] = Field(default_factory=list, max_length=10)
+
+
+class EventTemplateRequest(BaseModel):
+    """
+    Plantilla de evento: todo lo que hoy se carga a mano en cada evento (canchas, cupos,
+    capitanes, visibilidad, descripcion). `starts_at` es la fecha/hora de referencia: de
+    ahi sale la hora local de cada evento y el inicio de `recurrence`.
+    """
+    name: str = Field(..., min_length=3, max_length=80)
+    title: str = Field(..., min_length=3, max_length=120)
+    description: str | None = Field(None, max_length=1200)
+    location_name: str = Field(..., min_length=2, max_length=120)
+    visibility: EventVisibility = Field(default="PRIVATE")
+    starts_at: str | None = Field(None, description="ISO 8601 timestamp de referencia")
+    close_offset_minutes: int | None = Field(
+        None, ge=0, le=7 * 24 * 60,
+        description="close_at = starts_at - close_offset_minutes. null = sin cierre automatico.",
+    )
+    recurrence: RecurrenceRule | None = None
+    courts: list[EventTemplateCourt] = Field(..., min_length=1, max_length=12)
+
+    @model_validator(mode="after")
+    def validate_template(self):
+        names = [c.name.strip().lower() for c in self.courts]
+        if len(set(names)) != len(names):
+            raise ValueError("Las canchas de una plantilla deben tener nombres distintos.")
+        if self.recurrence and not self.starts_at:
+            raise ValueError("Una plantilla con recurrence necesita starts_at.")
+        return self
+
+
+class InstantiateEventTemplateRequest(BaseModel):
+    """
+    Crea eventos desde una plantilla. O fechas explicitas (`starts_at`), o una ventana
+    (`window_from`/`window_to`) donde se expande la recurrence de la plantilla.
+    Las fechas que ya tienen evento de esa plantilla se saltean.
+    """
+    starts_at: list[str] | None = Field(None, min_length=1, max_length=60)
+    window_from: str | None = Field(None, description="ISO 8601 timestamp")
+    window_to: str | None = Field(None, description="ISO 8601 timestamp")
+
+    @model_validator(mode="after")
+    def validate_dates(self):
+        has_window = bool(self.window_from or self.window_to)
+        if bool(self.starts_at) == has_window:
+            raise ValueError("Mandar starts_at o window_from/window_to (uno de los dos).")
+        if has_window and not (self.window_from and self.window_to):
+            raise ValueError("La ventana necesita window_from y window_to.")
+        return self
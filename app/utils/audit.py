@@ -0,0 +1,191 @@
+"""
+Escritura de filas en public.event_audit_log.
+
+`insert_audit_rows` manda N filas en un solo INSERT multi-fila (una sola ida y
+vuelta a la DB), en vez de un INSERT por fila. Cada fila es un dict con:
+    event_id, actor_user_id, action, target_registration_id (opcional), metadata (dict)
+
+`audit_queue.enqueue(row)` es la variante best-effort: no abre transaccion en el
+request, las filas se insertan en lote desde un thread (ver AuditQueue).
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import text
+
+from app.settings import engine
+
+logger = logging.getLogger(__name__)
+
+
+def insert_audit_rows(conn, rows: list[dict]) -> None:
+    """Inserta todas las filas de auditoria en un unico statement (no-op si no hay filas)."""
+    if not rows:
+        return
+
+    payload = [
+        {
+            "event_id": str(r["event_id"]) if r.get("event_id") else None,
+            "actor_user_id": str(r["actor_user_id"]) if r.get("actor_user_id") else None,
+            "action": r["action"],
+            "target_registration_id": (
+                str(r["target_registration_id"]) if r.get("target_registration_id") else None
+            ),
+            "metadata": r.get("metadata") or {},
+        }
+        for r in rows
+    ]
+
+    conn.execute(text("""
+        INSERT INTO public.event_audit_log (
+            event_id, actor_user_id, action, target_registration_id, metadata
+        )
+        SELECT x.event_id, x.actor_user_id, x.action, x.target_registration_id, x.metadata
+        FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS x(
+            event_id uuid,
+            actor_user_id uuid,
+            action text,
+            target_registration_id uuid,
+            metadata jsonb
+        )
+    """), {"rows": json.dumps(payload, default=str)})
+
+
+# =========================
+# Cola de auditoria best-effort
+# =========================
+# Para auditorias que no tienen que ser atomicas con la escritura (ej. notificaciones):
+# el handler encola la fila y responde; un thread las inserta en lote con
+# insert_audit_rows cuando se juntan FLUSH_SIZE filas o pasa FLUSH_INTERVAL_SECONDS.
+# El lifespan de la app la drena en el shutdown; lo que se encole despues se escribe en
+# el momento (no se relanza el thread). Cada proceso tiene su propia cola.
+# Si un lote falla, se reintenta fila por fila y solo se descartan (best-effort) las que
+# vuelven a fallar; se cuentan en `dropped`.
+
+FLUSH_SIZE = 100
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_QUEUE_SIZE = 10_000
+
+
+class AuditQueue:
+    def __init__(self):
+        self._rows: deque[dict] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.last_flush_at: float | None = None
+
+    def start(self) -> None:
+        with self._cond:
+            self._stopping = False
+            self._start_thread()
+
+    def _start_thread(self) -> None:
+        """Arranca el thread si no esta corriendo. Llamar con _cond tomado."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-queue", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, row: dict) -> None:
+        """Encola una fila (mismo formato que insert_audit_rows). Nunca lanza por la DB."""
+        with self._cond:
+            if self._stopping:
+                # Ya se pidio el drain: no relanzar el thread, escribir esta fila ahora.
+                self.enqueued += 1
+                stopped = True
+            elif len(self._rows) >= MAX_QUEUE_SIZE:
+                self.dropped += 1
+                logger.warning("audit queue llena; se descarta %s", row.get("action"))
+                return
+            else:
+                self._rows.append(row)
+                self.enqueued += 1
+                if len(self._rows) >= FLUSH_SIZE:
+                    self._cond.notify()
+                self._start_thread()
+                stopped = False
+        if stopped:
+            self._flush([row])
+
+    def _take_batch(self) -> list[dict]:
+        batch = []
+        while self._rows and len(batch) < FLUSH_SIZE:
+            batch.append(self._rows.popleft())
+        return batch
+
+    def _flush(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        try:
+            with engine.begin() as conn:
+                insert_audit_rows(conn, batch)
+            flushed, failed = len(batch), 0
+        except Exception:
+            logger.exception("No se pudo escribir un lote de %s filas de auditoria; se reintenta fila por fila", len(batch))
+            flushed, failed = self._flush_rows(batch), 1
+        with self._cond:
+            self.flushed += flushed
+            self.dropped += len(batch) - flushed
+            self.failed_flushes += failed
+            self.last_flush_at = time.time()
+
+    @staticmethod
+    def _flush_rows(batch: list[dict]) -> int:
+        """Una transaccion por fila: una fila mala no arrastra al resto. Devuelve cuantas entraron."""
+        written = 0
+        for row in batch:
+            try:
+                with engine.begin() as conn:
+                    insert_audit_rows(conn, [row])
+                written += 1
+            except Exception:
+                logger.exception("Se descarta la fila de auditoria %s", row.get("action"))
+        return written
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._rows) < FLUSH_SIZE:
+                    self._cond.wait(FLUSH_INTERVAL_SECONDS)
+                batch = self._take_batch()
+                stopping = self._stopping and not self._rows
+            self._flush(batch)
+            if stopping:
+                return
+
+    def drain(self, timeout: float = 10.0) -> None:
+        """Frena el thread despues de insertar todo lo pendiente (shutdown)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+        # Si el thread no llego a arrancar o se vencio el timeout, flush sincronico.
+        with self._cond:
+            batch = list(self._rows)
+            self._rows.clear()
+        self._flush(batch)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "depth": len(self._rows),
+                "enqueued": self.enqueued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_at": self.last_flush_at,
+                "running": bool(self._thread and self._thread.is_alive()),
+            }
+
+
+audit_queue = AuditQueue()
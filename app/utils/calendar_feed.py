@@ -0,0 +1,159 @@
+"""
+Feed ICS de Mi Calendario (GET /me/calendar.ics).
+
+- render_feed: genera el VCALENDAR (RFC 5545) de a un VEVENT por vez, para
+  StreamingResponse. Mismos items que GET /me/calendar.
+- CalendarFeedCache: ultimo feed renderizado por usuario, con su ETag. Las apps de
+  calendario pollean cada ~15 min; si el ETag no cambio y no mandan If-None-Match,
+  se sirve el cuerpo cacheado sin volver a leer los items. LRU por cantidad de
+  usuarios y por bytes totales. Es por proceso: otro proceso solo vuelve a renderizar.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from app.utils.datetime_parser import UTC_TZ
+
+MAX_CACHED_FEEDS = 2_000
+MAX_CACHED_BYTES = 32 * 1024 * 1024
+
+# Los eventos de cancha no tienen hora de fin: el feed les pone esta duracion.
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+
+PRODID = "-//Futbol MVP//Mi Calendario//ES"
+
+
+def _ics_ts(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC_TZ)
+    return value.astimezone(UTC_TZ).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _ics_text(value) -> str:
+    return (
+        str(value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Corta en lineas de 75 octetos (RFC 5545 3.1) sin partir caracteres UTF-8."""
+    out, current, size = [], "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > 75:
+            out.append(current)
+            current, size = " ", 1
+        current += ch
+        size += n
+    out.append(current)
+    return "\r\n".join(out) + "\r\n"
+
+
+def _vevent(r, dtstamp: str) -> str:
+    starts_at = r["starts_at"]
+    ends_at = r["ends_at"] or starts_at + DEFAULT_EVENT_DURATION
+    summary = r["title"]
+    description = r["description"]
+    url = None
+
+    if r["item_type"] == "event":
+        if r["registration_status"] == "WAITLIST":
+            summary = f"{summary} (lista de espera)"
+        elif r["court_name"]:
+            summary = f"{summary} - {r['court_name']}"
+    elif r["item_type"] == "tournament_match":
+        summary = f"{summary} ({r['tournament_name']})"
+        if r["team_name"]:
+            description = f"Jugás con {r['team_name']}"
+    elif r["item_type"] == "announcement":
+        url = r["action_url"]
+
+    uid = f"{r['item_type']}-{r['source_id']}"
+    if r.get("recurring"):
+        uid = f"{uid}-{_ics_ts(starts_at)}"  # una ocurrencia de un anuncio que se repite
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@futbol-mvp",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{_ics_ts(starts_at)}",
+        f"DTEND:{_ics_ts(ends_at)}",
+        f"SUMMARY:{_ics_text(summary)}",
+    ]
+    if r["location_name"]:
+        lines.append(f"LOCATION:{_ics_text(r['location_name'])}")
+    if description:
+        lines.append(f"DESCRIPTION:{_ics_text(description)}")
+    if url:
+        lines.append(f"URL:{_ics_text(url)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def render_feed(rows, last_modified: datetime | None):
+    """Genera el feed por partes (cabecera, un VEVENT por item, cierre)."""
+    dtstamp = _ics_ts(last_modified or datetime.now(UTC_TZ))
+    yield "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:Mi Calendario",
+        "X-PUBLISHED-TTL:PT15M",
+    ))
+    for r in rows:
+        yield _vevent(r, dtstamp)
+    yield _fold("END:VCALENDAR")
+
+
+class CalendarFeedCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, user_id: str, etag: str) -> bytes | None:
+        with self._lock:
+            cached = self._feeds.get(user_id)
+            if cached is None or cached[0] != etag:
+                return None
+            self._feeds.move_to_end(user_id)
+            return cached[1]
+
+    def put(self, user_id: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._drop(user_id)
+            self._feeds[user_id] = (etag, body)
+            self._bytes += len(body)
+            while self._feeds and (
+                len(self._feeds) > MAX_CACHED_FEEDS or self._bytes > MAX_CACHED_BYTES
+            ):
+                _, (_, evicted) = self._feeds.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._drop(user_id)
+
+    def _drop(self, user_id: str) -> None:
+        cached = self._feeds.pop(user_id, None)
+        if cached is not None:
+            self._bytes -= len(cached[1])
+
+    def caching(self, user_id: str, etag: str, chunks):
+        """Reenvia `chunks` codificados y, si el feed se genero completo, lo cachea."""
+        parts = []
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            parts.append(data)
+            yield data
+        self.put(user_id, etag, b"".join(parts))
+
+
+calendar_feed_cache = CalendarFeedCache()
@@ -0,0 +1,27 @@
+"""
+Cursores opacos para paginacion keyset sobre (timestamp, id): (created_at, id) en
+auditoria y notificaciones, (starts_at, id) en la lista de eventos del admin.
+
+El cliente recibe `next_cursor` y lo devuelve tal cual en `cursor=` para pedir la
+pagina siguiente. Adentro es base64url de [timestamp ISO, id].
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    raw = json.dumps([created_at.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """(timestamp, id) del cursor. 400 si no es un cursor valido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Cursor invalido.") from exc
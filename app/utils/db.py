@@ -0,0 +1,88 @@
+"""
+Lecturas en lote sobre una misma conexión.
+
+La DB está del otro lado de la red: en handlers que hacen varias SELECT
+independientes, la latencia la domina la ida y vuelta de cada una. `fetch_many`
+manda todas juntas en pipeline mode de psycopg (un solo viaje) y devuelve los
+resultados en el mismo orden. Si el driver no es psycopg o la libpq no soporta
+pipeline, las corre una tras otra (mismo resultado, más lento).
+
+Uso:
+    courts, waitlist = fetch_many(
+        conn,
+        (text("SELECT ... WHERE event_id = :event_id"), {"event_id": event_id}),
+        (text("SELECT ..."), {"event_id": event_id}),
+    )
+
+Cada resultado es una lista de dicts (mismo acceso r["col"] que .mappings()).
+
+`lock_conflicts_as_409` envuelve una transaccion que toma varios locks: si Postgres la
+aborta por deadlock o por serializacion, el cliente recibe 409 (reintentable) en vez
+de 500.
+"""
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+except ImportError:  # pragma: no cover - el deploy siempre usa psycopg
+    psycopg = None
+
+
+def _pipeline_supported(dbapi_conn) -> bool:
+    return (
+        psycopg is not None
+        and isinstance(dbapi_conn, psycopg.Connection)
+        and psycopg.Pipeline.is_supported()
+    )
+
+
+def fetch_many(conn, *queries) -> list[list[dict]]:
+    """
+    Ejecuta N queries (tuplas (TextClause, params)) en una sola ida y vuelta.
+    Solo para lecturas independientes entre sí: ninguna puede depender del
+    resultado de otra del mismo lote.
+    """
+    dbapi_conn = conn.connection.driver_connection
+
+    if not _pipeline_supported(dbapi_conn):
+        return [
+            [dict(r) for r in conn.execute(stmt, params or {}).mappings().all()]
+            for stmt, params in queries
+        ]
+
+    compiled = []
+    for stmt, params in queries:
+        c = stmt.compile(dialect=conn.dialect)
+        compiled.append((str(c), c.construct_params(params or {})))
+
+    cursors = []
+    with dbapi_conn.pipeline():
+        for sql, params in compiled:
+            cur = dbapi_conn.cursor(row_factory=dict_row)
+            cur.execute(sql, params)
+            cursors.append(cur)
+
+    results = []
+    for cur in cursors:
+        results.append(cur.fetchall())
+        cur.close()
+    return results
+
+
+# deadlock_detected, serialization_failure
+_RETRYABLE_SQLSTATES = {"40P01", "40001"}
+
+
+@contextmanager
+def lock_conflicts_as_409(detail: str = "Otra operación modificó estos datos al mismo tiempo. Reintentá."):
+    """Uso: `with lock_conflicts_as_409(), engine.begin() as conn:` (cubre tambien el COMMIT)."""
+    try:
+        yield
+    except OperationalError as exc:
+        if getattr(exc.orig, "sqlstate", None) in _RETRYABLE_SQLSTATES:
+            raise HTTPException(status_code=409, detail=detail) from exc
+        raise
@@ -0,0 +1,107 @@
+"""
+Exports en streaming (NDJSON o CSV) para el panel admin.
+
+La query corre con un cursor del lado del server (`stream_results` + `yield_per`):
+Postgres entrega las filas de a EXPORT_BATCH_SIZE y cada lote se escribe en la
+respuesta antes de pedir el siguiente. La memoria del proceso queda constante sin
+importar si el export tiene 1k o 5M filas.
+
+Los permisos se validan antes de armar la respuesta (en el handler): una vez que
+arranca el stream ya no se puede devolver un 403.
+
+Uso:
+    return export_response(
+        text("SELECT ..."), params,
+        serialize=lambda r: {...},       # fila -> dict (una linea NDJSON)
+        columns=["id", "name", ...],     # orden de columnas del CSV
+        fmt="csv",
+        filename="audit",
+    )
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+from fastapi.responses import StreamingResponse
+
+from app.settings import engine
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_BATCH_SIZE = 1000
+
+_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def stream_query_rows(query, params: dict) -> Iterator:
+    """Itera las filas de `query` con un cursor server-side, de a EXPORT_BATCH_SIZE."""
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True,
+            yield_per=EXPORT_BATCH_SIZE,
+        ).execute(query, params).mappings()
+        for partition in result.partitions():
+            yield from partition
+
+
+def _ndjson_lines(rows: Iterator, serialize: Callable[[dict], dict]) -> Iterator[str]:
+    buf: list[str] = []
+    for r in rows:
+        buf.append(json.dumps(serialize(r), ensure_ascii=False, default=str) + "\n")
+        if len(buf) >= EXPORT_BATCH_SIZE:
+            yield "".join(buf)
+            buf.clear()
+    if buf:
+        yield "".join(buf)
+
+
+def _csv_lines(rows: Iterator, serialize: Callable[[dict], dict], columns: list[str]) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count = 0
+    for r in rows:
+        item = serialize(r)
+        writer.writerow([_csv_value(item.get(c)) for c in columns])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+    yield out.getvalue()
+
+
+def export_response(
+    query,
+    params: dict,
+    serialize: Callable[[dict], dict],
+    columns: list[str],
+    fmt: str,
+    filename: str,
+) -> StreamingResponse:
+    """StreamingResponse con las filas de `query` en NDJSON o CSV."""
+    rows = stream_query_rows(query, params)
+    if fmt == "csv":
+        body = _csv_lines(rows, serialize, columns)
+    else:
+        body = _ndjson_lines(rows, serialize)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    ext = "csv" if fmt == "csv" else "ndjson"
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}-{stamp}.{ext}"'},
+    )
@@ -0,0 +1,148 @@
+"""
+Idempotency-Key para endpoints de escritura del jugador (register, guests, ratings).
+
+Los clientes móviles reintentan con mala señal en la cancha. Con el header
+`Idempotency-Key`, el primer intento exitoso guarda su respuesta en
+public.idempotency_keys y los reintentos la reciben tal cual, sin tocar las tablas
+de inscripciones/ratings.
+
+Flujo (todo dentro de la transacción de la escritura):
+    1. claim_idempotency_key: INSERT de la key. Si otra request con la misma key está
+       en curso, el INSERT espera a que termine (lock del PK) y después ve su respuesta.
+    2. El handler hace su escritura normal.
+    3. store_idempotent_response: guarda status + body en la misma fila.
+Si el handler falla (HTTPException, error de DB), el rollback se lleva también la
+key: los errores no se guardan y el reintento vuelve a ejecutar.
+
+Sin header, todo es no-op.
+"""
+import hashlib
+import json
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.settings import engine
+
+IDEMPOTENCY_TTL_HOURS = 24
+MAX_KEY_LENGTH = 128
+
+# Purga de keys vencidas: la corre el scheduler (app/jobs/scheduler.py) cada 10 min.
+PURGE_BATCH_SIZE = 5000
+
+
+def _request_hash(scope: str, payload) -> str:
+    if hasattr(payload, "model_dump"):
+        payload = payload.model_dump(mode="json")
+    raw = json.dumps({"scope": scope, "body": payload}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key inválida (1 a {MAX_KEY_LENGTH} caracteres imprimibles).",
+        )
+    return key
+
+
+def purge_expired_idempotency_keys() -> int:
+    """Borra keys vencidas en lotes. Devuelve cuántas filas borró."""
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            n = conn.execute(text("""
+                DELETE FROM public.idempotency_keys
+                WHERE ctid IN (
+                    SELECT ctid
+                    FROM public.idempotency_keys
+                    WHERE expires_at < now()
+                    LIMIT :batch
+                )
+            """), {"batch": PURGE_BATCH_SIZE}).rowcount
+        deleted += n
+        if n < PURGE_BATCH_SIZE:
+            return deleted
+
+
+def claim_idempotency_key(conn, actor_user_id: str, key: str | None, scope: str, payload) -> JSONResponse | None:
+    """
+    Reserva la key para este request. Devuelve:
+      - None si no hay key o si es la primera vez (el handler sigue normalmente).
+      - JSONResponse con la respuesta guardada si es un reintento ya completado.
+    Lanza 422 si la key ya se usó con otro request.
+    """
+    if key is None:
+        return None
+    key = _validate_key(key)
+
+    request_hash = _request_hash(scope, payload)
+
+    # Una key vencida se reutiliza como nueva (la purga puede no haber pasado todavía).
+    claimed = conn.execute(text("""
+        INSERT INTO public.idempotency_keys (
+            actor_user_id, idem_key, scope, request_hash, expires_at
+        )
+        VALUES (
+            :actor, :key, :scope, :hash, now() + make_interval(hours => :ttl)
+        )
+        ON CONFLICT (actor_user_id, idem_key) DO UPDATE SET
+            scope = EXCLUDED.scope,
+            request_hash = EXCLUDED.request_hash,
+            status_code = NULL,
+            response = NULL,
+            created_at = now(),
+            expires_at = EXCLUDED.expires_at
+        WHERE public.idempotency_keys.expires_at < now()
+        RETURNING 1
+    """), {
+        "actor": actor_user_id,
+        "key": key,
+        "scope": scope,
+        "hash": request_hash,
+        "ttl": IDEMPOTENCY_TTL_HOURS,
+    }).first()
+
+    if claimed:
+        return None
+
+    stored = conn.execute(text("""
+        SELECT scope, request_hash, status_code, response
+        FROM public.idempotency_keys
+        WHERE actor_user_id = :actor AND idem_key = :key
+    """), {"actor": actor_user_id, "key": key}).mappings().first()
+
+    if not stored or stored["scope"] != scope or stored["request_hash"] != request_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key ya usada con otro request. Generá una nueva.",
+        )
+    if stored["status_code"] is None:
+        raise HTTPException(status_code=409, detail="Request en curso con esta Idempotency-Key. Reintentá en unos segundos.")
+
+    return JSONResponse(
+        status_code=stored["status_code"],
+        content=stored["response"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def store_idempotent_response(conn, actor_user_id: str, key: str | None, response: dict, status_code: int = 200) -> dict:
+    """Guarda la respuesta exitosa para la key reservada (no-op sin key). Devuelve `response`."""
+    if key is None:
+        return response
+    conn.execute(text("""
+        UPDATE public.idempotency_keys
+        SET status_code = :status_code,
+            response = CAST(:response AS jsonb)
+        WHERE actor_user_id = :actor AND idem_key = :key
+    """), {
+        "status_code": status_code,
+        "response": json.dumps(response, default=str),
+        "actor": actor_user_id,
+        "key": key.strip(),
+    })
+    return response
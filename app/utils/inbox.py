@@ -0,0 +1,134 @@
+"""
+Notificaciones dirigidas: bandeja por usuario (migrations/022).
+
+El fan-out es un solo statement sin importar la cantidad de destinatarios:
+    WITH recipients AS (SELECT ... FROM event_registrations ...),
+         ins AS (INSERT INTO user_notifications SELECT ... FROM recipients RETURNING user_id)
+    INSERT INTO user_notification_counters ... (unread_count + n por usuario)
+Solo reciben inscripciones de tipo USER (los invitados no tienen cuenta).
+
+`title` y `message` aceptan los placeholders {event} y {court}: se reemplazan en SQL
+con el titulo del evento y el nombre de la cancha de cada inscripcion.
+
+Uso (dentro de la transaccion que produce el cambio). Devuelven los user_id notificados;
+el caller invalida su conteo de no leidas recien despues del commit (si no, una lectura
+en el medio vuelve a cachear el conteo viejo):
+    with engine.begin() as conn:
+        notified = send_to_event(conn, event_id, kind="RATINGS_OPEN", title="...", message="...")
+    notification_cache.invalidate_inbox(notified)
+"""
+import json
+
+from sqlalchemy import text
+
+_FAN_OUT_SQL = """
+    WITH recipients AS (
+        SELECT DISTINCT ON (r.user_id)
+            r.user_id,
+            r.event_id,
+            r.court_id,
+            e.title AS event_title,
+            c.name AS court_name
+        FROM public.event_registrations r
+        JOIN public.events e ON e.id = r.event_id
+        JOIN public.users u ON u.id = r.user_id
+        LEFT JOIN public.event_courts c ON c.id = r.court_id
+        WHERE r.registration_type = 'USER'
+          AND r.user_id IS NOT NULL
+          AND {recipient_filter}
+        ORDER BY r.user_id, r.created_at DESC
+    ),
+    ins AS (
+        INSERT INTO public.user_notifications (
+            user_id, kind, title, message, action_url,
+            event_id, court_id, metadata
+        )
+        SELECT
+            x.user_id,
+            :kind,
+            replace(replace(:title, '{{event}}', x.event_title), '{{court}}', coalesce(x.court_name, '')),
+            replace(replace(:message, '{{event}}', x.event_title), '{{court}}', coalesce(x.court_name, '')),
+            :action_url,
+            x.event_id,
+            x.court_id,
+            CAST(:metadata AS jsonb)
+        FROM recipients x
+        RETURNING user_id
+    )
+    INSERT INTO public.user_notification_counters AS unc (user_id, unread_count, updated_at)
+    SELECT user_id, COUNT(*), now()
+    FROM ins
+    GROUP BY user_id
+    ORDER BY user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET unread_count = unc.unread_count + EXCLUDED.unread_count,
+        updated_at = now()
+    RETURNING user_id::text
+"""
+
+
+def _fan_out(
+    conn,
+    recipient_filter: str,
+    params: dict,
+    kind: str,
+    title: str,
+    message: str,
+    action_url: str | None,
+    metadata: dict | None,
+) -> list[str]:
+    return conn.execute(text(_FAN_OUT_SQL.format(recipient_filter=recipient_filter)), {
+        **params,
+        "kind": kind,
+        "title": title,
+        "message": message,
+        "action_url": action_url,
+        "metadata": json.dumps(metadata or {}, default=str),
+    }).scalars().all()
+
+
+def send_to_event(
+    conn,
+    event_id: str,
+    kind: str,
+    title: str,
+    message: str,
+    action_url: str | None = None,
+    court_id: str | None = None,
+    statuses: tuple[str, ...] = ("CONFIRMED",),
+    ranking_only: bool = False,
+    metadata: dict | None = None,
+) -> list[str]:
+    """
+    Una notificacion a cada inscripto del evento (o de una cancha) con alguno de `statuses`.
+    `ranking_only` limita a los que participan del ranking. Devuelve los user_id notificados.
+    """
+    conditions = ["r.event_id = :event_id", "r.status = ANY(CAST(:statuses AS text[]))"]
+    params = {"event_id": event_id, "statuses": list(statuses)}
+    if court_id:
+        conditions.append("r.court_id = :court_id")
+        params["court_id"] = court_id
+    if ranking_only:
+        conditions.append("u.ranking_opt_in = true")
+
+    return _fan_out(conn, " AND ".join(conditions), params, kind, title, message, action_url, metadata)
+
+
+def send_to_registrations(
+    conn,
+    registration_ids: list[str],
+    kind: str,
+    title: str,
+    message: str,
+    action_url: str | None = None,
+    metadata: dict | None = None,
+) -> list[str]:
+    """Una notificacion al dueño de cada inscripcion (no-op si la lista esta vacia)."""
+    if not registration_ids:
+        return []
+    return _fan_out(
+        conn,
+        "r.id = ANY(CAST(:registration_ids AS uuid[]))",
+        {"registration_ids": [str(rid) for rid in registration_ids]},
+        kind, title, message, action_url, metadata,
+    )
@@ -0,0 +1,170 @@
+"""
+Cache en memoria para GET /notifications (la campanita que pollean todos los clientes).
+
+Cuatro piezas, cada una con su invalidacion:
+- Notificaciones globales activas: son pocas filas y las mismas para todos.
+  invalidate_global() en create/deactivate y en los broadcast de admin_events/admin_calendar.
+- Ids descartados por usuario (solo de notificaciones activas). dismiss los agrega en memoria
+  y el TTL los relee de la DB (un dismiss atendido por otro proceso).
+- Conteo de votos pendientes por usuario. invalidate_pending(user) en save_ratings;
+  invalidate_pending() (todos) en finalize_event y cuando alguien cambia ranking_opt_in.
+- No leidas de la bandeja dirigida (migrations/022). invalidate_inbox(users) con los
+  notificados por app/utils/inbox.py, despues del commit, y al marcar como leidas.
+
+Lo que falta se carga en un solo viaje (fetch_many). Con todo en cache el endpoint no
+hace SQL. Las invalidaciones se llaman despues del commit (si no, una lectura en el medio
+vuelve a cachear la foto vieja). El cache es por proceso: los TTL acotan lo que otro
+proceso cambio y lo que no tiene hook explicito (ej. el vencimiento de la ventana de
+votacion).
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.settings import engine
+from app.utils.db import fetch_many
+
+GLOBAL_TTL_SECONDS = 30
+PENDING_TTL_SECONDS = 60
+DISMISSED_TTL_SECONDS = 120
+MAX_CACHED_USERS = 10_000
+
+_ACTIVE_GLOBAL_QUERY = text("""
+    SELECT
+        n.id,
+        n.kind,
+        n.title,
+        n.message,
+        n.action_url,
+        n.created_at,
+        n.starts_at,
+        n.expires_at
+    FROM public.notifications n
+    WHERE n.is_active = true
+      AND n.expires_at > now()
+    ORDER BY n.created_at DESC
+""")
+
+_INBOX_UNREAD_QUERY = text("""
+    SELECT unread_count
+    FROM public.user_notification_counters
+    WHERE user_id = :user_id
+""")
+
+_DISMISSED_QUERY = text("""
+    SELECT d.notification_id
+    FROM public.user_notification_dismissals d
+    JOIN public.notifications n ON n.id = d.notification_id
+    WHERE d.user_id = :user_id
+      AND n.is_active = true
+      AND n.expires_at > now()
+""")
+
+
+class NotificationCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._global: list[dict] | None = None
+        self._global_loaded_at = 0.0
+        self._global_generation = 0
+        self._dismissed: OrderedDict[str, tuple[set[str], float]] = OrderedDict()
+        self._pending: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._inbox: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    # ---- invalidacion ----
+
+    def invalidate_global(self) -> None:
+        with self._lock:
+            self._global = None
+            self._global_generation += 1
+
+    def add_dismissal(self, user_id: str, notification_id: str) -> None:
+        with self._lock:
+            cached = self._dismissed.get(user_id)
+            if cached is not None:
+                cached[0].add(notification_id)
+
+    def invalidate_pending(self, user_id: str | None = None) -> None:
+        """Sin user_id limpia todos los conteos (ej. se finalizo un evento)."""
+        with self._lock:
+            if user_id is None:
+                self._pending.clear()
+            else:
+                self._pending.pop(user_id, None)
+
+    def invalidate_inbox(self, user_ids) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._inbox.pop(str(user_id), None)
+
+    # ---- lectura ----
+
+    def snapshot(self, user_id: str, pending_query) -> tuple[list[dict], set[str], int, int]:
+        """
+        (globales visibles ahora, ids descartados por el usuario, votos pendientes,
+        no leidas de la bandeja).
+        `pending_query` es el (query, params) del conteo; solo se ejecuta si no esta en cache.
+        """
+        now = time.monotonic()
+        with self._lock:
+            globals_ = self._global if now - self._global_loaded_at < GLOBAL_TTL_SECONDS else None
+            generation = self._global_generation
+            cached_dismissed = self._dismissed.get(user_id)
+            dismissed = None
+            if cached_dismissed and cached_dismissed[1] > now:
+                self._dismissed.move_to_end(user_id)
+                dismissed = set(cached_dismissed[0])
+            cached_pending = self._pending.get(user_id)
+            pending = cached_pending[0] if cached_pending and cached_pending[1] > now else None
+            cached_inbox = self._inbox.get(user_id)
+            inbox_unread = cached_inbox[0] if cached_inbox and cached_inbox[1] > now else None
+
+        queries = []
+        if globals_ is None:
+            queries.append((_ACTIVE_GLOBAL_QUERY, {}))
+        if dismissed is None:
+            queries.append((_DISMISSED_QUERY, {"user_id": user_id}))
+        if pending is None:
+            queries.append(pending_query)
+        if inbox_unread is None:
+            queries.append((_INBOX_UNREAD_QUERY, {"user_id": user_id}))
+
+        if queries:
+            with engine.connect() as conn:
+                results = iter(fetch_many(conn, *queries))
+
+            with self._lock:
+                if globals_ is None:
+                    globals_ = list(next(results))
+                    # Si hubo una invalidacion mientras cargabamos, no pisar el cache.
+                    if generation == self._global_generation:
+                        self._global = globals_
+                        self._global_loaded_at = now
+                if dismissed is None:
+                    dismissed = {str(r["notification_id"]) for r in next(results)}
+                    self._remember(self._dismissed, user_id, (set(dismissed), now + DISMISSED_TTL_SECONDS))
+                if pending is None:
+                    rows = next(results)
+                    pending = int(rows[0]["total_pending"]) if rows else 0
+                    self._remember(self._pending, user_id, (pending, now + PENDING_TTL_SECONDS))
+                if inbox_unread is None:
+                    rows = next(results)
+                    inbox_unread = int(rows[0]["unread_count"]) if rows else 0
+                    self._remember(self._inbox, user_id, (inbox_unread, now + PENDING_TTL_SECONDS))
+
+        current = datetime.now(timezone.utc)
+        visible = [n for n in globals_ if n["starts_at"] <= current < n["expires_at"]]
+        return visible, dismissed, pending, inbox_unread
+
+    @staticmethod
+    def _remember(store: OrderedDict, key: str, value) -> None:
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > MAX_CACHED_USERS:
+            store.popitem(last=False)
+
+
+notification_cache = NotificationCache()
@@ -58,6 +58,22 @@ def require_permission(conn, actor_user_id: str, permission_code: str) -> None:
         )
 
 
+def require_permissions(conn, actor_user_id: str, permission_codes) -> None:
+    """
+    Como require_permission, para operaciones que necesitan varios permisos a la vez
+    (ej. instanciar una plantilla crea eventos, canchas y capitanes). Una sola lectura.
+    """
+    perms = get_effective_permissions(conn, actor_user_id)
+    if "*" in perms:
+        return
+    missing = [code for code in permission_codes if code not in perms]
+    if missing:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Acceso denegado. Requiere el permiso '{missing[0]}'."
+        )
+
+
 def require_admin(conn, actor_user_id: str) -> None:
     """
     [Compat] Valida que el actor sea admin o super_admin.
@@ -0,0 +1,212 @@
+"""
+Cache de metricas de player cards (score, top atributos, radar).
+
+Los votos de un jugador cambian poco (save_ratings, o un moderador que oculta un voto)
+y las cards se miran todo el tiempo durante y despues del partido. Por jugador se
+guardan los agregados de sus votos visibles junto con su version de
+public.player_rating_versions (migrations/029), que la DB sube en cada escritura.
+
+load_player_stats(conn, user_ids):
+- Un viaje (fetch_many) lee las versiones y, si vencio GLOBAL_MEAN_TTL_SECONDS, la
+  media global de votos visibles (el prior del score bayesiano). La media se mueve muy
+  poco con cada voto, asi que unos minutos de atraso no cambian el score visible.
+- Solo los jugadores sin entrada o con version distinta se re-agregan, todos juntos
+  en un segundo viaje. Con todo en cache no se agrega nada.
+- La recencia no invalida: todos los pesos decaen por el mismo factor con el tiempo,
+  asi que Σw y Σw·r se reescalan por exp(-RATE * dias desde el calculo).
+"""
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.utils.datetime_parser import UTC_TZ
+from app.utils.db import fetch_many
+from app.utils.scoring import score_payload, RECENCY_DECAY_PER_DAY
+
+MAX_CACHED_PLAYERS = 20_000
+GLOBAL_MEAN_TTL_SECONDS = 300
+
+_VERSIONS_QUERY = text("""
+    SELECT user_id, version
+    FROM public.player_rating_versions
+    WHERE user_id = ANY(CAST(:user_ids AS uuid[]))
+""")
+
+_GLOBAL_MEAN_QUERY = text("""
+    SELECT AVG(rating) AS global_mean
+    FROM public.player_ratings
+    WHERE is_hidden = false
+""")
+
+_RATINGS_QUERY = text("""
+    SELECT
+      target_user_id,
+      ROUND(AVG(rating)::numeric, 1)   AS avg_rating,
+      AVG(rating)                      AS avg_raw,
+      COUNT(*)                         AS votes,
+      COUNT(DISTINCT voter_user_id)    AS voters,
+      COALESCE(SUM(rating * exp(-:decay * EXTRACT(EPOCH FROM (now() - created_at)) / 86400.0)), 0) AS weighted_sum,
+      COALESCE(SUM(exp(-:decay * EXTRACT(EPOCH FROM (now() - created_at)) / 86400.0)), 0)          AS weight_total,
+      now()                            AS computed_at
+    FROM public.player_ratings
+    WHERE target_user_id = ANY(CAST(:user_ids AS uuid[]))
+      AND is_hidden = false
+    GROUP BY target_user_id
+""")
+
+_ATTRIBUTES_QUERY = text("""
+    SELECT
+      pr.target_user_id,
+      attr.attribute AS code,
+      COUNT(*)       AS count
+    FROM public.player_ratings pr
+    JOIN LATERAL jsonb_array_elements_text(pr.attributes) attr(attribute)
+      ON true
+    WHERE pr.target_user_id = ANY(CAST(:user_ids AS uuid[]))
+      AND pr.is_hidden = false
+      AND jsonb_typeof(pr.attributes) = 'array'
+    GROUP BY pr.target_user_id, attr.attribute
+    ORDER BY pr.target_user_id, count DESC, attr.attribute ASC
+""")
+
+
+def _empty_stats(computed_at: datetime) -> dict:
+    return {
+        "votes": 0,
+        "voters": 0,
+        "avg_rating": None,
+        "avg_raw": None,
+        "weighted_sum": 0.0,
+        "weight_total": 0.0,
+        "computed_at": computed_at,
+        "attributes": [],
+    }
+
+
+def _decayed(stats: dict, now: datetime) -> dict:
+    """Copia de stats con los pesos de recencia llevados a `now`."""
+    age_days = max((now - stats["computed_at"]).total_seconds(), 0.0) / 86400.0
+    factor = math.exp(-RECENCY_DECAY_PER_DAY * age_days)
+    return {
+        **stats,
+        "weighted_sum": stats["weighted_sum"] * factor,
+        "weight_total": stats["weight_total"] * factor,
+    }
+
+
+def rating_payload(stats: dict, global_mean, simple_avg_key: str = "avg_rating") -> dict:
+    """score_payload a partir de los agregados cacheados."""
+    return score_payload(
+        stats["votes"], stats["voters"], stats["weighted_sum"],
+        stats["weight_total"], stats[simple_avg_key], global_mean,
+    )
+
+
+class PlayerCardCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._players: OrderedDict[str, tuple[int, dict]] = OrderedDict()
+        self._global_mean: float | None = None
+        self._global_mean_expires_at = 0.0
+
+    def get(self, user_id: str, version: int) -> dict | None:
+        with self._lock:
+            cached = self._players.get(user_id)
+            if cached is None or cached[0] != version:
+                return None
+            self._players.move_to_end(user_id)
+            return cached[1]
+
+    def put(self, user_id: str, version: int, stats: dict) -> None:
+        with self._lock:
+            self._players[user_id] = (version, stats)
+            self._players.move_to_end(user_id)
+            while len(self._players) > MAX_CACHED_PLAYERS:
+                self._players.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._players.pop(user_id, None)
+
+    def global_mean(self) -> tuple[bool, float | None]:
+        """(vigente, media). Si no esta vigente hay que releerla."""
+        with self._lock:
+            return time.monotonic() < self._global_mean_expires_at, self._global_mean
+
+    def put_global_mean(self, value: float | None) -> None:
+        with self._lock:
+            self._global_mean = value
+            self._global_mean_expires_at = time.monotonic() + GLOBAL_MEAN_TTL_SECONDS
+
+
+player_card_cache = PlayerCardCache()
+
+
+def load_player_stats(conn, user_ids: list[str]) -> tuple[dict[str, dict], float | None]:
+    """
+    Agregados de votos visibles por jugador ({user_id -> stats}, pesos a hoy) y la
+    media global. user_ids tienen que ser uuid validos.
+    stats: votes, voters, avg_rating (redondeado), avg_raw, weighted_sum,
+    weight_total, attributes [{code, count}] (de mayor a menor).
+    """
+    # La DB devuelve los uuid en minuscula; la respuesta usa las claves que vinieron.
+    requested = {str(uuid.UUID(str(u))): str(u) for u in user_ids}
+    user_ids = list(requested)
+    mean_fresh, global_mean = player_card_cache.global_mean()
+    queries = [(_VERSIONS_QUERY, {"user_ids": user_ids})]
+    if not mean_fresh:
+        queries.append((_GLOBAL_MEAN_QUERY, {}))
+    version_rows, *mean_rows = fetch_many(conn, *queries)
+
+    if not mean_fresh:
+        mean = mean_rows[0][0]["global_mean"] if mean_rows[0] else None
+        global_mean = float(mean) if mean is not None else None
+        player_card_cache.put_global_mean(global_mean)
+
+    # Sin fila de version = nunca lo votaron: version 0.
+    versions = {str(r["user_id"]): int(r["version"]) for r in version_rows}
+    stats_by_user = {}
+    misses = []
+    for uid in user_ids:
+        cached = player_card_cache.get(uid, versions.get(uid, 0))
+        if cached is None:
+            misses.append(uid)
+        else:
+            stats_by_user[uid] = cached
+
+    if misses:
+        rating_rows, attr_rows = fetch_many(
+            conn,
+            (_RATINGS_QUERY, {"user_ids": misses, "decay": RECENCY_DECAY_PER_DAY}),
+            (_ATTRIBUTES_QUERY, {"user_ids": misses}),
+        )
+        now = rating_rows[0]["computed_at"] if rating_rows else datetime.now(UTC_TZ)
+        fresh = {uid: _empty_stats(now) for uid in misses}
+        for r in rating_rows:
+            fresh[str(r["target_user_id"])].update({
+                "votes": int(r["votes"] or 0),
+                "voters": int(r["voters"] or 0),
+                "avg_rating": float(r["avg_rating"]) if r["avg_rating"] is not None else None,
+                "avg_raw": float(r["avg_raw"]) if r["avg_raw"] is not None else None,
+                "weighted_sum": float(r["weighted_sum"] or 0),
+                "weight_total": float(r["weight_total"] or 0),
+                "computed_at": r["computed_at"],
+            })
+        for r in attr_rows:
+            fresh[str(r["target_user_id"])]["attributes"].append({
+                "code": str(r["code"]),
+                "count": int(r["count"] or 0),
+            })
+        for uid, stats in fresh.items():
+            # La version se leyo antes de agregar: si entro un voto en el medio, los
+            # agregados quedan con la version vieja y la proxima lectura los rehace.
+            player_card_cache.put(uid, versions.get(uid, 0), stats)
+            stats_by_user[uid] = stats
+
+    now = datetime.now(UTC_TZ)
+    return {requested[uid]: _decayed(stats, now) for uid, stats in stats_by_user.items()}, global_mean
@@ -0,0 +1,167 @@
+"""
+Reglas de repeticion (subconjunto de RRULE, RFC 5545) para anuncios del calendario y
+plantillas de eventos.
+
+La regla se guarda una sola vez (jsonb) junto con su primera fecha (dtstart); las
+ocurrencias se expanden recien al leer, solo dentro de la ventana pedida. Nada de una
+fila por ocurrencia.
+
+    {"freq": "WEEKLY", "interval": 1, "by_weekday": [1, 3], "until": "...", "count": null}
+
+- freq: DAILY | WEEKLY | MONTHLY. interval: cada cuantos dias/semanas/meses.
+- by_weekday (solo WEEKLY): 0=lunes ... 6=domingo. Default: el dia de dtstart.
+- MONTHLY repite el dia del mes de dtstart; los meses sin ese dia se saltean.
+- until (inclusive) o count (cantidad total de ocurrencias); ninguno = sin fin. Un
+  until sin hora (YYYY-MM-DD) cubre todo ese dia en hora local.
+
+La hora local (Buenos Aires) de dtstart se mantiene en todas las ocurrencias.
+expand_cached guarda las expansiones por (regla, ventana) en un LRU acotado; como la
+clave es la regla misma, no hay nada que invalidar.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+
+from app.utils.datetime_parser import APP_TZ, UTC_TZ, parse_client_datetime
+
+FREQS = ("DAILY", "WEEKLY", "MONTHLY")
+MAX_OCCURRENCES = 500  # por regla y ventana
+MAX_STEPS = 10_000  # tope de iteraciones (una regla diaria de ~27 anios)
+MAX_CACHED_EXPANSIONS = 2_048
+
+_cache_lock = threading.Lock()
+_cache: OrderedDict[tuple, tuple[datetime, ...]] = OrderedDict()
+
+
+def _parse_until(until: str) -> datetime:
+    raw = until.strip()
+    try:
+        day = date.fromisoformat(raw)
+    except ValueError:
+        return parse_client_datetime(raw, "recurrence.until")
+    return datetime.combine(day, time(23, 59, 59), tzinfo=APP_TZ).astimezone(UTC_TZ)
+
+
+def build_rule(freq: str, interval: int = 1, by_weekday=None, until: str | None = None, count=None) -> dict:
+    """Normaliza la regla que manda el cliente al jsonb que se guarda. ValueError si es invalida."""
+    if freq not in FREQS:
+        raise ValueError(f"freq invalida: usa {', '.join(FREQS)}.")
+    if until and count:
+        raise ValueError("La repeticion lleva 'until' o 'count', no los dos.")
+    if by_weekday and freq != "WEEKLY":
+        raise ValueError("by_weekday solo aplica a freq=WEEKLY.")
+    if by_weekday and any(d < 0 or d > 6 for d in by_weekday):
+        raise ValueError("by_weekday va de 0 (lunes) a 6 (domingo).")
+    until_dt = _parse_until(until) if until else None
+    return {
+        "freq": freq,
+        "interval": int(interval or 1),
+        "by_weekday": sorted(set(by_weekday)) if by_weekday else None,
+        "until": until_dt.isoformat() if until_dt else None,
+        "count": int(count) if count else None,
+    }
+
+
+def _at(day: date, local: datetime) -> datetime:
+    return datetime.combine(day, local.timetz()).astimezone(UTC_TZ)
+
+
+def _candidates(rule: dict, dtstart: datetime):
+    """Todas las ocurrencias en orden, desde dtstart (sin cortar)."""
+    local = dtstart.astimezone(APP_TZ)
+    interval = rule.get("interval") or 1
+    freq = rule["freq"]
+
+    if freq == "DAILY":
+        n = 0
+        while True:
+            yield _at(local.date() + timedelta(days=n * interval), local)
+            n += 1
+
+    elif freq == "WEEKLY":
+        days = rule.get("by_weekday") or [local.weekday()]
+        week0 = local.date() - timedelta(days=local.weekday())
+        p = 0
+        while True:
+            for d in days:
+                day = week0 + timedelta(weeks=p * interval, days=d)
+                if day >= local.date():
+                    yield _at(day, local)
+            p += 1
+
+    elif freq == "MONTHLY":
+        m = 0
+        while True:
+            y, month0 = divmod(local.month - 1 + m * interval, 12)
+            m += 1
+            try:
+                day = date(local.year + y, month0 + 1, local.day)
+            except ValueError:
+                continue  # ej. dia 31 en un mes de 30
+            yield _at(day, local)
+
+    else:
+        raise ValueError(f"freq desconocida: {freq}")
+
+
+def expand(rule: dict, dtstart: datetime, win_from: datetime, win_to: datetime) -> list[datetime]:
+    """Ocurrencias en [win_from, win_to), en UTC."""
+    until = datetime.fromisoformat(rule["until"]) if rule.get("until") else None
+    count = rule.get("count")
+    out: list[datetime] = []
+    for i, occ in enumerate(_candidates(rule, dtstart)):
+        if i >= MAX_STEPS or occ >= win_to:
+            break
+        if (count and i >= count) or (until and occ > until):
+            break
+        if occ >= win_from:
+            out.append(occ)
+            if len(out) >= MAX_OCCURRENCES:
+                break
+    return out
+
+
+def rule_ends_at(rule: dict, dtstart: datetime) -> datetime | None:
+    """Ultima ocurrencia posible (para filtrar por ventana en SQL); None si no termina."""
+    if rule.get("until"):
+        return datetime.fromisoformat(rule["until"])
+    if rule.get("count"):
+        occurrences = expand(rule, dtstart, dtstart, datetime.max.replace(tzinfo=UTC_TZ))
+        return occurrences[-1] if occurrences else dtstart
+    return None
+
+
+def _rule_key(rule: dict, dtstart: datetime) -> tuple:
+    return (
+        rule["freq"],
+        rule.get("interval") or 1,
+        tuple(rule.get("by_weekday") or ()),
+        rule.get("until"),
+        rule.get("count"),
+        dtstart,
+    )
+
+
+def expand_cached(rule: dict, dtstart: datetime, win_from: datetime, win_to: datetime) -> list[datetime]:
+    """
+    Igual que expand, con cache. La ventana se redondea a dias UTC enteros para la
+    clave (las ventanas por defecto corren con now()) y despues se recorta exacta.
+    """
+    day_from = win_from.astimezone(UTC_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_to = win_to.astimezone(UTC_TZ).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    key = (_rule_key(rule, dtstart), day_from, day_to)
+
+    with _cache_lock:
+        occurrences = _cache.get(key)
+        if occurrences is not None:
+            _cache.move_to_end(key)
+
+    if occurrences is None:
+        occurrences = tuple(expand(rule, dtstart, day_from, day_to))
+        with _cache_lock:
+            _cache[key] = occurrences
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_CACHED_EXPANSIONS:
+                _cache.popitem(last=False)
+
+    return [occ for occ in occurrences if win_from <= occ < win_to]
@@ -45,6 +45,15 @@ LEVEL_THRESHOLDS = (
 )
 LEVEL_TOP = "COMPETITIVO"   # score > 4.2
 
+# Tiers del leaderboard (M6): fraccion de jugadores rankeados por delante.
+# (0.10, "TOP_10") = el primer 10%. El resto queda en RANKING_TIER_REST.
+RANKING_TIERS = (
+    (0.10, "TOP_10"),
+    (0.25, "TOP_25"),
+    (0.50, "TOP_50"),
+)
+RANKING_TIER_REST = "RESTO"
+
 # Orden canonico de los 6 atributos para el perfil tipo radar (M5).
 ALL_ATTRIBUTES = ("EQUIPO", "VISION", "INTENSIDAD", "DEFENSA", "ATAQUE", "FAIRPLAY")
 
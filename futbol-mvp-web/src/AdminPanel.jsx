@@ -900,6 +900,12 @@ function EventosTab({
                 )}>
                   {ev.status === 'OPEN' ? 'Abierto' : ev.status === 'CLOSED' ? 'Cerrado' : 'Finalizado'}
                 </span>
+                {ev.counts && (
+                  <span className="ml-2 text-xs font-normal text-white/50">
+                    {ev.counts.confirmed}/{ev.counts.capacity_total}
+                    {ev.counts.waitlist > 0 && ` · ${ev.counts.waitlist} en espera`}
+                  </span>
+                )}
               </button>
             ))}
           </div>
@@ -1144,19 +1144,20 @@ export default function App() {
     setPlayerCardLoading(true);
     setPlayerCardError("");
     try {
-      const res = await apiFetch(`/events/${event.id}/courts/${courtId}/player-cards`);
-      const cards = res?.cards || [];
-      const cardsByRegistration = {};
-      cards.forEach((card) => {
-        cardsByRegistration[card.registration_id] = card;
+      // Una sola llamada trae las cards de todas las canchas del evento.
+      const res = await apiFetch(`/events/${event.id}/player-cards`);
+      const viewerOptIn = !!res?.viewer?.ranking_opt_in;
+      const byCourt = {};
+      (res?.courts || []).forEach((court) => {
+        const cardsByRegistration = {};
+        (court.cards || []).forEach((card) => {
+          cardsByRegistration[card.registration_id] = card;
+        });
+        byCourt[court.court_id] = { fetchedAt: now, viewerOptIn, cardsByRegistration };
       });
 
-      const next = {
-        fetchedAt: now,
-        viewerOptIn: !!res?.viewer?.ranking_opt_in,
-        cardsByRegistration,
-      };
-      setPlayerCardsByCourt((prev) => ({ ...prev, [courtId]: next }));
+      const next = byCourt[courtId] || { fetchedAt: now, viewerOptIn, cardsByRegistration: {} };
+      setPlayerCardsByCourt((prev) => ({ ...prev, ...byCourt, [courtId]: next }));
       return next;
     } catch (e) {
       setPlayerCardError(e.message || "No se pudo cargar el perfil del jugador.");
@@ -33,6 +33,14 @@ export default function AuditFiltersBar({ filters, onChange, onReset }) {
   const [events, setEvents] = useState([]);
   const [actors, setActors] = useState([]);
   const [actorQuery, setActorQuery] = useState("");
+  const [search, setSearch] = useState(filters.q || "");
+
+  // Texto libre: se manda al server recién cuando el usuario deja de tipear.
+  useEffect(() => {
+    if (search === (filters.q || "")) return undefined;
+    const t = setTimeout(() => onChange({ ...filters, q: search }), 300);
+    return () => clearTimeout(t);
+  }, [search, filters, onChange]);
 
   useEffect(() => {
     (async () => {
@@ -43,15 +51,26 @@ export default function AuditFiltersBar({ filters, onChange, onReset }) {
         setEvents([]);
       }
     })();
-    (async () => {
+  }, []);
+
+  // Typeahead de actores: prefijo del nombre resuelto en el server (audit_actors).
+  useEffect(() => {
+    let cancelled = false;
+    const q = actorQuery.trim();
+    const t = setTimeout(async () => {
       try {
-        const r = await apiFetch("/admin/audit/actors");
-        setActors(r.items || []);
+        const qs = q ? `?q=${encodeURIComponent(q)}` : "";
+        const r = await apiFetch(`/admin/audit/actors${qs}`);
+        if (!cancelled) setActors(r.items || []);
       } catch {
-        setActors([]);
+        if (!cancelled) setActors([]);
       }
-    })();
-  }, []);
+    }, q ? 200 : 0);
+    return () => {
+      cancelled = true;
+      clearTimeout(t);
+    };
+  }, [actorQuery]);
 
   function toggleCategory(cat) {
     const set = new Set(filters.categories || []);
@@ -70,10 +89,6 @@ export default function AuditFiltersBar({ filters, onChange, onReset }) {
     });
   }
 
-  const filteredActors = actorQuery
-    ? actors.filter((a) => a.name?.toLowerCase().includes(actorQuery.toLowerCase()))
-    : actors;
-
   return (
     <div className="space-y-3 rounded-2xl border border-white/10 bg-white/5 p-3">
       {/* Categorías */}
@@ -100,6 +115,15 @@ export default function AuditFiltersBar({ filters, onChange, onReset }) {
         })}
       </div>
 
+      {/* Búsqueda */}
+      <input
+        type="search"
+        value={search}
+        onChange={(e) => setSearch(e.target.value)}
+        placeholder="Buscar jugador, cancha, motivo..."
+        className="w-full rounded-xl border border-white/10 bg-black/30 px-3 py-2 text-sm text-white placeholder:text-white/30 focus:border-white/30 focus:outline-none"
+      />
+
       {/* Fila evento + actor + sistema */}
       <div className="grid gap-2 sm:grid-cols-3">
         <div>
@@ -139,7 +163,7 @@ export default function AuditFiltersBar({ filters, onChange, onReset }) {
             className="w-full rounded-xl border border-white/10 bg-black/30 px-3 py-2 text-sm text-white placeholder:text-white/30 focus:border-white/30 focus:outline-none"
           />
           <datalist id="audit-actors-list">
-            {filteredActors.map((a) => (
+            {actors.map((a) => (
               <option key={a.id} value={a.name} />
             ))}
           </datalist>
@@ -217,6 +241,7 @@ export default function AuditFiltersBar({ filters, onChange, onReset }) {
           <button
             onClick={() => {
               setActorQuery("");
+              setSearch("");
               onReset();
             }}
             className="ml-auto rounded-full border border-white/10 bg-white/5 px-2.5 py-1 text-xs text-white/60 hover:bg-white/10"
@@ -13,6 +13,7 @@ function defaultFilters() {
     event_id: null,
     actor_user_id_filter: null,
     actor_name_query: "",
+    q: "",
     include_system: false,
     datePreset: "30d",
     from: from.toISOString(),
@@ -22,15 +23,16 @@ function defaultFilters() {
   };
 }
 
-function buildQuery(filters, offset) {
+function buildQuery(filters, cursor) {
   const params = new URLSearchParams();
   params.set("limit", String(PAGE_SIZE));
-  params.set("offset", String(offset));
+  if (cursor) params.set("cursor", cursor);
   params.set("include_system", filters.include_system ? "true" : "false");
   if (filters.event_id) params.set("event_id", filters.event_id);
   if (filters.actor_user_id_filter) params.set("actor_user_id_filter", filters.actor_user_id_filter);
   if (filters.from) params.set("from", filters.from);
   if (filters.to) params.set("to", filters.to);
+  if (filters.q?.trim()) params.set("q", filters.q.trim());
   for (const c of filters.categories || []) params.append("category", c);
   return params.toString();
 }
@@ -42,28 +44,26 @@ export default function AuditoriaTab() {
   const [loading, setLoading] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
   const [err, setErr] = useState("");
-  const [offset, setOffset] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
 
-  const load = useCallback(async (resetOffset = true) => {
-    if (resetOffset) {
+  const load = useCallback(async (reset = true) => {
+    if (reset) {
       setLoading(true);
-      setOffset(0);
+      setNextCursor(null);
     } else {
       setLoadingMore(true);
     }
     setErr("");
     try {
-      const nextOffset = resetOffset ? 0 : offset + PAGE_SIZE;
-      const qs = buildQuery(filters, nextOffset);
+      const qs = buildQuery(filters, reset ? null : nextCursor);
       const data = await apiFetch(`/admin/audit?${qs}`);
       const newItems = data.items || [];
       setHasMore(!!data.has_more);
-      if (resetOffset) {
+      setNextCursor(data.next_cursor || null);
+      if (reset) {
         setItems(newItems);
-        setOffset(0);
       } else {
         setItems((prev) => [...prev, ...newItems]);
-        setOffset(nextOffset);
       }
     } catch (e) {
       setErr(e.message || "No se pudo cargar la auditoría.");
@@ -71,7 +71,7 @@ export default function AuditoriaTab() {
       setLoading(false);
       setLoadingMore(false);
     }
-  }, [filters, offset]);
+  }, [filters, nextCursor]);
 
   // Reset y recarga cuando cambian filtros
   const categoriesKey = (filters.categories || []).join(",");
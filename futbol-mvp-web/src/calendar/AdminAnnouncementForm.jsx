@@ -13,6 +13,26 @@ function isoToLocalInput(iso) {
   }
 }
 
+function isoToLocalDate(iso) {
+  return isoToLocalInput(iso).slice(0, 10);
+}
+
+// El form solo edita freq y "hasta". El resto de la regla guardada (interval, by_weekday,
+// count) se conserva; by_weekday solo vale para WEEKLY y until/count son excluyentes.
+function buildRecurrence(saved, freq, until) {
+  if (!freq) return null;
+  const rule = saved?.freq === freq ? { ...saved } : { interval: 1, count: saved?.count ?? null };
+  rule.freq = freq;
+  rule.until = until || null;
+  if (freq !== "WEEKLY") rule.by_weekday = null;
+  if (rule.until) rule.count = null;
+  return rule;
+}
+
+function hasAdvancedRule(rule) {
+  return !!rule && ((rule.interval || 1) > 1 || rule.by_weekday?.length > 0 || !!rule.count);
+}
+
 export default function AdminAnnouncementForm({ open, onClose, onSaved, editing }) {
   const isEdit = !!editing;
   const [title, setTitle] = useState("");
@@ -22,6 +42,8 @@ export default function AdminAnnouncementForm({ open, onClose, onSaved, editing
   const [locationName, setLocationName] = useState("");
   const [actionUrl, setActionUrl] = useState("");
   const [actionLabel, setActionLabel] = useState("");
+  const [repeatFreq, setRepeatFreq] = useState(""); // "" | DAILY | WEEKLY | MONTHLY
+  const [repeatUntil, setRepeatUntil] = useState("");
   const [busy, setBusy] = useState(false);
   const [err, setErr] = useState("");
 
@@ -34,6 +56,8 @@ export default function AdminAnnouncementForm({ open, onClose, onSaved, editing
     setLocationName(editing?.location_name || "");
     setActionUrl(editing?.action_url || "");
     setActionLabel(editing?.action_label || "");
+    setRepeatFreq(editing?.recurrence?.freq || "");
+    setRepeatUntil(isoToLocalDate(editing?.recurrence?.until));
     setErr("");
   }, [open, editing]);
 
@@ -61,6 +85,9 @@ export default function AdminAnnouncementForm({ open, onClose, onSaved, editing
         location_name: locationName.trim() || null,
         action_url: actionUrl.trim() || null,
         action_label: actionLabel.trim() || null,
+        // Se guarda la regla; el calendario expande las fechas al mostrarlas.
+        // "Hasta" va como fecha sola: el backend la toma hasta el final de ese dia.
+        recurrence: buildRecurrence(editing?.recurrence, repeatFreq, repeatUntil),
       };
       if (isEdit) {
         await apiFetch(`/admin/calendar/announcements/${editing.id}`, {
@@ -166,6 +193,41 @@ export default function AdminAnnouncementForm({ open, onClose, onSaved, editing
             </div>
           </div>
 
+          <div className="grid grid-cols-2 gap-3">
+            <div>
+              <label className="mb-1 block text-xs font-medium uppercase tracking-wide text-white/50">
+                Repetir
+              </label>
+              <select
+                value={repeatFreq}
+                onChange={(e) => setRepeatFreq(e.target.value)}
+                className="w-full rounded-xl border border-white/10 bg-black/30 px-3 py-2 text-white focus:border-white/30 focus:outline-none"
+              >
+                <option value="">No se repite</option>
+                <option value="DAILY">Todos los dias</option>
+                <option value="WEEKLY">Todas las semanas</option>
+                <option value="MONTHLY">Todos los meses</option>
+              </select>
+            </div>
+            <div>
+              <label className="mb-1 block text-xs font-medium uppercase tracking-wide text-white/50">
+                Repetir hasta (opcional)
+              </label>
+              <input
+                type="date"
+                value={repeatUntil}
+                onChange={(e) => setRepeatUntil(e.target.value)}
+                disabled={!repeatFreq}
+                className="w-full rounded-xl border border-white/10 bg-black/30 px-3 py-2 text-white focus:border-white/30 focus:outline-none disabled:opacity-40"
+              />
+            </div>
+          </div>
+          {isEdit && repeatFreq && repeatFreq === editing?.recurrence?.freq && hasAdvancedRule(editing.recurrence) && (
+            <p className="text-xs text-white/40">
+              La repeticion tiene opciones que no se editan aca (intervalo, dias o cantidad): se conservan.
+            </p>
+          )}
+
           <div>
             <label className="mb-1 block text-xs font-medium uppercase tracking-wide text-white/50">
               Donde (opcional)
@@ -1,6 +1,6 @@
 import { useCallback, useEffect, useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { apiFetch, cn } from "./api.js";
+import { API_BASE, apiFetch, cn } from "./api.js";
 import CalendarItem from "./CalendarItem.jsx";
 import CalendarItemSheet from "./CalendarItemSheet.jsx";
 import AdminCreateMenu from "./AdminCreateMenu.jsx";
@@ -20,6 +20,8 @@ export default function Calendar() {
   const [openItem, setOpenItem] = useState(null);
   const [adminMenuOpen, setAdminMenuOpen] = useState(false);
   const [announcementFormOpen, setAnnouncementFormOpen] = useState(false);
+  const [feedUrl, setFeedUrl] = useState("");
+  const [feedBusy, setFeedBusy] = useState(false);
 
   const { can } = usePermissions();
   // El boton flotante de "agregar" requiere gestionar calendario o crear eventos.
@@ -48,6 +50,20 @@ export default function Calendar() {
     load();
   }, [load, navigate]);
 
+  // Genera (o rota) la URL de suscripcion: el token solo se ve en esta respuesta.
+  const createFeedUrl = async () => {
+    setFeedBusy(true);
+    try {
+      const res = await apiFetch("/me/calendar/feed-token", { method: "POST" });
+      const base = API_BASE || window.location.origin;
+      setFeedUrl(`${base}${res.url}`.replace(/^https?:/, "webcal:"));
+    } catch (e) {
+      setErr(e.message || "No se pudo generar el link del calendario.");
+    } finally {
+      setFeedBusy(false);
+    }
+  };
+
   const groupedByDay = useMemo(() => {
     const items = data?.items || [];
     const map = new Map();
@@ -65,14 +81,35 @@ export default function Calendar() {
         {/* Header */}
         <div className="mb-4 flex items-center justify-between gap-3">
           <h1 className="text-2xl font-bold text-white">Mi Calendario</h1>
-          <button
-            onClick={() => navigate("/")}
-            className="rounded-xl border border-white/10 bg-white/5 px-3 py-2 text-xs font-semibold text-white/80 hover:bg-white/10"
-          >
-            Volver
-          </button>
+          <div className="flex items-center gap-2">
+            <button
+              onClick={createFeedUrl}
+              disabled={feedBusy}
+              className="rounded-xl border border-white/10 bg-white/5 px-3 py-2 text-xs font-semibold text-white/80 hover:bg-white/10 disabled:opacity-50"
+            >
+              Sincronizar
+            </button>
+            <button
+              onClick={() => navigate("/")}
+              className="rounded-xl border border-white/10 bg-white/5 px-3 py-2 text-xs font-semibold text-white/80 hover:bg-white/10"
+            >
+              Volver
+            </button>
+          </div>
         </div>
 
+        {feedUrl && (
+          <div className="mb-4 rounded-xl border border-emerald-400/30 bg-emerald-500/10 px-3 py-2 text-xs text-emerald-100">
+            <div className="mb-1 font-semibold">Suscribite desde la app de calendario del celular:</div>
+            <a href={feedUrl} className="block break-all underline">
+              {feedUrl}
+            </a>
+            <div className="mt-1 text-emerald-100/60">
+              Es personal: no lo compartas. Si generas uno nuevo, el anterior deja de funcionar.
+            </div>
+          </div>
+        )}
+
         {/* Tabs */}
         <div className="mb-5 inline-flex rounded-xl border border-white/10 bg-white/5 p-1">
           {[
@@ -116,7 +153,7 @@ export default function Calendar() {
                 <div className="space-y-2">
                   {items.map((it) => (
                     <CalendarItem
-                      key={`${it.type}:${it.source_id}`}
+                      key={`${it.type}:${it.source_id}:${it.starts_at}`}
                       item={it}
                       onClick={setOpenItem}
                     />
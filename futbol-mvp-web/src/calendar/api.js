@@ -1,6 +1,6 @@
 import { handleAuthFailure } from "../authSession.js";
 
-const API_BASE = (
+export const API_BASE = (
   import.meta.env.VITE_API_URL ||
   import.meta.env.VITE_API_BASE_URL ||
   ""
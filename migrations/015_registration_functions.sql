@@ -0,0 +1,488 @@
+-- 015_registration_functions.sql
+-- Inscripciones del lado de Postgres: register / guest / cancel / move como funciones
+-- que hacen lock de cancha, cupo, waitlist, auditoria y auto-cierre en una sola ida
+-- y vuelta. Las llama app/routers/events.py.
+--
+-- Contrato: cada funcion devuelve UNA fila. Si http_status es NULL salio bien; si no,
+-- la funcion no escribio nada y la API responde ese status con `detail`.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+-- ============================================================
+-- 0) Indice para los COUNT de cupo por cancha
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_event_registrations_court_status
+  ON public.event_registrations (court_id, status);
+
+-- ============================================================
+-- 1) Helpers
+-- ============================================================
+
+-- Admin/super_admin o capitan del evento (mismo criterio que assert_can_move).
+CREATE OR REPLACE FUNCTION public.fn_can_manage_event(p_event_id uuid, p_actor uuid)
+RETURNS boolean
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT EXISTS (
+           SELECT 1
+           FROM public.user_roles ur
+           JOIN public.roles r ON r.id = ur.role_id
+           WHERE ur.user_id = p_actor
+             AND LOWER(r.code) IN ('admin', 'super_admin')
+         )
+      OR EXISTS (
+           SELECT 1
+           FROM public.event_captains ec
+           WHERE ec.event_id = p_event_id
+             AND ec.user_id = p_actor
+         );
+$$;
+
+-- Cierra la cancha si se lleno, y el evento si todas sus canchas quedaron cerradas o llenas.
+CREATE OR REPLACE FUNCTION public.fn_auto_close_court(p_event_id uuid, p_court_id uuid, p_actor uuid)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_capacity int;
+  v_is_open  boolean;
+  v_occupied int;
+BEGIN
+  SELECT ec.capacity, ec.is_open
+    INTO v_capacity, v_is_open
+  FROM public.event_courts ec
+  WHERE ec.id = p_court_id
+    AND ec.event_id = p_event_id;
+
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  SELECT COUNT(*) INTO v_occupied
+  FROM public.event_registrations er
+  WHERE er.court_id = p_court_id
+    AND er.status = 'CONFIRMED';
+
+  IF v_is_open AND v_occupied >= v_capacity THEN
+    UPDATE public.event_courts
+    SET is_open = false, updated_at = now()
+    WHERE id = p_court_id;
+
+    INSERT INTO public.event_audit_log (event_id, actor_user_id, action, metadata)
+    VALUES (p_event_id, p_actor, 'AUTO_CLOSE_COURT',
+            jsonb_build_object('court_id', p_court_id::text, 'reason', 'capacity_reached'));
+  END IF;
+
+  -- Una cancha esta "cerrada efectivamente" si is_open=false O si esta llena.
+  IF NOT EXISTS (
+    SELECT 1
+    FROM public.event_courts ec
+    WHERE ec.event_id = p_event_id
+      AND ec.is_open
+      AND (
+        SELECT COUNT(*)
+        FROM public.event_registrations er
+        WHERE er.court_id = ec.id
+          AND er.status = 'CONFIRMED'
+      ) < ec.capacity
+  ) THEN
+    UPDATE public.events
+    SET status = 'CLOSED', updated_at = now()
+    WHERE id = p_event_id
+      AND status = 'OPEN';
+
+    IF FOUND THEN
+      INSERT INTO public.event_audit_log (event_id, actor_user_id, action, metadata)
+      VALUES (p_event_id, p_actor, 'AUTO_CLOSE_EVENT', '{"reason": "all_courts_closed_or_full"}'::jsonb);
+    END IF;
+  END IF;
+END;
+$$;
+
+-- Promueve el primer WAITLIST (FIFO) a la cancha si esta abierta y tiene cupo.
+-- Devuelve el id promovido o NULL.
+CREATE OR REPLACE FUNCTION public.fn_promote_waitlist(
+  p_event_id uuid,
+  p_court_id uuid,
+  p_actor    uuid,
+  p_source   text
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_wait_id  uuid;
+  v_capacity int;
+  v_is_open  boolean;
+  v_occupied int;
+BEGIN
+  SELECT er.id INTO v_wait_id
+  FROM public.event_registrations er
+  WHERE er.event_id = p_event_id
+    AND er.status = 'WAITLIST'
+    AND er.court_id IS NULL
+  ORDER BY er.created_at ASC
+  LIMIT 1
+  FOR UPDATE;
+
+  IF v_wait_id IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT ec.capacity, ec.is_open
+    INTO v_capacity, v_is_open
+  FROM public.event_courts ec
+  WHERE ec.id = p_court_id
+    AND ec.event_id = p_event_id
+  FOR UPDATE;
+
+  IF NOT FOUND OR NOT v_is_open THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT COUNT(*) INTO v_occupied
+  FROM public.event_registrations er
+  WHERE er.court_id = p_court_id
+    AND er.status = 'CONFIRMED';
+
+  IF v_occupied >= v_capacity THEN
+    RETURN NULL;
+  END IF;
+
+  UPDATE public.event_registrations
+  SET status = 'CONFIRMED', court_id = p_court_id, updated_at = now()
+  WHERE id = v_wait_id;
+
+  INSERT INTO public.event_audit_log (event_id, actor_user_id, action, target_registration_id, metadata)
+  VALUES (p_event_id, p_actor, 'PROMOTE_WAITLIST', v_wait_id, jsonb_build_object('source', p_source));
+
+  RETURN v_wait_id;
+END;
+$$;
+
+-- ============================================================
+-- 2) Auto-inscripcion (CONFIRMED si hay cupo, si no WAITLIST)
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.fn_register_user(
+  p_event_id uuid,
+  p_court_id uuid,
+  p_actor    uuid,
+  OUT http_status     int,
+  OUT detail          text,
+  OUT registration_id uuid,
+  OUT reg_status      text,
+  OUT reg_court_id    uuid,
+  OUT reg_created_at  timestamptz
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_event_status text;
+  v_capacity     int;
+  v_is_open      boolean;
+  v_occupied     int;
+  v_status       text;
+BEGIN
+  SELECT e.status INTO v_event_status
+  FROM public.events e
+  WHERE e.id = p_event_id;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Evento no encontrado'; RETURN;
+  END IF;
+  IF v_event_status <> 'OPEN' THEN
+    http_status := 400; detail := 'El evento no está abierto'; RETURN;
+  END IF;
+
+  SELECT ec.capacity, ec.is_open
+    INTO v_capacity, v_is_open
+  FROM public.event_courts ec
+  WHERE ec.id = p_court_id
+    AND ec.event_id = p_event_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Cancha no encontrada para este evento'; RETURN;
+  END IF;
+  IF NOT v_is_open THEN
+    http_status := 400; detail := 'La cancha está cerrada'; RETURN;
+  END IF;
+
+  SELECT COUNT(*) INTO v_occupied
+  FROM public.event_registrations er
+  WHERE er.event_id = p_event_id
+    AND er.court_id = p_court_id
+    AND er.status = 'CONFIRMED';
+
+  v_status := CASE WHEN v_occupied < v_capacity THEN 'CONFIRMED' ELSE 'WAITLIST' END;
+
+  BEGIN
+    INSERT INTO public.event_registrations (
+      event_id, registration_type, status, court_id, created_by_user_id, user_id
+    )
+    VALUES (
+      p_event_id, 'USER', v_status,
+      CASE WHEN v_status = 'CONFIRMED' THEN p_court_id END,
+      p_actor, p_actor
+    )
+    RETURNING id, status, court_id, created_at
+      INTO registration_id, reg_status, reg_court_id, reg_created_at;
+  EXCEPTION WHEN unique_violation THEN
+    http_status := 409; detail := 'El usuario ya está inscripto en este evento'; RETURN;
+  END;
+
+  INSERT INTO public.event_audit_log (event_id, actor_user_id, action, target_registration_id, metadata)
+  VALUES (p_event_id, p_actor, 'REGISTER_USER', registration_id, '{"source":"api"}'::jsonb);
+
+  IF reg_status = 'CONFIRMED' THEN
+    PERFORM public.fn_auto_close_court(p_event_id, p_court_id, p_actor);
+  END IF;
+END;
+$$;
+
+-- ============================================================
+-- 3) Invitado (sin sobrecupo, tope de invitados por actor/evento)
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.fn_register_guest(
+  p_event_id   uuid,
+  p_court_id   uuid,
+  p_actor      uuid,
+  p_guest_name text,
+  p_max_guests int,
+  OUT http_status     int,
+  OUT detail          text,
+  OUT registration_id uuid,
+  OUT reg_status      text,
+  OUT reg_court_id    uuid,
+  OUT reg_created_at  timestamptz
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_event_status text;
+  v_capacity     int;
+  v_is_open      boolean;
+  v_guests       int;
+  v_occupied     int;
+BEGIN
+  SELECT e.status INTO v_event_status
+  FROM public.events e
+  WHERE e.id = p_event_id;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Evento no encontrado'; RETURN;
+  END IF;
+  IF v_event_status <> 'OPEN' THEN
+    http_status := 400; detail := 'El evento no está abierto'; RETURN;
+  END IF;
+
+  SELECT ec.capacity, ec.is_open
+    INTO v_capacity, v_is_open
+  FROM public.event_courts ec
+  WHERE ec.id = p_court_id
+    AND ec.event_id = p_event_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Cancha no encontrada para este evento'; RETURN;
+  END IF;
+  IF NOT v_is_open THEN
+    http_status := 400; detail := 'La cancha está cerrada'; RETURN;
+  END IF;
+
+  -- Tope de invitados por actor/evento (no cuenta CANCELLED)
+  SELECT COUNT(*) INTO v_guests
+  FROM public.event_registrations er
+  WHERE er.event_id = p_event_id
+    AND er.registration_type = 'GUEST'
+    AND er.created_by_user_id = p_actor
+    AND er.status <> 'CANCELLED';
+
+  IF v_guests >= p_max_guests THEN
+    http_status := 400;
+    detail := format('Límite de %s invitados alcanzado para este evento', p_max_guests);
+    RETURN;
+  END IF;
+
+  SELECT COUNT(*) INTO v_occupied
+  FROM public.event_registrations er
+  WHERE er.event_id = p_event_id
+    AND er.court_id = p_court_id
+    AND er.status = 'CONFIRMED';
+
+  IF v_occupied >= v_capacity THEN
+    http_status := 409; detail := 'La cancha está completa. No se permite sobrecupo.'; RETURN;
+  END IF;
+
+  INSERT INTO public.event_registrations (
+    event_id, registration_type, status, court_id, created_by_user_id, guest_name
+  )
+  VALUES (
+    p_event_id, 'GUEST', 'CONFIRMED', p_court_id, p_actor, p_guest_name
+  )
+  RETURNING id, status, court_id, created_at
+    INTO registration_id, reg_status, reg_court_id, reg_created_at;
+
+  INSERT INTO public.event_audit_log (event_id, actor_user_id, action, target_registration_id, metadata)
+  VALUES (p_event_id, p_actor, 'REGISTER_GUEST', registration_id, '{"source":"api"}'::jsonb);
+
+  PERFORM public.fn_auto_close_court(p_event_id, p_court_id, p_actor);
+END;
+$$;
+
+-- ============================================================
+-- 4) Cancelacion (admin o capitan) + promocion desde waitlist
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.fn_cancel_registration(
+  p_registration_id uuid,
+  p_actor           uuid,
+  OUT http_status              int,
+  OUT detail                   text,
+  OUT promoted_registration_id uuid
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_event_id     uuid;
+  v_court_id     uuid;
+  v_status       text;
+  v_event_status text;
+BEGIN
+  SELECT er.event_id, er.court_id, er.status
+    INTO v_event_id, v_court_id, v_status
+  FROM public.event_registrations er
+  WHERE er.id = p_registration_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Inscripción no encontrada'; RETURN;
+  END IF;
+  IF v_status = 'CANCELLED' THEN
+    http_status := 400; detail := 'La inscripción ya está cancelada'; RETURN;
+  END IF;
+
+  IF NOT public.fn_can_manage_event(v_event_id, p_actor) THEN
+    http_status := 403;
+    detail := 'No tenés permisos para realizar esta acción (solo Admin o Capitán del evento).';
+    RETURN;
+  END IF;
+
+  SELECT e.status INTO v_event_status
+  FROM public.events e
+  WHERE e.id = v_event_id;
+
+  IF NOT FOUND OR v_event_status = 'FINALIZED' THEN
+    http_status := 400;
+    detail := 'El evento está finalizado. No se pueden cancelar inscripciones.';
+    RETURN;
+  END IF;
+
+  UPDATE public.event_registrations
+  SET status = 'CANCELLED', cancelled_at = now(), updated_at = now()
+  WHERE id = p_registration_id;
+
+  INSERT INTO public.event_audit_log (event_id, actor_user_id, action, target_registration_id, metadata)
+  VALUES (v_event_id, p_actor, 'CANCEL_REGISTRATION', p_registration_id, '{"reason":"manual_cancel"}'::jsonb);
+
+  IF v_court_id IS NOT NULL THEN
+    promoted_registration_id := public.fn_promote_waitlist(v_event_id, v_court_id, p_actor, 'auto_from_cancel');
+  END IF;
+END;
+$$;
+
+-- ============================================================
+-- 5) Movimiento entre canchas (admin o capitan) + promocion desde waitlist
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.fn_move_registration(
+  p_registration_id uuid,
+  p_to_court_id     uuid,
+  p_actor           uuid,
+  OUT http_status              int,
+  OUT detail                   text,
+  OUT from_court_id            uuid,
+  OUT promoted_registration_id uuid
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_event_id     uuid;
+  v_status       text;
+  v_event_status text;
+  v_capacity     int;
+  v_is_open      boolean;
+  v_occupied     int;
+BEGIN
+  SELECT er.event_id, er.court_id, er.status
+    INTO v_event_id, from_court_id, v_status
+  FROM public.event_registrations er
+  WHERE er.id = p_registration_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Inscripción no encontrada'; RETURN;
+  END IF;
+  IF v_status <> 'CONFIRMED' THEN
+    http_status := 400; detail := 'Solo se pueden mover inscripciones CONFIRMED'; RETURN;
+  END IF;
+  IF from_court_id IS NULL THEN
+    http_status := 400; detail := 'La inscripción no tiene cancha asignada'; RETURN;
+  END IF;
+  IF p_to_court_id = from_court_id THEN
+    http_status := 400; detail := 'La inscripción ya está en esa cancha'; RETURN;
+  END IF;
+
+  IF NOT public.fn_can_manage_event(v_event_id, p_actor) THEN
+    http_status := 403;
+    detail := 'No tenés permisos para realizar esta acción (solo Admin o Capitán del evento).';
+    RETURN;
+  END IF;
+
+  SELECT e.status INTO v_event_status
+  FROM public.events e
+  WHERE e.id = v_event_id;
+
+  IF NOT FOUND OR v_event_status = 'FINALIZED' THEN
+    http_status := 400;
+    detail := 'El evento está finalizado. No se pueden realizar cambios.';
+    RETURN;
+  END IF;
+
+  SELECT ec.capacity, ec.is_open
+    INTO v_capacity, v_is_open
+  FROM public.event_courts ec
+  WHERE ec.id = p_to_court_id
+    AND ec.event_id = v_event_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    http_status := 404; detail := 'Cancha destino no encontrada para este evento'; RETURN;
+  END IF;
+  IF NOT v_is_open THEN
+    http_status := 400; detail := 'La cancha destino está cerrada'; RETURN;
+  END IF;
+
+  SELECT COUNT(*) INTO v_occupied
+  FROM public.event_registrations er
+  WHERE er.event_id = v_event_id
+    AND er.court_id = p_to_court_id
+    AND er.status = 'CONFIRMED';
+
+  IF v_occupied >= v_capacity THEN
+    http_status := 409; detail := 'La cancha destino está completa'; RETURN;
+  END IF;
+
+  UPDATE public.event_registrations
+  SET court_id = p_to_court_id, updated_at = now()
+  WHERE id = p_registration_id;
+
+  INSERT INTO public.event_audit_log (event_id, actor_user_id, action, target_registration_id, metadata)
+  VALUES (v_event_id, p_actor, 'MOVE_REGISTRATION', p_registration_id,
+          jsonb_build_object('from_court_id', from_court_id::text, 'to_court_id', p_to_court_id::text));
+
+  promoted_registration_id := public.fn_promote_waitlist(v_event_id, from_court_id, p_actor, 'auto_from_move');
+END;
+$$;
+
+COMMIT;
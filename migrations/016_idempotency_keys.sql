@@ -0,0 +1,25 @@
+-- 016_idempotency_keys.sql
+-- Header Idempotency-Key en POST /events/{id}/register, /events/{id}/guests y /ratings.
+-- Guarda la respuesta del primer intento para devolverla tal cual en los reintentos
+-- (sin volver a tocar inscripciones ni ratings). Ver app/utils/idempotency.py.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.idempotency_keys (
+  actor_user_id UUID NOT NULL,
+  idem_key VARCHAR(128) NOT NULL,
+  scope VARCHAR(96) NOT NULL,          -- endpoint + path params, ej. 'register:<event_id>'
+  request_hash CHAR(64) NOT NULL,      -- sha256 del scope + body
+  status_code SMALLINT,                -- se completa en la misma transaccion que la escritura
+  response JSONB,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  expires_at TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (actor_user_id, idem_key)
+);
+
+-- Limpieza por TTL (DELETE ... WHERE expires_at < now()).
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at
+  ON public.idempotency_keys (expires_at);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- 017_audit_log_keyset.sql
+-- Indices para GET /admin/audit con paginacion keyset sobre (created_at, id):
+-- ORDER BY created_at DESC, id DESC + WHERE (created_at, id) < cursor.
+-- Uno general y uno por cada filtro de igualdad que usa el panel (evento, actor, action).
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_created_id
+  ON public.event_audit_log (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_event_created_id
+  ON public.event_audit_log (event_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_actor_created_id
+  ON public.event_audit_log (actor_user_id, created_at DESC, id DESC);
+
+-- Filtros action = :action y action = ANY(:category_actions).
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_action_created_id
+  ON public.event_audit_log (action, created_at DESC, id DESC);
+
+COMMIT;
@@ -0,0 +1,143 @@
+-- 018_audit_log_partitions.sql
+-- event_audit_log pasa a ser una tabla particionada por mes (RANGE sobre created_at).
+--   - Particiones event_audit_log_yYYYYmMM, creadas por ensure_audit_log_partitions()
+--     (la app la llama al arrancar y cada 12 h; ver app/jobs/audit_partitions.py).
+--   - Particion DEFAULT para que un insert nunca falle si el job no corrio. Al crear el
+--     mes, sus filas se mueven de la DEFAULT a la particion nueva.
+--   - Retencion/archivo: python -m app.jobs.audit_partitions archive (detach + dump gz + drop).
+-- La PK pasa a (id, created_at): Postgres exige la columna de particion en la PK.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+-- Copia todas las filas existentes: correr en un momento tranquilo.
+
+BEGIN;
+
+-- ============================================================
+-- 1) Tabla vieja fuera del camino (libera nombres de PK e indices)
+-- ============================================================
+ALTER TABLE public.event_audit_log RENAME TO event_audit_log_old;
+ALTER INDEX IF EXISTS public.event_audit_log_pkey RENAME TO event_audit_log_old_pkey;
+DROP INDEX IF EXISTS public.idx_event_audit_log_created_id;
+DROP INDEX IF EXISTS public.idx_event_audit_log_event_created_id;
+DROP INDEX IF EXISTS public.idx_event_audit_log_actor_created_id;
+DROP INDEX IF EXISTS public.idx_event_audit_log_action_created_id;
+
+-- ============================================================
+-- 2) Tabla particionada
+-- ============================================================
+CREATE TABLE public.event_audit_log (
+  id UUID NOT NULL DEFAULT gen_random_uuid(),
+  event_id UUID REFERENCES public.events(id),
+  actor_user_id UUID REFERENCES public.users(id),
+  action VARCHAR NOT NULL,
+  target_registration_id UUID REFERENCES public.event_registrations(id),
+  metadata JSONB,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE public.event_audit_log_default
+  PARTITION OF public.event_audit_log DEFAULT;
+
+-- Crea las particiones mensuales faltantes desde p_from (default: mes actual) hasta
+-- p_months_ahead meses adelante. Limites en UTC. Devuelve cuantas creo.
+-- Si la DEFAULT ya tiene filas de ese mes (el job no corrio a tiempo), CREATE ... PARTITION OF
+-- fallaria: la tabla se crea suelta, se le mueven esas filas y recien ahi se attachea.
+-- Un mes que falla igual (ej. lock_timeout) se saltea con WARNING y sigue con los demas;
+-- app/jobs/audit_partitions.py avisa si la DEFAULT quedo con filas.
+CREATE OR REPLACE FUNCTION public.ensure_audit_log_partitions(
+  p_months_ahead int DEFAULT 3,
+  p_from date DEFAULT NULL
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_month   date := date_trunc('month', COALESCE(p_from, (now() AT TIME ZONE 'UTC')::date))::date;
+  v_last    date := (date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => p_months_ahead))::date;
+  v_name    text;
+  v_from    timestamptz;
+  v_to      timestamptz;
+  v_cols    text;
+  v_created int := 0;
+BEGIN
+  WHILE v_month <= v_last LOOP
+    v_name := format('event_audit_log_y%sm%s', to_char(v_month, 'YYYY'), to_char(v_month, 'MM'));
+    v_from := v_month::timestamp AT TIME ZONE 'UTC';
+    v_to := (v_month + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+    IF to_regclass('public.' || v_name) IS NULL THEN
+      BEGIN
+        IF EXISTS (
+          SELECT 1 FROM public.event_audit_log_default
+          WHERE created_at >= v_from AND created_at < v_to
+        ) THEN
+          EXECUTE format(
+            'CREATE TABLE public.%I (LIKE public.event_audit_log INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)',
+            v_name
+          );
+          -- Columnas generadas fuera: no aceptan valores en el INSERT.
+          SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+          INTO v_cols
+          FROM pg_attribute
+          WHERE attrelid = 'public.event_audit_log'::regclass
+            AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+          EXECUTE format(
+            'WITH moved AS ('
+            '  DELETE FROM public.event_audit_log_default'
+            '  WHERE created_at >= %L AND created_at < %L'
+            '  RETURNING %s'
+            ') INSERT INTO public.%I (%s) SELECT %s FROM moved',
+            v_from, v_to, v_cols, v_name, v_cols, v_cols
+          );
+          EXECUTE format(
+            'ALTER TABLE public.event_audit_log ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_from, v_to
+          );
+        ELSE
+          EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.event_audit_log FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_from, v_to
+          );
+        END IF;
+        v_created := v_created + 1;
+      EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'ensure_audit_log_partitions: no se pudo crear %: %', v_name, SQLERRM;
+      END;
+    END IF;
+    v_month := (v_month + interval '1 month')::date;
+  END LOOP;
+  RETURN v_created;
+END;
+$$;
+
+-- ============================================================
+-- 3) Particiones para el historico + 3 meses adelante, y copia
+-- ============================================================
+SELECT public.ensure_audit_log_partitions(
+  3,
+  (SELECT MIN(created_at AT TIME ZONE 'UTC')::date FROM public.event_audit_log_old)
+);
+
+INSERT INTO public.event_audit_log (
+  id, event_id, actor_user_id, action, target_registration_id, metadata, created_at
+)
+SELECT id, event_id, actor_user_id, action, target_registration_id, metadata, COALESCE(created_at, now())
+FROM public.event_audit_log_old;
+
+DROP TABLE public.event_audit_log_old;
+
+-- ============================================================
+-- 4) Indices keyset (017) sobre la tabla padre: se propagan a cada particion
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_created_id
+  ON public.event_audit_log (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_event_created_id
+  ON public.event_audit_log (event_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_actor_created_id
+  ON public.event_audit_log (actor_user_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_action_created_id
+  ON public.event_audit_log (action, created_at DESC, id DESC);
+
+COMMIT;
@@ -0,0 +1,125 @@
+-- 019_audit_log_resolved_names.sql
+-- Read model de auditoria: los nombres que muestra GET /admin/audit se resuelven una
+-- sola vez, al insertar la fila (trigger BEFORE INSERT), y quedan en columnas propias.
+-- La lectura del panel pasa a ser un index scan sobre event_audit_log, sin JOINs ni
+-- lookups extra de los UUIDs de metadata.
+--   actor_name, event_title                      <- users / events
+--   target_reg_type, target_player_name,
+--   target_court_name                            <- event_registrations (+ users, courts)
+--   resolved_names = {"courts": {uuid: name}, "users": {uuid: name}}
+--                                                <- UUIDs de metadata (mismas llaves que
+--                                                   COURT_KEYS / USER_KEYS en admin_audit.py)
+-- Los nombres quedan como estaban al momento de la accion (foto historica).
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+ALTER TABLE public.event_audit_log
+  ADD COLUMN IF NOT EXISTS actor_name TEXT,
+  ADD COLUMN IF NOT EXISTS event_title TEXT,
+  ADD COLUMN IF NOT EXISTS target_reg_type TEXT,
+  ADD COLUMN IF NOT EXISTS target_player_name TEXT,
+  ADD COLUMN IF NOT EXISTS target_court_name TEXT,
+  ADD COLUMN IF NOT EXISTS resolved_names JSONB;
+
+-- Nombres de canchas y usuarios referenciados en metadata. Ignora valores que no son UUID.
+CREATE OR REPLACE FUNCTION public.audit_resolve_metadata_names(p_metadata jsonb)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  WITH refs AS MATERIALIZED (
+    SELECT k, p_metadata ->> k AS val
+    FROM unnest(ARRAY[
+      'court_id', 'from_court_id', 'to_court_id',
+      'user_id', 'captain_user_id', 'removed_user_id', 'target_user_id'
+    ]) AS k
+    WHERE jsonb_typeof(p_metadata) = 'object'
+      AND (p_metadata ->> k) ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+  )
+  SELECT jsonb_build_object(
+    'courts', COALESCE((
+      SELECT jsonb_object_agg(c.id::text, c.name)
+      FROM public.event_courts c
+      WHERE c.id IN (SELECT val::uuid FROM refs WHERE k LIKE '%court_id')
+    ), '{}'::jsonb),
+    'users', COALESCE((
+      SELECT jsonb_object_agg(u.id::text, u.full_name)
+      FROM public.users u
+      WHERE u.id IN (SELECT val::uuid FROM refs WHERE k LIKE '%user_id')
+    ), '{}'::jsonb)
+  );
+$$;
+
+CREATE OR REPLACE FUNCTION public.audit_log_resolve_names()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.actor_user_id IS NOT NULL AND NEW.actor_name IS NULL THEN
+    SELECT u.full_name INTO NEW.actor_name
+    FROM public.users u
+    WHERE u.id = NEW.actor_user_id;
+  END IF;
+
+  IF NEW.event_id IS NOT NULL AND NEW.event_title IS NULL THEN
+    SELECT e.title INTO NEW.event_title
+    FROM public.events e
+    WHERE e.id = NEW.event_id;
+  END IF;
+
+  IF NEW.target_registration_id IS NOT NULL AND NEW.target_reg_type IS NULL THEN
+    SELECT r.registration_type,
+           CASE WHEN r.registration_type = 'USER' THEN u.full_name ELSE r.guest_name END,
+           c.name
+      INTO NEW.target_reg_type, NEW.target_player_name, NEW.target_court_name
+    FROM public.event_registrations r
+    LEFT JOIN public.users u ON u.id = r.user_id
+    LEFT JOIN public.event_courts c ON c.id = r.court_id
+    WHERE r.id = NEW.target_registration_id;
+  END IF;
+
+  IF NEW.resolved_names IS NULL THEN
+    NEW.resolved_names := public.audit_resolve_metadata_names(NEW.metadata);
+  END IF;
+
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_event_audit_log_resolve_names ON public.event_audit_log;
+CREATE TRIGGER trg_event_audit_log_resolve_names
+  BEFORE INSERT ON public.event_audit_log
+  FOR EACH ROW
+  EXECUTE FUNCTION public.audit_log_resolve_names();
+
+-- ============================================================
+-- Backfill de filas existentes (nombres actuales: es lo que mostraba el panel)
+-- ============================================================
+UPDATE public.event_audit_log eal
+SET actor_name = u.full_name
+FROM public.users u
+WHERE u.id = eal.actor_user_id
+  AND eal.actor_name IS NULL;
+
+UPDATE public.event_audit_log eal
+SET event_title = e.title
+FROM public.events e
+WHERE e.id = eal.event_id
+  AND eal.event_title IS NULL;
+
+UPDATE public.event_audit_log eal
+SET target_reg_type = r.registration_type,
+    target_player_name = CASE WHEN r.registration_type = 'USER' THEN u.full_name ELSE r.guest_name END,
+    target_court_name = c.name
+FROM public.event_registrations r
+LEFT JOIN public.users u ON u.id = r.user_id
+LEFT JOIN public.event_courts c ON c.id = r.court_id
+WHERE r.id = eal.target_registration_id
+  AND eal.target_reg_type IS NULL;
+
+UPDATE public.event_audit_log
+SET resolved_names = public.audit_resolve_metadata_names(metadata)
+WHERE resolved_names IS NULL;
+
+COMMIT;
@@ -0,0 +1,76 @@
+-- 020_audit_actors.sql
+-- Resumen por actor de event_audit_log para el typeahead del filtro de auditoria
+-- (GET /admin/audit/actors). Se mantiene con un trigger por sentencia sobre el log,
+-- asi que cualquier camino de escritura (insert_audit_rows, la cola batch, funciones
+-- SQL) lo actualiza, y la consulta del typeahead no crece con el tamanio del log.
+--   actor_name: ultimo nombre visto (viene del read model de migrations/019).
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.audit_actors (
+  actor_user_id UUID PRIMARY KEY REFERENCES public.users(id),
+  actor_name TEXT,
+  first_seen TIMESTAMPTZ NOT NULL,
+  last_seen TIMESTAMPTZ NOT NULL,
+  action_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- Busqueda por prefijo: lower(actor_name) LIKE 'abc%'.
+CREATE INDEX IF NOT EXISTS idx_audit_actors_name_prefix
+  ON public.audit_actors (lower(actor_name) text_pattern_ops);
+
+-- Un upsert por actor y sentencia (la cola batch inserta de a 100 filas).
+CREATE OR REPLACE FUNCTION public.audit_actors_upsert()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.audit_actors AS aa (actor_user_id, actor_name, first_seen, last_seen, action_count)
+  SELECT n.actor_user_id,
+         (array_agg(n.actor_name ORDER BY n.created_at DESC) FILTER (WHERE n.actor_name IS NOT NULL))[1],
+         MIN(n.created_at),
+         MAX(n.created_at),
+         COUNT(*)
+  FROM new_rows n
+  WHERE n.actor_user_id IS NOT NULL
+  GROUP BY n.actor_user_id
+  ORDER BY n.actor_user_id
+  ON CONFLICT (actor_user_id) DO UPDATE
+  SET actor_name = COALESCE(EXCLUDED.actor_name, aa.actor_name),
+      first_seen = LEAST(aa.first_seen, EXCLUDED.first_seen),
+      last_seen = GREATEST(aa.last_seen, EXCLUDED.last_seen),
+      action_count = aa.action_count + EXCLUDED.action_count;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_event_audit_log_actors ON public.event_audit_log;
+CREATE TRIGGER trg_event_audit_log_actors
+  AFTER INSERT ON public.event_audit_log
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.audit_actors_upsert();
+
+-- ============================================================
+-- Backfill (una sola pasada sobre el log)
+-- ============================================================
+INSERT INTO public.audit_actors (actor_user_id, actor_name, first_seen, last_seen, action_count)
+SELECT eal.actor_user_id,
+       COALESCE(
+         (array_agg(eal.actor_name ORDER BY eal.created_at DESC) FILTER (WHERE eal.actor_name IS NOT NULL))[1],
+         MAX(u.full_name)
+       ),
+       MIN(eal.created_at),
+       MAX(eal.created_at),
+       COUNT(*)
+FROM public.event_audit_log eal
+JOIN public.users u ON u.id = eal.actor_user_id
+GROUP BY eal.actor_user_id
+ON CONFLICT (actor_user_id) DO UPDATE
+SET actor_name = EXCLUDED.actor_name,
+    first_seen = EXCLUDED.first_seen,
+    last_seen = EXCLUDED.last_seen,
+    action_count = EXCLUDED.action_count;
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- 021_audit_log_search.sql
+-- Busqueda en event_audit_log para GET /admin/audit (y el export):
+--   - metadata_contains -> metadata @> '{...}'   (GIN jsonb_path_ops)
+--   - q                 -> search_tsv @@ tsquery (GIN sobre tsvector generado)
+-- search_tsv junta los nombres resueltos al escribir (migrations/019), el action y los
+-- strings de metadata (reason, guest_name, ...). Config 'simple': son nombres propios,
+-- sin stemming. Las filas que el trigger de 019 completa llegan con los nombres ya
+-- puestos: las columnas generadas se calculan despues de los BEFORE triggers.
+-- Agregar una columna STORED reescribe la tabla: correr en un momento tranquilo.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+ALTER TABLE public.event_audit_log
+  ADD COLUMN IF NOT EXISTS search_tsv tsvector
+  GENERATED ALWAYS AS (
+    to_tsvector(
+      'simple',
+      coalesce(actor_name, '') || ' ' ||
+      coalesce(event_title, '') || ' ' ||
+      coalesce(target_player_name, '') || ' ' ||
+      coalesce(target_court_name, '') || ' ' ||
+      replace(lower(action), '_', ' ')
+    )
+    || jsonb_to_tsvector('simple', coalesce(resolved_names, '{}'::jsonb), '["string"]')
+    || jsonb_to_tsvector('simple', coalesce(metadata, '{}'::jsonb), '["string"]')
+  ) STORED;
+
+-- Indices sobre la tabla padre: se propagan a cada particion.
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_metadata
+  ON public.event_audit_log USING GIN (metadata jsonb_path_ops);
+
+CREATE INDEX IF NOT EXISTS idx_event_audit_log_search
+  ON public.event_audit_log USING GIN (search_tsv);
+
+COMMIT;
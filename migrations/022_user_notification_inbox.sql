@@ -0,0 +1,44 @@
+-- 022_user_notification_inbox.sql
+-- Notificaciones dirigidas (bandeja por usuario), ademas de las globales de public.notifications.
+--   - user_notifications: una fila por destinatario. El fan-out a los inscriptos de un
+--     evento/cancha es un solo INSERT ... SELECT (ver app/utils/inbox.py).
+--   - user_notification_counters: no leidas por usuario, se actualiza en el mismo
+--     statement que inserta o marca como leidas (la campanita no cuenta filas).
+-- Lectura: keyset sobre (user_id, created_at DESC, id DESC).
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.user_notifications (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+  kind TEXT NOT NULL,
+  title TEXT NOT NULL,
+  message TEXT NOT NULL,
+  action_url TEXT,
+  event_id UUID REFERENCES public.events(id) ON DELETE CASCADE,
+  court_id UUID REFERENCES public.event_courts(id) ON DELETE SET NULL,
+  metadata JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  read_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_notifications_user_created_id
+  ON public.user_notifications (user_id, created_at DESC, id DESC);
+
+-- "Marcar todas como leidas" solo toca las no leidas.
+CREATE INDEX IF NOT EXISTS idx_user_notifications_user_unread
+  ON public.user_notifications (user_id)
+  WHERE read_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS public.user_notification_counters (
+  user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  unread_count INTEGER NOT NULL DEFAULT 0 CHECK (unread_count >= 0),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Indice para el fan-out por evento (WHERE event_id = ... AND status = ...).
+CREATE INDEX IF NOT EXISTS idx_event_registrations_event_status
+  ON public.event_registrations (event_id, status);
+
+COMMIT;
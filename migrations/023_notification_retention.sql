@@ -0,0 +1,22 @@
+-- 023_notification_retention.sql
+-- Retencion de notificaciones (python -m app.jobs.notification_retention; la app lo corre
+-- una vez por dia). Borra en lotes las globales vencidas/desactivadas y sus descartes.
+--   - Indice parcial de notificaciones activas: la campanita solo mira esas, y el
+--     vencimiento (expires_at > now()) se filtra sobre el indice.
+--   - Indice por notification_id en los descartes: el purge borra por notificacion
+--     (la PK empieza por user_id).
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_notifications_active_expires
+  ON public.notifications (expires_at, created_at DESC)
+  WHERE is_active = true;
+
+-- Reemplazado por el parcial de arriba.
+DROP INDEX IF EXISTS public.idx_notifications_active_window;
+
+CREATE INDEX IF NOT EXISTS idx_user_notification_dismissals_notification
+  ON public.user_notification_dismissals (notification_id);
+
+COMMIT;
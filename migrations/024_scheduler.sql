@@ -0,0 +1,13 @@
+-- 024_scheduler.sql
+-- Soporte para los jobs del scheduler en proceso (app/jobs/scheduler.py).
+--   - auto_close_events busca cada minuto eventos OPEN con close_at vencido.
+-- El liderazgo entre workers usa pg_try_advisory_lock: no necesita tablas.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_events_open_close_at
+  ON public.events (close_at)
+  WHERE status = 'OPEN' AND close_at IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,523 @@
+-- 025_calendar_items.sql
+-- Read model de Mi Calendario (GET /me/calendar). En vez de armar el UNION ALL de
+-- inscripciones, eventos GLOBAL, partidos de torneo y anuncios en cada apertura:
+--   calendar_items: una fila por fuente compartida (evento, partido, anuncio) con los
+--     datos que ve cualquier usuario, incluidos los contadores de cupo del evento.
+--   calendar_user_items: overlay por usuario (mi inscripcion y cancha, mi equipo).
+-- El endpoint pasa a ser un range scan sobre (user_id, starts_at) + los compartidos
+-- globales del rango.
+-- Lo mantienen triggers sobre las tablas fuente, asi que cualquier camino de escritura
+-- (endpoints, fn_register_user y demas funciones SQL, updates masivos) lo actualiza.
+-- Inscripciones: un trigger por sentencia rehace el overlay solo de los usuarios tocados,
+-- y el cupo ocupado del evento se recuenta una vez por transaccion en un trigger diferido
+-- al COMMIT. Asi la fila compartida del evento se bloquea recien al final de la
+-- transaccion, despues de cualquier lock de cancha (fn_register_user, fn_cancel_registration
+-- + fn_promote_waitlist, move, bulk), y no hay deadlock entre esos caminos.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.calendar_items (
+  item_type TEXT NOT NULL,
+  source_id UUID NOT NULL,
+  title TEXT NOT NULL,
+  subtitle TEXT NOT NULL DEFAULT '',
+  starts_at TIMESTAMPTZ NOT NULL,
+  ends_at TIMESTAMPTZ,
+  location_name TEXT,
+  raw_status TEXT,
+  visibility TEXT,
+  is_global BOOLEAN NOT NULL DEFAULT false,
+  tournament_id UUID,
+  tournament_name TEXT,
+  description TEXT,
+  action_url TEXT,
+  action_label TEXT,
+  capacity_total INT NOT NULL DEFAULT 0,
+  occupied_total INT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (item_type, source_id),
+  CONSTRAINT chk_calendar_items_type
+    CHECK (item_type IN ('event', 'tournament_match', 'announcement'))
+);
+
+-- Lo que ven todos: eventos GLOBAL y anuncios.
+CREATE INDEX IF NOT EXISTS idx_calendar_items_global_starts_at
+  ON public.calendar_items (starts_at)
+  WHERE is_global;
+
+CREATE INDEX IF NOT EXISTS idx_calendar_items_tournament
+  ON public.calendar_items (tournament_id)
+  WHERE tournament_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS public.calendar_user_items (
+  user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+  item_type TEXT NOT NULL,
+  source_id UUID NOT NULL,
+  starts_at TIMESTAMPTZ NOT NULL,
+  registration_id UUID,
+  registration_status TEXT,
+  court_id UUID,
+  court_name TEXT,
+  tournament_id UUID,
+  team_id UUID,
+  team_name TEXT,
+  PRIMARY KEY (user_id, item_type, source_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_user_items_user_starts_at
+  ON public.calendar_user_items (user_id, starts_at);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_user_items_source
+  ON public.calendar_user_items (item_type, source_id);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_user_items_tournament
+  ON public.calendar_user_items (tournament_id)
+  WHERE tournament_id IS NOT NULL;
+
+-- Badge "Capitan": se busca por usuario en cada apertura del calendario.
+CREATE INDEX IF NOT EXISTS idx_event_court_captains_user
+  ON public.event_court_captains (user_id, event_id);
+
+-- ============================================================
+-- 1) Refresh por evento
+-- ============================================================
+-- Rehace la fila compartida (datos del evento, cupo total y ocupado) y el overlay de
+-- todos los inscriptos. Lo usan los cambios del evento y de sus canchas.
+CREATE OR REPLACE FUNCTION public.calendar_refresh_event(p_event_id UUID)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM public.events WHERE id = p_event_id) THEN
+    DELETE FROM public.calendar_items WHERE item_type = 'event' AND source_id = p_event_id;
+    DELETE FROM public.calendar_user_items WHERE item_type = 'event' AND source_id = p_event_id;
+    RETURN;
+  END IF;
+
+  -- Lock antes de contar: el recuento diferido de otra transaccion espera aca, y el
+  -- conteo de abajo corre con un snapshot nuevo, tomado despues del lock.
+  PERFORM 1 FROM public.calendar_items
+  WHERE item_type = 'event' AND source_id = p_event_id
+  FOR UPDATE;
+
+  INSERT INTO public.calendar_items AS ci (
+    item_type, source_id, title, subtitle, starts_at, ends_at, location_name, raw_status,
+    visibility, is_global, description, capacity_total, occupied_total, updated_at
+  )
+  SELECT 'event', e.id, e.title, '', e.starts_at, NULL, e.location_name, e.status,
+         e.visibility, e.visibility = 'GLOBAL', e.description,
+         COALESCE((
+           SELECT SUM(c.capacity) FROM public.event_courts c
+           WHERE c.event_id = e.id AND c.is_open = true
+         ), 0),
+         (
+           SELECT COUNT(*) FROM public.event_registrations r
+           WHERE r.event_id = e.id AND r.status = 'CONFIRMED' AND r.court_id IS NOT NULL
+         ),
+         now()
+  FROM public.events e
+  WHERE e.id = p_event_id
+  ON CONFLICT (item_type, source_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      starts_at = EXCLUDED.starts_at,
+      location_name = EXCLUDED.location_name,
+      raw_status = EXCLUDED.raw_status,
+      visibility = EXCLUDED.visibility,
+      is_global = EXCLUDED.is_global,
+      description = EXCLUDED.description,
+      capacity_total = EXCLUDED.capacity_total,
+      occupied_total = EXCLUDED.occupied_total,
+      updated_at = EXCLUDED.updated_at;
+
+  PERFORM public.calendar_refresh_event_users(p_event_id, NULL);
+END;
+$$;
+
+-- Overlay del evento: p_user_ids NULL = todos los inscriptos; con ids = solo esos
+-- usuarios (cambio de inscripciones). No toca la fila compartida.
+CREATE OR REPLACE FUNCTION public.calendar_refresh_event_users(p_event_id UUID, p_user_ids UUID[])
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  DELETE FROM public.calendar_user_items cu
+  WHERE cu.item_type = 'event'
+    AND cu.source_id = p_event_id
+    AND (p_user_ids IS NULL OR cu.user_id = ANY(p_user_ids));
+
+  INSERT INTO public.calendar_user_items (
+    user_id, item_type, source_id, starts_at, registration_id, registration_status, court_id, court_name
+  )
+  SELECT DISTINCT ON (r.user_id)
+         r.user_id, 'event', e.id, e.starts_at, r.id, r.status, c.id, c.name
+  FROM public.event_registrations r
+  JOIN public.events e ON e.id = r.event_id
+  LEFT JOIN public.event_courts c ON c.id = r.court_id
+  WHERE r.event_id = p_event_id
+    AND r.registration_type = 'USER'
+    AND r.user_id IS NOT NULL
+    AND r.status IN ('CONFIRMED', 'WAITLIST')
+    AND (p_user_ids IS NULL OR r.user_id = ANY(p_user_ids))
+  ORDER BY r.user_id, r.created_at DESC;
+END;
+$$;
+
+-- ============================================================
+-- 2) Refresh por torneo (pocos partidos y miembros: se rehace entero)
+-- ============================================================
+-- Mismos criterios que tenia el UNION: torneo LIVE/FINISHED, ambos equipos definidos
+-- y alguna fecha (COALESCE(m.started_at, t.starts_at)).
+CREATE OR REPLACE FUNCTION public.calendar_refresh_tournament(p_tournament_id UUID)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  DELETE FROM public.calendar_items
+  WHERE item_type = 'tournament_match' AND tournament_id = p_tournament_id;
+  DELETE FROM public.calendar_user_items
+  WHERE item_type = 'tournament_match' AND tournament_id = p_tournament_id;
+
+  INSERT INTO public.calendar_items (
+    item_type, source_id, title, subtitle, starts_at, ends_at, location_name, raw_status,
+    tournament_id, tournament_name
+  )
+  SELECT 'tournament_match', m.id,
+         CONCAT(COALESCE(ht.name, '?'), ' vs ', COALESCE(at.name, '?')),
+         t.title, COALESCE(m.started_at, t.starts_at), m.ended_at, t.location_name, m.status,
+         t.id, t.title
+  FROM public.tournament_matches m
+  JOIN public.tournaments t ON t.id = m.tournament_id
+  LEFT JOIN public.tournament_teams ht ON ht.id = m.home_team_id
+  LEFT JOIN public.tournament_teams at ON at.id = m.away_team_id
+  WHERE m.tournament_id = p_tournament_id
+    AND t.status IN ('LIVE', 'FINISHED')
+    AND m.home_team_id IS NOT NULL
+    AND m.away_team_id IS NOT NULL
+    AND COALESCE(m.started_at, t.starts_at) IS NOT NULL;
+
+  -- Si el usuario esta en los dos equipos (no deberia), gana el local, como antes.
+  INSERT INTO public.calendar_user_items (
+    user_id, item_type, source_id, starts_at, tournament_id, team_id, team_name
+  )
+  SELECT DISTINCT ON (tm.user_id, ci.source_id)
+         tm.user_id, 'tournament_match', ci.source_id, ci.starts_at, ci.tournament_id, tt.id, tt.name
+  FROM public.calendar_items ci
+  JOIN public.tournament_matches m ON m.id = ci.source_id
+  JOIN public.tournament_team_members tm
+    ON tm.team_id IN (m.home_team_id, m.away_team_id)
+   AND tm.member_type = 'USER'
+   AND tm.user_id IS NOT NULL
+  JOIN public.tournament_teams tt ON tt.id = tm.team_id
+  WHERE ci.item_type = 'tournament_match'
+    AND ci.tournament_id = p_tournament_id
+  ORDER BY tm.user_id, ci.source_id, (tm.team_id = m.home_team_id) DESC;
+END;
+$$;
+
+-- ============================================================
+-- 3) Triggers
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.calendar_events_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM public.calendar_refresh_event(OLD.id);
+  ELSE
+    PERFORM public.calendar_refresh_event(NEW.id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_events_calendar ON public.events;
+CREATE TRIGGER trg_events_calendar
+  AFTER INSERT OR UPDATE OR DELETE ON public.events
+  FOR EACH ROW
+  EXECUTE FUNCTION public.calendar_events_changed();
+
+-- Canchas: cambian cupo (capacity, is_open) y el nombre que muestra el overlay.
+CREATE OR REPLACE FUNCTION public.calendar_event_courts_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM public.calendar_refresh_event(OLD.event_id);
+  ELSE
+    PERFORM public.calendar_refresh_event(NEW.event_id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_event_courts_calendar ON public.event_courts;
+CREATE TRIGGER trg_event_courts_calendar
+  AFTER INSERT OR UPDATE OR DELETE ON public.event_courts
+  FOR EACH ROW
+  EXECUTE FUNCTION public.calendar_event_courts_changed();
+
+-- Inscripciones: overlay de los usuarios tocados, una vez por evento y sentencia.
+-- Postgres no permite tablas de transicion en triggers de varios eventos, por eso son
+-- tres triggers que comparten la funcion.
+CREATE OR REPLACE FUNCTION public.calendar_registrations_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  rec RECORD;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    FOR rec IN
+      SELECT event_id, array_agg(DISTINCT user_id) FILTER (WHERE user_id IS NOT NULL) AS user_ids
+      FROM new_rows GROUP BY event_id ORDER BY event_id
+    LOOP
+      PERFORM public.calendar_refresh_event_users(rec.event_id, COALESCE(rec.user_ids, '{}'));
+    END LOOP;
+  ELSIF TG_OP = 'UPDATE' THEN
+    FOR rec IN
+      SELECT event_id, array_agg(DISTINCT user_id) FILTER (WHERE user_id IS NOT NULL) AS user_ids
+      FROM (
+        SELECT event_id, user_id FROM new_rows
+        UNION ALL
+        SELECT event_id, user_id FROM old_rows
+      ) touched
+      GROUP BY event_id ORDER BY event_id
+    LOOP
+      PERFORM public.calendar_refresh_event_users(rec.event_id, COALESCE(rec.user_ids, '{}'));
+    END LOOP;
+  ELSE
+    FOR rec IN
+      SELECT event_id, array_agg(DISTINCT user_id) FILTER (WHERE user_id IS NOT NULL) AS user_ids
+      FROM old_rows GROUP BY event_id ORDER BY event_id
+    LOOP
+      PERFORM public.calendar_refresh_event_users(rec.event_id, COALESCE(rec.user_ids, '{}'));
+    END LOOP;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_event_registrations_calendar_ins ON public.event_registrations;
+CREATE TRIGGER trg_event_registrations_calendar_ins
+  AFTER INSERT ON public.event_registrations
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.calendar_registrations_changed();
+
+DROP TRIGGER IF EXISTS trg_event_registrations_calendar_upd ON public.event_registrations;
+CREATE TRIGGER trg_event_registrations_calendar_upd
+  AFTER UPDATE ON public.event_registrations
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.calendar_registrations_changed();
+
+DROP TRIGGER IF EXISTS trg_event_registrations_calendar_del ON public.event_registrations;
+CREATE TRIGGER trg_event_registrations_calendar_del
+  AFTER DELETE ON public.event_registrations
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.calendar_registrations_changed();
+
+-- Cupo ocupado: trigger por fila diferido al COMMIT (constraint trigger) que recuenta el
+-- evento en vez de sumar +1/-1. Un delta se sumaba encima de un calendar_refresh_event
+-- de la misma transaccion (fn_auto_close_court cierra la cancha despues del INSERT) y
+-- contaba dos veces la inscripcion. Cada evento se recuenta una sola vez por
+-- transaccion: los ids ya recontados quedan en una variable local a la transaccion.
+CREATE OR REPLACE FUNCTION public.calendar_registration_counts_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  old_event UUID;
+  new_event UUID;
+  ev UUID;
+  recounted TEXT;
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'CONFIRMED' AND OLD.court_id IS NOT NULL THEN
+    old_event := OLD.event_id;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'CONFIRMED' AND NEW.court_id IS NOT NULL THEN
+    new_event := NEW.event_id;
+  END IF;
+
+  IF old_event IS NOT DISTINCT FROM new_event THEN
+    RETURN NULL;
+  END IF;
+
+  FOREACH ev IN ARRAY ARRAY_REMOVE(ARRAY[old_event, new_event], NULL) LOOP
+    recounted := COALESCE(current_setting('futbol.calendar_recounted', true), '');
+    CONTINUE WHEN position(ev::text IN recounted) > 0;
+    PERFORM set_config('futbol.calendar_recounted', recounted || ev::text || ',', true);
+
+    -- Lock antes de contar, igual que calendar_refresh_event: el conteo corre con un
+    -- snapshot nuevo e incluye lo que commiteo la transaccion que tenia el lock.
+    PERFORM 1 FROM public.calendar_items
+    WHERE item_type = 'event' AND source_id = ev
+    FOR UPDATE;
+
+    UPDATE public.calendar_items
+    SET occupied_total = (
+          SELECT COUNT(*) FROM public.event_registrations r
+          WHERE r.event_id = ev AND r.status = 'CONFIRMED' AND r.court_id IS NOT NULL
+        ),
+        updated_at = now()
+    WHERE item_type = 'event' AND source_id = ev;
+  END LOOP;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_event_registrations_calendar_counts ON public.event_registrations;
+CREATE CONSTRAINT TRIGGER trg_event_registrations_calendar_counts
+  AFTER INSERT OR UPDATE OR DELETE ON public.event_registrations
+  DEFERRABLE INITIALLY DEFERRED
+  FOR EACH ROW
+  EXECUTE FUNCTION public.calendar_registration_counts_changed();
+
+-- Torneos: equipos, miembros y partidos refrescan su torneo entero (una vez por
+-- sentencia). En partidos, los updates que solo tocan el marcador no cambian nada.
+CREATE OR REPLACE FUNCTION public.calendar_tournament_rows_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  t_id UUID;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    FOR t_id IN SELECT DISTINCT tournament_id FROM new_rows ORDER BY 1 LOOP
+      PERFORM public.calendar_refresh_tournament(t_id);
+    END LOOP;
+  ELSIF TG_OP = 'DELETE' THEN
+    FOR t_id IN SELECT DISTINCT tournament_id FROM old_rows ORDER BY 1 LOOP
+      PERFORM public.calendar_refresh_tournament(t_id);
+    END LOOP;
+  ELSIF TG_TABLE_NAME = 'tournament_matches' THEN
+    FOR t_id IN
+      SELECT DISTINCT t FROM (
+        SELECT unnest(ARRAY[n.tournament_id, o.tournament_id]) AS t
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE (n.tournament_id, n.home_team_id, n.away_team_id, n.status, n.started_at, n.ended_at)
+              IS DISTINCT FROM
+              (o.tournament_id, o.home_team_id, o.away_team_id, o.status, o.started_at, o.ended_at)
+      ) changed
+      ORDER BY 1
+    LOOP
+      PERFORM public.calendar_refresh_tournament(t_id);
+    END LOOP;
+  ELSE
+    FOR t_id IN
+      SELECT tournament_id FROM new_rows
+      UNION
+      SELECT tournament_id FROM old_rows
+      ORDER BY 1
+    LOOP
+      PERFORM public.calendar_refresh_tournament(t_id);
+    END LOOP;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- El torneo en si (titulo, sede, fecha, estado): trigger por fila, son pocos.
+CREATE OR REPLACE FUNCTION public.calendar_tournaments_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM public.calendar_refresh_tournament(OLD.id);
+  ELSE
+    PERFORM public.calendar_refresh_tournament(NEW.id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_tournaments_calendar ON public.tournaments;
+CREATE TRIGGER trg_tournaments_calendar
+  AFTER INSERT OR UPDATE OR DELETE ON public.tournaments
+  FOR EACH ROW
+  EXECUTE FUNCTION public.calendar_tournaments_changed();
+
+DO $$
+DECLARE
+  tbl TEXT;
+BEGIN
+  FOREACH tbl IN ARRAY ARRAY['tournament_teams', 'tournament_team_members', 'tournament_matches']
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_calendar_ins ON public.%I', tbl, tbl);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_calendar_upd ON public.%I', tbl, tbl);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_calendar_del ON public.%I', tbl, tbl);
+    EXECUTE format(
+      'CREATE TRIGGER trg_%s_calendar_ins AFTER INSERT ON public.%I '
+      'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT '
+      'EXECUTE FUNCTION public.calendar_tournament_rows_changed()', tbl, tbl);
+    EXECUTE format(
+      'CREATE TRIGGER trg_%s_calendar_upd AFTER UPDATE ON public.%I '
+      'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT '
+      'EXECUTE FUNCTION public.calendar_tournament_rows_changed()', tbl, tbl);
+    EXECUTE format(
+      'CREATE TRIGGER trg_%s_calendar_del AFTER DELETE ON public.%I '
+      'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT '
+      'EXECUTE FUNCTION public.calendar_tournament_rows_changed()', tbl, tbl);
+  END LOOP;
+END $$;
+
+-- Anuncios: son globales, no tienen overlay.
+CREATE OR REPLACE FUNCTION public.calendar_announcements_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM public.calendar_items WHERE item_type = 'announcement' AND source_id = OLD.id;
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public.calendar_items AS ci (
+    item_type, source_id, title, subtitle, starts_at, ends_at, location_name, is_global,
+    description, action_url, action_label, updated_at
+  )
+  VALUES (
+    'announcement', NEW.id, NEW.title, '', NEW.starts_at, NEW.ends_at, NEW.location_name, true,
+    NEW.description, NEW.action_url, NEW.action_label, now()
+  )
+  ON CONFLICT (item_type, source_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      starts_at = EXCLUDED.starts_at,
+      ends_at = EXCLUDED.ends_at,
+      location_name = EXCLUDED.location_name,
+      description = EXCLUDED.description,
+      action_url = EXCLUDED.action_url,
+      action_label = EXCLUDED.action_label,
+      updated_at = EXCLUDED.updated_at;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_calendar_announcements_calendar ON public.calendar_announcements;
+CREATE TRIGGER trg_calendar_announcements_calendar
+  AFTER INSERT OR UPDATE OR DELETE ON public.calendar_announcements
+  FOR EACH ROW
+  EXECUTE FUNCTION public.calendar_announcements_changed();
+
+-- ============================================================
+-- 4) Backfill
+-- ============================================================
+SELECT public.calendar_refresh_event(id) FROM public.events;
+SELECT public.calendar_refresh_tournament(id) FROM public.tournaments;
+
+INSERT INTO public.calendar_items (
+  item_type, source_id, title, subtitle, starts_at, ends_at, location_name, is_global,
+  description, action_url, action_label
+)
+SELECT 'announcement', a.id, a.title, '', a.starts_at, a.ends_at, a.location_name, true,
+       a.description, a.action_url, a.action_label
+FROM public.calendar_announcements a
+ON CONFLICT (item_type, source_id) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,28 @@
+-- 026_calendar_feed.sql
+-- Feed ICS de Mi Calendario (GET /me/calendar.ics?token=...).
+--   calendar_feed_tokens: un token por usuario para la URL de suscripcion (las apps de
+--     calendario no mandan headers). Se guarda solo el sha256; rotarlo invalida la URL vieja.
+--   calendar_user_items.updated_at: junto con calendar_items.updated_at arma el
+--     ETag/Last-Modified del feed (las funciones de refresh de 025 reinsertan el overlay,
+--     asi que el default alcanza).
+--   calendar_feed_tokens.feed_etag / feed_modified_at: ultimo ETag servido y desde cuando.
+--     Es el Last-Modified del feed; cambia con cualquier cambio del ETag (incluidos items
+--     borrados o que salen de la ventana), que MAX(updated_at) no ve.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.calendar_feed_tokens (
+  user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  token_hash TEXT NOT NULL UNIQUE,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.calendar_feed_tokens
+  ADD COLUMN IF NOT EXISTS feed_etag TEXT,
+  ADD COLUMN IF NOT EXISTS feed_modified_at TIMESTAMPTZ;
+
+ALTER TABLE public.calendar_user_items
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+COMMIT;
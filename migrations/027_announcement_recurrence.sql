@@ -0,0 +1,70 @@
+-- 027_announcement_recurrence.sql
+-- Anuncios que se repiten: la regla (jsonb, ver app/utils/recurrence.py) se guarda en
+-- la misma fila y las ocurrencias se expanden al leer (GET /me/calendar y el feed ICS),
+-- solo dentro de la ventana pedida.
+--   recurrence_ends_at: ultima ocurrencia posible (NULL = sin fin). La calcula la app al
+--     guardar; permite descartar por ventana sin expandir.
+-- Los anuncios recurrentes no van al read model calendar_items (migrations/025): su
+-- starts_at es solo la primera ocurrencia.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+ALTER TABLE public.calendar_announcements
+  ADD COLUMN IF NOT EXISTS recurrence JSONB,
+  ADD COLUMN IF NOT EXISTS recurrence_ends_at TIMESTAMPTZ;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1
+    FROM pg_constraint
+    WHERE conname = 'chk_calendar_announcements_recurrence'
+  ) THEN
+    ALTER TABLE public.calendar_announcements
+      ADD CONSTRAINT chk_calendar_announcements_recurrence
+      CHECK (recurrence IS NULL OR recurrence->>'freq' IN ('DAILY', 'WEEKLY', 'MONTHLY'));
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_calendar_announcements_recurring
+  ON public.calendar_announcements (starts_at, recurrence_ends_at)
+  WHERE recurrence IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION public.calendar_announcements_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM public.calendar_items WHERE item_type = 'announcement' AND source_id = OLD.id;
+    RETURN NULL;
+  END IF;
+
+  IF NEW.recurrence IS NOT NULL THEN
+    DELETE FROM public.calendar_items WHERE item_type = 'announcement' AND source_id = NEW.id;
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public.calendar_items AS ci (
+    item_type, source_id, title, subtitle, starts_at, ends_at, location_name, is_global,
+    description, action_url, action_label, updated_at
+  )
+  VALUES (
+    'announcement', NEW.id, NEW.title, '', NEW.starts_at, NEW.ends_at, NEW.location_name, true,
+    NEW.description, NEW.action_url, NEW.action_label, now()
+  )
+  ON CONFLICT (item_type, source_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      starts_at = EXCLUDED.starts_at,
+      ends_at = EXCLUDED.ends_at,
+      location_name = EXCLUDED.location_name,
+      description = EXCLUDED.description,
+      action_url = EXCLUDED.action_url,
+      action_label = EXCLUDED.action_label,
+      updated_at = EXCLUDED.updated_at;
+  RETURN NULL;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,41 @@
+-- 028_event_templates.sql
+-- Plantillas de evento (POST /admin/event-templates/{id}/instantiate): canchas, cupos,
+-- capitanes, visibilidad y descripcion se cargan una vez y se instancian N eventos en
+-- una sola transaccion.
+--   courts: [{name, capacity, sort_order, is_open, captain_user_ids: [uuid]}]
+--   recurrence: misma regla que los anuncios (app/utils/recurrence.py); se expande solo
+--     en la ventana que se pide al instanciar.
+--   events.template_id + UNIQUE (template_id, starts_at): instanciar dos veces la misma
+--     fecha no duplica eventos (ON CONFLICT DO NOTHING).
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.event_templates (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  name TEXT NOT NULL,
+  title TEXT NOT NULL,
+  description TEXT,
+  location_name TEXT NOT NULL,
+  visibility TEXT NOT NULL DEFAULT 'PRIVATE',
+  starts_at TIMESTAMPTZ,
+  close_offset_minutes INT,
+  recurrence JSONB,
+  courts JSONB NOT NULL DEFAULT '[]'::jsonb,
+  created_by_user_id UUID REFERENCES public.users(id),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  CONSTRAINT uq_event_templates_name UNIQUE (name),
+  CONSTRAINT chk_event_templates_visibility CHECK (visibility IN ('PRIVATE', 'GLOBAL')),
+  CONSTRAINT chk_event_templates_courts CHECK (jsonb_typeof(courts) = 'array'),
+  CONSTRAINT chk_event_templates_recurrence
+    CHECK (recurrence IS NULL OR (starts_at IS NOT NULL AND recurrence->>'freq' IN ('DAILY', 'WEEKLY', 'MONTHLY')))
+);
+
+ALTER TABLE public.events
+  ADD COLUMN IF NOT EXISTS template_id UUID REFERENCES public.event_templates(id) ON DELETE SET NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_events_template_starts_at
+  ON public.events (template_id, starts_at);
+
+COMMIT;
@@ -0,0 +1,86 @@
+-- 029_player_rating_versions.sql
+-- Cache de player cards (app/utils/player_card_cache.py):
+--   player_rating_versions: version por jugador; sube en cada sentencia que toca sus
+--     votos (save_ratings, ocultar/mostrar un voto a mano, borrar). La app cachea
+--     score, atributos y radar por (user_id, version) y solo re-agrega si cambio.
+-- Se mantiene con triggers por sentencia (tablas de transicion), asi tambien cubre los
+-- cambios hechos desde la consola. Solo se tocan las filas de los jugadores votados: dos
+-- save_ratings de canchas distintas no se esperan entre si.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.player_rating_versions (
+  user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Postgres no permite tablas de transicion en triggers de varios eventos, por eso son
+-- tres triggers que comparten la funcion (igual que calendar_registrations_changed).
+-- En UPDATE solo cuentan las filas que cambian algo del score (no el comentario).
+CREATE OR REPLACE FUNCTION public.player_ratings_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  touched UUID[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(DISTINCT target_user_id) INTO touched FROM new_rows;
+  ELSIF TG_OP = 'DELETE' THEN
+    SELECT array_agg(DISTINCT target_user_id) INTO touched FROM old_rows;
+  ELSE
+    SELECT array_agg(DISTINCT t.user_id)
+    INTO touched
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    CROSS JOIN LATERAL unnest(ARRAY[n.target_user_id, o.target_user_id]) AS t(user_id)
+    WHERE (n.target_user_id, n.rating, n.attributes, n.is_hidden, n.created_at)
+          IS DISTINCT FROM
+          (o.target_user_id, o.rating, o.attributes, o.is_hidden, o.created_at);
+  END IF;
+
+  IF touched IS NOT NULL THEN
+    -- Orden fijo por user_id: dos sentencias concurrentes bloquean en el mismo orden.
+    INSERT INTO public.player_rating_versions AS v (user_id, version, updated_at)
+    SELECT u, 1, now()
+    FROM unnest(touched) AS u
+    ORDER BY u
+    ON CONFLICT (user_id) DO UPDATE
+    SET version = v.version + 1,
+        updated_at = EXCLUDED.updated_at;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_player_ratings_versions_ins ON public.player_ratings;
+CREATE TRIGGER trg_player_ratings_versions_ins
+  AFTER INSERT ON public.player_ratings
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.player_ratings_changed();
+
+DROP TRIGGER IF EXISTS trg_player_ratings_versions_upd ON public.player_ratings;
+CREATE TRIGGER trg_player_ratings_versions_upd
+  AFTER UPDATE ON public.player_ratings
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.player_ratings_changed();
+
+DROP TRIGGER IF EXISTS trg_player_ratings_versions_del ON public.player_ratings;
+CREATE TRIGGER trg_player_ratings_versions_del
+  AFTER DELETE ON public.player_ratings
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.player_ratings_changed();
+
+-- Backfill (los triggers ya estan creados: lo que se escriba desde aca ya sube la version).
+INSERT INTO public.player_rating_versions (user_id, version, updated_at)
+SELECT DISTINCT target_user_id, 1, now()
+FROM public.player_ratings
+ON CONFLICT (user_id) DO NOTHING;
+
+COMMIT;
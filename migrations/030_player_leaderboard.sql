@@ -0,0 +1,42 @@
+-- 030_player_leaderboard.sql
+-- Leaderboard precalculado (M6, docs/modernizacion-sistema-puntajes.md) para
+-- GET /rankings y GET /rankings/me. Lo rellena app/jobs/leaderboard.py (scheduler,
+-- cada 10 min) en una sola transaccion; las lecturas no calculan scores.
+--   player_leaderboard: jugadores con ranking_opt_in y >= MIN_DISTINCT_VOTERS votantes,
+--     con score bayesiano, puesto general y tier (TOP_10, TOP_25, ...).
+--   player_leaderboard_attributes: puesto por atributo ("mejores en DEFENSA"), por
+--     fraccion de votos que marcaron el atributo.
+-- Paginacion keyset sobre el puesto (UNIQUE); "mi posicion" es una lectura por PK.
+-- Correr a mano en la consola Postgres de Railway, igual que las migraciones previas.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.player_leaderboard (
+  user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  overall_rank INT NOT NULL,
+  players_total INT NOT NULL,
+  score NUMERIC(4,2) NOT NULL,
+  votes INT NOT NULL,
+  voters INT NOT NULL,
+  percentile NUMERIC(5,4) NOT NULL,
+  tier TEXT NOT NULL,
+  refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  CONSTRAINT uq_player_leaderboard_rank UNIQUE (overall_rank)
+);
+
+CREATE TABLE IF NOT EXISTS public.player_leaderboard_attributes (
+  attribute TEXT NOT NULL,
+  user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+  attribute_rank INT NOT NULL,
+  attribute_total INT NOT NULL,
+  count INT NOT NULL,
+  share NUMERIC(4,3) NOT NULL,
+  PRIMARY KEY (attribute, user_id),
+  CONSTRAINT uq_player_leaderboard_attributes_rank UNIQUE (attribute, attribute_rank)
+);
+
+-- "Mi posicion" en todos los atributos de una.
+CREATE INDEX IF NOT EXISTS idx_player_leaderboard_attributes_user
+  ON public.player_leaderboard_attributes (user_id);
+
+COMMIT;
@@ -0,0 +1,40 @@
+"""ensure_audit_log_partitions: filas que cayeron en la DEFAULT pasan a la particion del mes."""
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.jobs.audit_partitions import ensure_audit_partitions
+
+
+def _month_ahead(months: int) -> datetime:
+    now = datetime.now(timezone.utc)
+    idx = now.year * 12 + (now.month - 1) + months
+    return datetime(idx // 12, idx % 12 + 1, 15, 12, tzinfo=timezone.utc)
+
+
+def test_rows_in_default_move_to_the_new_partition(engine):
+    created_at = _month_ahead(6)
+    partition = f"event_audit_log_y{created_at:%Y}m{created_at:%m}"
+
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS public."{partition}"'))
+        row_id = conn.execute(text("""
+            INSERT INTO public.event_audit_log (action, metadata, created_at)
+            VALUES ('TEST_AUDIT_PARTITION', '{}'::jsonb, :created_at)
+            RETURNING id
+        """), {"created_at": created_at}).scalar_one()
+
+    assert ensure_audit_partitions(months_ahead=6) >= 1
+
+    with engine.connect() as conn:
+        located = conn.execute(text("""
+            SELECT tableoid::regclass::text
+            FROM public.event_audit_log
+            WHERE id = :id
+        """), {"id": row_id}).scalar_one()
+        in_default = conn.execute(text("""
+            SELECT COUNT(*) FROM public.event_audit_log_default WHERE id = :id
+        """), {"id": row_id}).scalar_one()
+
+    assert located == partition
+    assert in_default == 0
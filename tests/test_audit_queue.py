@@ -0,0 +1,53 @@
+"""AuditQueue: un lote con una fila mala no descarta las buenas; despues del drain no se relanza."""
+import uuid
+
+from sqlalchemy import text
+
+from app.utils.audit import AuditQueue
+
+
+def _row(marker: str, event_id: str | None = None) -> dict:
+    return {
+        "event_id": event_id,
+        "actor_user_id": None,
+        "action": "TEST_AUDIT_QUEUE",
+        "metadata": {"marker": marker},
+    }
+
+
+def _written(engine, marker: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT COUNT(*) FROM public.event_audit_log
+            WHERE action = 'TEST_AUDIT_QUEUE' AND metadata->>'marker' = :marker
+        """), {"marker": marker}).scalar_one()
+
+
+def test_failed_batch_retries_row_by_row(engine):
+    marker = str(uuid.uuid4())
+    queue = AuditQueue()
+    # event_id inexistente: viola la FK y hace fallar el INSERT del lote entero.
+    batch = [_row(marker), _row(marker, event_id=str(uuid.uuid4())), _row(marker)]
+
+    queue._flush(batch)
+
+    assert _written(engine, marker) == 2
+    metrics = queue.metrics()
+    assert metrics["flushed"] == 2
+    assert metrics["dropped"] == 1
+    assert metrics["failed_flushes"] == 1
+
+
+def test_enqueue_after_drain_does_not_restart_the_thread(engine):
+    marker = str(uuid.uuid4())
+    queue = AuditQueue()
+    queue.start()
+    queue.enqueue(_row(marker))
+    queue.drain()
+    assert not queue.metrics()["running"]
+
+    queue.enqueue(_row(marker))
+
+    assert not queue.metrics()["running"]
+    assert _written(engine, marker) == 2
+    assert queue.metrics()["depth"] == 0
@@ -0,0 +1,142 @@
+"""POST /events/{event_id}/registrations/bulk: swap, cancel con promocion y atomicidad."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+from app.utils.db import lock_conflicts_as_409
+
+
+def _bulk(client, headers, event_id, operations):
+    return client.post(
+        f"/events/{event_id}/registrations/bulk",
+        json={"operations": operations},
+        headers=headers,
+    )
+
+
+def test_swap_exchanges_courts(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court_a, court_b) = db.event(courts=[2, 2])
+    reg_a = db.registration(event_id, db.user(), court_a)
+    reg_b = db.registration(event_id, db.user(), court_b)
+
+    res = _bulk(client, auth_headers(admin), event_id, [
+        {"op": "swap", "registration_id": reg_a, "other_registration_id": reg_b},
+    ])
+
+    assert res.status_code == 200, res.text
+    assert res.json()["promoted_registration_ids"] == []
+    regs = db.registrations(event_id)
+    assert regs[reg_a] == {"status": "CONFIRMED", "court_id": court_b}
+    assert regs[reg_b] == {"status": "CONFIRMED", "court_id": court_a}
+
+
+def test_swap_on_full_courts_does_not_need_free_slots(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court_a, court_b) = db.event(courts=[1, 1])
+    reg_a = db.registration(event_id, db.user(), court_a)
+    reg_b = db.registration(event_id, db.user(), court_b)
+
+    res = _bulk(client, auth_headers(admin), event_id, [
+        {"op": "swap", "registration_id": reg_a, "other_registration_id": reg_b},
+    ])
+
+    assert res.status_code == 200, res.text
+    regs = db.registrations(event_id)
+    assert regs[reg_a]["court_id"] == court_b
+    assert regs[reg_b]["court_id"] == court_a
+
+
+def test_cancel_promotes_waitlist_fifo(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court,) = db.event(courts=[1])
+    confirmed = db.registration(event_id, db.user(), court)
+    t0 = datetime.now(timezone.utc) - timedelta(hours=1)
+    # La segunda se crea antes en el tiempo: tiene que ser la promovida.
+    later = db.registration(event_id, db.user(), None, status="WAITLIST", created_at=t0 + timedelta(minutes=5))
+    first = db.registration(event_id, db.user(), None, status="WAITLIST", created_at=t0)
+
+    res = _bulk(client, auth_headers(admin), event_id, [
+        {"op": "cancel", "registration_id": confirmed},
+    ])
+
+    assert res.status_code == 200, res.text
+    assert res.json()["promoted_registration_ids"] == [first]
+    regs = db.registrations(event_id)
+    assert regs[confirmed]["status"] == "CANCELLED"
+    assert regs[first] == {"status": "CONFIRMED", "court_id": court}
+    assert regs[later] == {"status": "WAITLIST", "court_id": None}
+
+
+def test_swap_then_cancel_promotes_into_the_swapped_court(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court_a, court_b) = db.event(courts=[1, 1])
+    reg_a = db.registration(event_id, db.user(), court_a)
+    reg_b = db.registration(event_id, db.user(), court_b)
+    waiting = db.registration(event_id, db.user(), None, status="WAITLIST")
+
+    # Cada operacion ve el resultado de las anteriores: reg_a ya esta en court_b.
+    res = _bulk(client, auth_headers(admin), event_id, [
+        {"op": "swap", "registration_id": reg_a, "other_registration_id": reg_b},
+        {"op": "cancel", "registration_id": reg_a},
+    ])
+
+    assert res.status_code == 200, res.text
+    assert res.json()["promoted_registration_ids"] == [waiting]
+    regs = db.registrations(event_id)
+    assert regs[reg_a]["status"] == "CANCELLED"
+    assert regs[reg_b] == {"status": "CONFIRMED", "court_id": court_a}
+    assert regs[waiting] == {"status": "CONFIRMED", "court_id": court_b}
+
+
+def test_failing_operation_applies_nothing(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court_a, court_b) = db.event(courts=[2, 2])
+    reg_a = db.registration(event_id, db.user(), court_a)
+    reg_b = db.registration(event_id, db.user(), court_b)
+    before = db.registrations(event_id)
+
+    res = _bulk(client, auth_headers(admin), event_id, [
+        {"op": "swap", "registration_id": reg_a, "other_registration_id": reg_b},
+        {"op": "cancel", "registration_id": reg_a},
+        {"op": "cancel", "registration_id": reg_a},
+    ])
+
+    assert res.status_code == 400
+    assert res.json()["detail"].startswith("Operación 3:")
+    assert db.registrations(event_id) == before
+
+
+def test_player_without_permission_is_rejected(client, db, auth_headers):
+    event_id, (court_a, court_b) = db.event(courts=[2, 2])
+    player = db.user()
+    reg_a = db.registration(event_id, player, court_a)
+    reg_b = db.registration(event_id, db.user(), court_b)
+
+    res = _bulk(client, auth_headers(player), event_id, [
+        {"op": "swap", "registration_id": reg_a, "other_registration_id": reg_b},
+    ])
+
+    assert res.status_code == 403
+
+
+class _PgError(Exception):
+    def __init__(self, sqlstate):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+@pytest.mark.parametrize("sqlstate", ["40P01", "40001"])
+def test_lock_conflicts_map_to_409(sqlstate):
+    with pytest.raises(HTTPException) as exc_info:
+        with lock_conflicts_as_409():
+            raise OperationalError("update ...", {}, _PgError(sqlstate))
+    assert exc_info.value.status_code == 409
+
+
+def test_other_operational_errors_propagate():
+    with pytest.raises(OperationalError):
+        with lock_conflicts_as_409():
+            raise OperationalError("select 1", {}, _PgError("08006"))
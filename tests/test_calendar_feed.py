@@ -0,0 +1,49 @@
+"""GET /me/calendar.ics: 304 con If-None-Match / If-Modified-Since, y 200 si se borra un item."""
+from sqlalchemy import text
+
+
+def _feed(client, token, **headers):
+    return client.get("/me/calendar.ics", params={"token": token}, headers=headers)
+
+
+def _subscribed_player(client, db, auth_headers):
+    player = db.user()
+    token = client.post("/me/calendar/feed-token", headers=auth_headers(player)).json()["token"]
+    return player, token
+
+
+def test_unchanged_feed_answers_304(client, db, auth_headers):
+    player, token = _subscribed_player(client, db, auth_headers)
+    event_id, (court_id,) = db.event(courts=[10])
+    db.registration(event_id, player, court_id)
+
+    first = _feed(client, token)
+    assert first.status_code == 200
+    assert first.headers["Last-Modified"]
+
+    assert _feed(client, token, **{"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert _feed(client, token, **{"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+
+
+def test_deleted_item_is_not_hidden_by_if_modified_since(client, db, auth_headers, engine):
+    player, token = _subscribed_player(client, db, auth_headers)
+    old_event, (old_court,) = db.event(courts=[10])
+    old_registration = db.registration(old_event, player, old_court)
+    new_event, (new_court,) = db.event(courts=[10])
+    db.registration(new_event, player, new_court)
+
+    first = _feed(client, token)
+    assert first.status_code == 200
+    assert old_event in first.text
+
+    # El item que se va no es el mas nuevo: MAX(updated_at) no cambia.
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM public.event_registrations WHERE id = :id"), {"id": old_registration})
+
+    second = _feed(client, token, **{"If-Modified-Since": first.headers["Last-Modified"]})
+    assert second.status_code == 200
+    assert old_event not in second.text
+    assert new_event in second.text
+
+    third = _feed(client, token, **{"If-Modified-Since": second.headers["Last-Modified"]})
+    assert third.status_code == 304
@@ -0,0 +1,24 @@
+"""calendar_items: el cupo ocupado no se cuenta dos veces cuando la inscripcion cierra la cancha."""
+from sqlalchemy import text
+
+
+def _occupied_total(engine, event_id: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT occupied_total FROM public.calendar_items
+            WHERE item_type = 'event' AND source_id = CAST(:event_id AS uuid)
+        """), {"event_id": event_id}).scalar_one()
+
+
+def test_registration_that_fills_the_court_counts_once(client, db, auth_headers, engine):
+    event_id, (court_id, _) = db.event(courts=[2, 2])
+    db.registration(event_id, db.user(), court_id)
+    assert _occupied_total(engine, event_id) == 1
+
+    # Ocupa el ultimo lugar: fn_auto_close_court cierra la cancha en la misma transaccion.
+    player = db.user()
+    res = client.post(f"/events/{event_id}/register", headers=auth_headers(player), json={"court_id": court_id})
+    assert res.status_code == 200, res.text
+    assert res.json()["status"] == "CONFIRMED"
+
+    assert _occupied_total(engine, event_id) == 2
@@ -0,0 +1,23 @@
+"""/health/jobs y /health/audit-queue: solo admin, y sin el texto de las excepciones."""
+from app.jobs.scheduler import Job, Scheduler
+
+
+def test_health_metrics_require_admin(client, db, auth_headers):
+    player, admin = db.user(), db.user(role="admin")
+
+    for path in ("/health/jobs", "/health/audit-queue"):
+        assert client.get(path, headers=auth_headers(player)).status_code == 403
+        assert client.get(path, headers=auth_headers(admin)).status_code == 200
+
+
+def test_job_failure_exposes_only_the_exception_class():
+    def fails():
+        raise RuntimeError("SELECT * FROM public.users WHERE phone_e164 = '+5491100000000'")
+
+    job = Job("fails", 60, fails)
+    job._running.acquire()
+    Scheduler()._run(job)
+
+    metrics = job.metrics()
+    assert metrics["last_error_type"] == "RuntimeError"
+    assert "phone_e164" not in str(metrics)
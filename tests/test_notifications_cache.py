@@ -0,0 +1,103 @@
+"""GET /notifications: el cache de la campanita se invalida despues del commit."""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.utils import notification_cache as cache_module
+from app.utils.notification_cache import notification_cache
+
+
+def _bell_titles(client, headers):
+    res = client.get("/notifications", headers=headers)
+    assert res.status_code == 200, res.text
+    return [item["message"] for item in res.json()["items"]]
+
+
+def test_global_event_shows_up_after_create(client, db, auth_headers):
+    admin = db.user(role="admin")
+    player = db.user()
+    headers = auth_headers(player)
+    title = f"Evento global {player[:8]}"
+
+    assert title not in _bell_titles(client, headers)
+
+    res = client.post("/admin/events", headers=auth_headers(admin), json={
+        "title": title,
+        "starts_at": (datetime.now(timezone.utc) + timedelta(days=2)).isoformat(),
+        "location_name": "Cancha de test",
+        "visibility": "GLOBAL",
+    })
+    assert res.status_code == 200, res.text
+
+    assert title in _bell_titles(client, headers)
+
+
+def test_global_event_shows_up_after_template_instantiate(client, db, auth_headers):
+    admin = db.user(role="admin")
+    player = db.user()
+    headers = auth_headers(player)
+    title = f"Plantilla global {player[:8]}"
+
+    res = client.post("/admin/event-templates", headers=auth_headers(admin), json={
+        "name": title,
+        "title": title,
+        "location_name": "Cancha de test",
+        "visibility": "GLOBAL",
+        "courts": [{"name": "Cancha 1", "capacity": 10}],
+    })
+    assert res.status_code == 200, res.text
+    template_id = res.json()["id"]
+
+    assert title not in _bell_titles(client, headers)
+
+    res = client.post(f"/admin/event-templates/{template_id}/instantiate", headers=auth_headers(admin), json={
+        "starts_at": [(datetime.now(timezone.utc) + timedelta(days=2)).isoformat()],
+    })
+    assert res.status_code == 200, res.text
+    assert len(res.json()["created"]) == 1
+
+    assert title in _bell_titles(client, headers)
+
+
+def test_dismissals_from_other_processes_expire(client, db, auth_headers, engine, monkeypatch):
+    player = db.user()
+    headers = auth_headers(player)
+    notification_cache.invalidate_global()
+    with engine.begin() as conn:
+        notification_id = conn.execute(text("""
+            INSERT INTO public.notifications (
+                kind, title, message, starts_at, expires_at, is_active, created_at, updated_at
+            )
+            VALUES ('INFO', 'Aviso', :message, now(), now() + interval '1 day', true, now(), now())
+            RETURNING id
+        """), {"message": f"Aviso {player[:8]}"}).scalar_one()
+    notification_cache.invalidate_global()
+    monkeypatch.setattr(cache_module, "DISMISSED_TTL_SECONDS", 0)
+
+    assert f"Aviso {player[:8]}" in _bell_titles(client, headers)
+
+    # Otro proceso atiende el dismiss: este cache lo ve cuando vence el TTL (aca, ya).
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO public.user_notification_dismissals (user_id, notification_id, dismissed_at)
+            VALUES (:user_id, :notification_id, now())
+        """), {"user_id": player, "notification_id": notification_id})
+
+    assert f"Aviso {player[:8]}" not in _bell_titles(client, headers)
+
+
+def test_inbox_count_refreshes_after_promotion(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court,) = db.event(courts=[1])
+    confirmed = db.registration(event_id, db.user(), court)
+    waiting_user = db.user()
+    db.registration(event_id, waiting_user, None, status="WAITLIST")
+    headers = auth_headers(waiting_user)
+
+    # Deja cacheado el conteo previo (0).
+    assert client.get("/notifications", headers=headers).json()["inbox_unread_count"] == 0
+
+    res = client.post(f"/registrations/{confirmed}/cancel", headers=auth_headers(admin))
+    assert res.status_code == 200, res.text
+
+    assert client.get("/notifications", headers=headers).json()["inbox_unread_count"] == 1
@@ -0,0 +1,68 @@
+"""Cache de player cards: se rehace al cambiar la version; la media global se relee por TTL."""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.utils import player_card_cache as cache_module
+from app.utils.player_card_cache import load_player_stats, player_card_cache
+from app.utils.scoring import ALL_ATTRIBUTES
+
+ATTRIBUTES = list(ALL_ATTRIBUTES[:2])
+
+
+def _rated_player(db, client, auth_headers, rating: float):
+    event_id, (court_id,) = db.event(
+        courts=[4], status="FINALIZED",
+        finalized_at=datetime.now(timezone.utc) - timedelta(hours=1),
+    )
+    voter, target = db.user(), db.user()
+    db.registration(event_id, voter, court_id)
+    db.registration(event_id, target, court_id)
+    res = client.post("/ratings", headers=auth_headers(voter), json={
+        "event_id": event_id, "court_id": court_id,
+        "ratings": [{"target_user_id": target, "rating": rating, "attributes": ATTRIBUTES}],
+    })
+    assert res.status_code == 200, res.text
+    return event_id, court_id, voter, target
+
+
+def test_new_vote_bumps_version_and_refreshes_stats(client, db, auth_headers):
+    event_id, court_id, voter, target = _rated_player(db, client, auth_headers, 2.0)
+
+    first = client.get(f"/users/{target}/rating", headers=auth_headers(target)).json()
+    assert first["total_votes"] == 1
+    assert first["avg_rating"] == 2.0
+
+    res = client.post("/ratings", headers=auth_headers(voter), json={
+        "event_id": event_id, "court_id": court_id,
+        "ratings": [{"target_user_id": target, "rating": 4.0, "attributes": ATTRIBUTES}],
+    })
+    assert res.status_code == 200, res.text
+
+    second = client.get(f"/users/{target}/rating", headers=auth_headers(target)).json()
+    assert second["total_votes"] == 1
+    assert second["avg_rating"] == 4.0
+
+
+def test_global_mean_is_cached_until_ttl(client, db, auth_headers, engine, monkeypatch):
+    *_, target = _rated_player(db, client, auth_headers, 3.0)
+    monkeypatch.setattr(player_card_cache, "_global_mean_expires_at", 0.0)
+
+    with engine.connect() as conn:
+        _, mean = load_player_stats(conn, [target])
+        expected = float(conn.execute(text("""
+            SELECT AVG(rating) FROM public.player_ratings WHERE is_hidden = false
+        """)).scalar_one())
+    assert mean == expected
+
+    # Dentro del TTL no se vuelve a leer: lo que devuelve es lo cacheado.
+    player_card_cache.put_global_mean(1.5)
+    with engine.connect() as conn:
+        _, mean = load_player_stats(conn, [target])
+    assert mean == 1.5
+
+    monkeypatch.setattr(cache_module, "GLOBAL_MEAN_TTL_SECONDS", 0)
+    player_card_cache.put_global_mean(1.5)
+    with engine.connect() as conn:
+        _, mean = load_player_stats(conn, [target])
+    assert mean == expected
@@ -0,0 +1,23 @@
+"""build_rule: un until sin hora incluye la ocurrencia de ese dia."""
+from datetime import datetime, timedelta
+
+from app.utils.datetime_parser import APP_TZ
+from app.utils.recurrence import build_rule, expand
+
+
+def test_date_only_until_covers_the_whole_day():
+    dtstart = datetime(2026, 11, 2, 20, 0, tzinfo=APP_TZ)  # lunes 20:00
+    rule = build_rule("WEEKLY", until="2026-11-30")
+
+    occurrences = expand(rule, dtstart, dtstart, dtstart + timedelta(days=60))
+
+    assert [o.astimezone(APP_TZ).day for o in occurrences] == [2, 9, 16, 23, 30]
+
+
+def test_until_with_time_is_kept_as_is():
+    dtstart = datetime(2026, 11, 2, 20, 0, tzinfo=APP_TZ)
+    rule = build_rule("WEEKLY", until="2026-11-30T10:00")
+
+    occurrences = expand(rule, dtstart, dtstart, dtstart + timedelta(days=60))
+
+    assert [o.astimezone(APP_TZ).day for o in occurrences] == [2, 9, 16, 23]
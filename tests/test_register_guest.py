@@ -0,0 +1,18 @@
+"""POST /events/{event_id}/guests: los reintentos con Idempotency-Key no gastan rate limit."""
+import uuid
+
+
+def test_idempotent_replays_do_not_hit_the_rate_limit(client, db, auth_headers):
+    player = db.user()
+    event_id, (court_id,) = db.event(courts=[10])
+    db.registration(event_id, player, court_id)
+    headers = {**auth_headers(player), "Idempotency-Key": str(uuid.uuid4())}
+    body = {"guest_name": "Invitado de test", "court_id": court_id}
+
+    # Mas reintentos que el limite por actor (15/min): todos devuelven la misma alta.
+    responses = [client.post(f"/events/{event_id}/guests", headers=headers, json=body) for _ in range(20)]
+
+    assert {r.status_code for r in responses} == {200}, responses[-1].text
+    assert len({r.json()["registration_id"] for r in responses}) == 1
+    guests = [r for r in db.registrations(event_id).values() if r["court_id"] == court_id]
+    assert len(guests) == 2  # el jugador y un solo invitado
@@ -0,0 +1,41 @@
+"""GET /admin/registrations/export: ver eventos no alcanza para bajar el padron."""
+import uuid
+
+from sqlalchemy import text
+
+
+def _user_with_permissions(db, engine, codes: list[str]) -> str:
+    user_id = db.user()
+    role_code = f"test_{uuid.uuid4().hex[:12]}"
+    with engine.begin() as conn:
+        role_id = conn.execute(text("""
+            INSERT INTO public.roles (code, name) VALUES (:code, :name) RETURNING id
+        """), {"code": role_code, "name": role_code}).scalar_one()
+        conn.execute(text("""
+            INSERT INTO public.role_permissions (role_id, permission_id)
+            SELECT :role_id, p.id FROM public.permissions p WHERE p.code = ANY(CAST(:codes AS text[]))
+        """), {"role_id": role_id, "codes": codes})
+        conn.execute(text("""
+            INSERT INTO public.user_roles (user_id, role_id) VALUES (:user_id, :role_id)
+        """), {"user_id": user_id, "role_id": role_id})
+    return user_id
+
+
+def test_events_view_alone_cannot_export(client, db, auth_headers, engine):
+    viewer = _user_with_permissions(db, engine, ["events.view"])
+    event_id, _ = db.event(courts=[2])
+
+    res = client.get("/admin/registrations/export", params={"event_id": event_id}, headers=auth_headers(viewer))
+
+    assert res.status_code == 403
+
+
+def test_admin_exports_the_roster(client, db, auth_headers):
+    admin = db.user(role="admin")
+    event_id, (court_id,) = db.event(courts=[2])
+    registration_id = db.registration(event_id, db.user(), court_id)
+
+    res = client.get("/admin/registrations/export", params={"event_id": event_id}, headers=auth_headers(admin))
+
+    assert res.status_code == 200, res.text
+    assert registration_id in res.text
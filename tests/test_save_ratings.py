@@ -0,0 +1,81 @@
+"""POST /ratings: cantidad fija de sentencias SQL sin importar cuantos votos vengan."""
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event as sa_event
+
+from app.utils.scoring import ALL_ATTRIBUTES
+
+# ranking_opt_in del votante, evento, inscripcion del votante, roster de la cancha y el
+# upsert de todos los votos.
+SAVE_RATINGS_STATEMENTS = 5
+
+
+@pytest.fixture
+def count_statements(engine):
+    @contextmanager
+    def counting():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            sa_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return counting
+
+
+def _court_with_players(db, players: int):
+    event_id, (court_id,) = db.event(
+        courts=[players + 1], status="FINALIZED",
+        finalized_at=datetime.now(timezone.utc) - timedelta(hours=1),
+    )
+    voter = db.user()
+    db.registration(event_id, voter, court_id)
+    peers = [db.user() for _ in range(players)]
+    for peer in peers:
+        db.registration(event_id, peer, court_id)
+    return event_id, court_id, voter, peers
+
+
+def _votes(peers):
+    return [
+        {"target_user_id": peer, "rating": 3.5 + (i % 3) * 0.5, "attributes": list(ALL_ATTRIBUTES[:2])}
+        for i, peer in enumerate(peers)
+    ]
+
+
+@pytest.mark.parametrize("peers", [1, 10])
+def test_save_ratings_statement_count_does_not_grow_with_votes(client, db, auth_headers, count_statements, peers):
+    event_id, court_id, voter, peer_ids = _court_with_players(db, peers)
+
+    with count_statements() as statements:
+        res = client.post("/ratings", headers=auth_headers(voter), json={
+            "event_id": event_id, "court_id": court_id, "ratings": _votes(peer_ids),
+        })
+
+    assert res.status_code == 200, res.text
+    assert res.json() == {"saved": peers, "pending_after": 0}
+    assert len(statements) == SAVE_RATINGS_STATEMENTS, statements
+
+
+def test_save_ratings_partial_then_update(client, db, auth_headers, count_statements):
+    event_id, court_id, voter, peer_ids = _court_with_players(db, 4)
+    headers = auth_headers(voter)
+
+    res = client.post("/ratings", headers=headers, json={
+        "event_id": event_id, "court_id": court_id, "ratings": _votes(peer_ids[:2]),
+    })
+    assert res.json() == {"saved": 2, "pending_after": 2}
+
+    # Re-votar uno ya votado y sumar los que faltaban: upsert, mismas sentencias.
+    with count_statements() as statements:
+        res = client.post("/ratings", headers=headers, json={
+            "event_id": event_id, "court_id": court_id, "ratings": _votes(peer_ids[1:]),
+        })
+    assert res.json() == {"saved": 3, "pending_after": 0}
+    assert len(statements) == SAVE_RATINGS_STATEMENTS, statements
@@ -0,0 +1,48 @@
+"""Scheduler: la conexion del lider queda libre entre ticks y un evento reabierto no se vuelve a cerrar."""
+from sqlalchemy import text
+
+from app.jobs.event_lifecycle import auto_close_events
+from app.jobs.scheduler import Scheduler
+
+
+def test_leader_connection_stays_idle_between_ticks(engine):
+    scheduler = Scheduler()
+    try:
+        assert scheduler._ensure_leader()
+        assert scheduler._ensure_leader()  # segundo tick: ping sobre la conexion existente
+
+        pid = scheduler._leader_conn.execute(text("SELECT pg_backend_pid()")).scalar_one()
+        with engine.connect() as conn:
+            state = conn.execute(text("""
+                SELECT state FROM pg_stat_activity WHERE pid = :pid
+            """), {"pid": pid}).scalar_one()
+        assert state == "idle"
+    finally:
+        scheduler._release_leadership()
+
+    assert not scheduler.is_leader
+    with engine.connect() as conn:
+        held = conn.execute(text("""
+            SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = :pid
+        """), {"pid": pid}).scalar_one()
+    assert held == 0
+
+
+def test_reopened_event_is_not_auto_closed_again(client, db, auth_headers, engine):
+    admin = db.user(role="admin")
+    event_id, _ = db.event(courts=[10], status="CLOSED")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE public.events SET close_at = now() - interval '1 hour' WHERE id = :id
+        """), {"id": event_id})
+
+    res = client.post(f"/admin/events/{event_id}/open", headers=auth_headers(admin))
+    assert res.status_code == 200, res.text
+
+    auto_close_events()
+    with engine.connect() as conn:
+        status, close_at = conn.execute(text("""
+            SELECT status, close_at FROM public.events WHERE id = :id
+        """), {"id": event_id}).one()
+    assert status == "OPEN"
+    assert close_at is None